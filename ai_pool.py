@@ -0,0 +1,155 @@
+"""
+Execução das buscas da IA fora do loop do eventlet.
+
+O servidor roda um único worker eventlet (Procfile). Uma busca alpha-beta
+é CPU pura e, rodando inline, congela todas as salas. Aqui a busca vai para
+um ``ProcessPoolExecutor`` limitado: o pedido leva só a posição serializada
+(quatro bitboards + vez) e um prazo, e a green thread que pediu espera o
+resultado sem bloquear o hub.
+
+Este módulo não importa eventlet/Flask: os processos filhos só carregam o
+motor (bitboard/search).
+"""
+
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from analyze import analyze_batch, chunked
+from bitboard import BitBoard
+from metrics import RateMeter
+from search import SearchEngine, DIFFICULTY_LEVELS, DEFAULT_DIFFICULTY
+
+AI_WORKERS = int(os.environ.get("AI_WORKERS", 2))
+AI_MAX_CONCURRENT = int(os.environ.get("AI_MAX_CONCURRENT", AI_WORKERS * 4))
+# "process" (padrão) ou "tpool" (threads nativas do eventlet, sem processos extras)
+AI_POOL_MODE = os.environ.get("AI_POOL_MODE", "process")
+# Folga além do tempo de busca (fila + serialização) antes de desistir
+DEADLINE_GRACE = 2.0
+
+
+class AIPoolBusy(Exception):
+    """Limite de buscas simultâneas do nó atingido."""
+
+
+def run_search(position, difficulty, deadline):
+    """
+    Executa a busca (no processo filho). ``deadline`` é um ``time.time()``
+    absoluto; a busca termina antes dele mesmo que o nível permita mais.
+
+    Retorna (caminho, score, profundidade, nós).
+    """
+    p1_men, p1_kings, p2_men, p2_kings, turn = position
+    limits = DIFFICULTY_LEVELS.get(difficulty, DIFFICULTY_LEVELS[DEFAULT_DIFFICULTY])
+    time_limit = max(0.05, min(limits["time"], deadline - time.time()))
+    engine = SearchEngine(limits["depth"], time_limit)
+    result = engine.search(BitBoard(p1_men, p1_kings, p2_men, p2_kings), turn)
+    path = result.move[0] if result.move is not None else None
+    return path, result.score, result.depth, result.nodes
+
+
+class AIPool:
+    """Pool limitado de buscas da IA."""
+
+    def __init__(self, workers=AI_WORKERS, max_concurrent=AI_MAX_CONCURRENT, mode=AI_POOL_MODE):
+        self.workers = workers
+        self.max_concurrent = max_concurrent
+        self.mode = mode
+        self.active = 0
+        self.completed = 0
+        self.rejected = 0
+        self.nodes = 0
+        self.node_rate = RateMeter()  # Nós por segundo (último minuto)
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            # spawn: não herda o processo já modificado pelo monkey_patch
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def search(self, position, difficulty):
+        """
+        Busca a jogada da posição serializada (``CheckersGame.get_position()``).
+
+        Bloqueia só a green thread que chamou. Retorna o caminho da jogada
+        (tupla de casas) ou None. Levanta ``AIPoolBusy`` se o nó já está no
+        limite de buscas simultâneas.
+        """
+        if self.active >= self.max_concurrent:
+            self.rejected += 1
+            raise AIPoolBusy()
+
+        limits = DIFFICULTY_LEVELS.get(difficulty, DIFFICULTY_LEVELS[DEFAULT_DIFFICULTY])
+        deadline = time.time() + limits["time"]
+        self.active += 1
+        try:
+            if self.mode == "tpool":
+                from eventlet import tpool
+                path, _, _, nodes = tpool.execute(run_search, position, difficulty, deadline)
+            else:
+                future = self._get_executor().submit(run_search, position, difficulty, deadline)
+                # Com monkey_patch, future.result() espera cooperativamente
+                try:
+                    path, _, _, nodes = future.result(timeout=limits["time"] + DEADLINE_GRACE)
+                except FutureTimeoutError:
+                    future.cancel()
+                    return None
+                except BrokenProcessPool:
+                    # Um filho morreu: recria o pool na próxima busca
+                    self._executor = None
+                    return None
+        finally:
+            self.active -= 1
+
+        self.completed += 1
+        self.nodes += nodes
+        self.node_rate.add(nodes)
+        return path
+
+    def analyze(self, items, depth, time_limit):
+        """
+        Analisa um lote de (posição compacta, vez) (``analyze.py``). O lote
+        é dividido em blocos que rodam em paralelo nos workers; conta como
+        uma busca no limite de buscas simultâneas. Retorna os resultados na
+        ordem da entrada, ou None se o pool falhou ou o prazo estourou.
+        """
+        if self.active >= self.max_concurrent:
+            self.rejected += 1
+            raise AIPoolBusy()
+
+        chunks = chunked(items)
+        # Cada posição usa até time_limit; os blocos dividem os workers
+        timeout = time_limit * len(items) / max(1, min(self.workers, len(chunks))) + DEADLINE_GRACE
+        self.active += 1
+        try:
+            if self.mode == "tpool":
+                from eventlet import tpool
+                batches = [tpool.execute(analyze_batch, chunk, depth, time_limit) for chunk in chunks]
+            else:
+                executor = self._get_executor()
+                futures = [executor.submit(analyze_batch, chunk, depth, time_limit) for chunk in chunks]
+                deadline = time.time() + timeout
+                try:
+                    batches = [future.result(timeout=max(0, deadline - time.time())) for future in futures]
+                except FutureTimeoutError:
+                    for future in futures:
+                        future.cancel()
+                    return None
+                except BrokenProcessPool:
+                    self._executor = None
+                    return None
+        finally:
+            self.active -= 1
+
+        self.completed += 1
+        return [result for batch in batches for result in batch]
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
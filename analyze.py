@@ -0,0 +1,234 @@
+"""
+Análise de posições em lote.
+
+Cada posição chega no formato compacto do frontend (``BitBoard.encode()``,
+24 caracteres) com o lado a jogar, e volta com as jogadas legais, as
+características da posição, a avaliação e a melhor jogada:
+
+    {"board": "...", "turn": 2, "legal_moves": [[[5, 0], [4, 1]], ...],
+     "features": {...}, "static_eval": 35, "score": 40, "depth": 4,
+     "best_move": [[5, 0], [4, 1]], "source": "search"}
+
+Scores são do ponto de vista de quem joga. Finais que estão na tablebase
+são resolvidos por consulta (``source`` = "tablebase", com ``result`` e
+``distance``).
+
+As características são extraídas com operações sobre o bitboard inteiro
+(máscaras de linha, deslocamentos de todas as peças de uma vez), sem
+percorrer as casas. O lote é dividido em blocos e os blocos vão para um
+pool de processos (no servidor, o mesmo ``AIPool`` da IA).
+
+Uso offline:
+    python analyze.py posicoes.ndjson --workers 4 --depth 6 > resultado.ndjson
+    python analyze.py --log game_log.ndjson --workers 4 > partidas.ndjson
+
+Entrada: uma posição por linha, em JSON ({"board": ..., "turn": ...}) ou
+"<board> <turn>".
+"""
+
+import argparse
+import binascii
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bitboard import BitBoard, FORWARD, P1, P2, PROMOTION_MASK, ROW_MASK, opponent, popcount, shift, square_coords
+from search import BACK_ROW, CENTER_MASK, WIN_SCORE, SearchEngine, evaluate, generate_moves
+from tablebase import DRAW, LOSS, WIN, get_tablebase
+
+ANALYZE_DEPTH = 6
+ANALYZE_MAX_DEPTH = 12
+ANALYZE_TIME = float(os.environ.get("ANALYZE_TIME", 0.2))  # Segundos por posição
+ANALYZE_CHUNK = 32  # Posições por tarefa enviada ao pool
+ANALYZE_MAX_POSITIONS = int(os.environ.get("ANALYZE_MAX_POSITIONS", 500))  # Por pedido HTTP
+RESULT_NAMES = {WIN: "win", DRAW: "draw", LOSS: "loss"}
+# Distância de cada linha até a promoção, por jogador
+ROWS_TO_PROMOTION = {P1: tuple(range(8)), P2: tuple(7 - row for row in range(8))}
+
+
+def extract_features(board, player):
+    """
+    Características da posição para ``player`` e o adversário, calculadas
+    sobre os bitboards inteiros (cada máscara/deslocamento trata todas as
+    peças de uma vez).
+    """
+    empty = board.empty()
+    features = {}
+    for side, name in ((player, "own"), (opponent(player), "enemy")):
+        men = board.men(side)
+        kings = board.kings(side)
+        pieces = men | kings
+        enemy = board.pieces(opponent(side))
+        distance = ROWS_TO_PROMOTION[side]
+        mobility = 0
+        for d in FORWARD[side]:
+            mobility += popcount(shift(men, d) & empty)
+        for d in range(4):
+            mobility += popcount(shift(kings, d) & empty)
+        # Peças com captura imediata (peça adversária vizinha e casa livre atrás)
+        attackers = 0
+        for d in range(4):
+            landing = shift(shift(pieces, d) & enemy, d) & empty
+            attackers += popcount(landing)
+        features[name] = {
+            "men": popcount(men),
+            "kings": popcount(kings),
+            "advancement": sum(popcount(men & ROW_MASK[row]) * (7 - distance[row]) for row in range(8)),
+            "back_row": popcount(men & BACK_ROW[side]),
+            "center": popcount(pieces & CENTER_MASK),
+            "mobility": mobility,
+            "captures": attackers,
+        }
+    return features
+
+
+def _move_coords(path):
+    return [list(square_coords(sq)) for sq in path]
+
+
+def analyze_position(packed, turn, depth=ANALYZE_DEPTH, time_limit=ANALYZE_TIME):
+    """
+    Analisa uma posição compacta com ``turn`` (1 ou 2) a jogar. Entrada
+    inválida vira {"error": ...} no resultado, sem interromper o lote.
+    """
+    result = {"board": packed, "turn": turn}
+    try:
+        if turn not in (P1, P2):
+            raise ValueError("turn deve ser 1 ou 2")
+        board = BitBoard.decode(packed)
+        if sum(popcount(bits) for bits in board.key()) != popcount(board.occupied()):
+            raise ValueError("peças sobrepostas")
+        if board.p1_men & PROMOTION_MASK[P1] or board.p2_men & PROMOTION_MASK[P2]:
+            raise ValueError("pedra na linha de promoção")
+    except (TypeError, ValueError, struct.error, binascii.Error) as e:
+        result["error"] = f"Posição inválida: {str(e)}"
+        return result
+
+    moves = generate_moves(board, turn)
+    result["legal_moves"] = [_move_coords(squares) for squares, _ in moves]
+    result["features"] = extract_features(board, turn)
+    result["static_eval"] = evaluate(board, turn)
+    if not moves:
+        result.update(best_move=None, score=-WIN_SCORE, depth=0, source="terminal")
+        return result
+
+    tablebase = get_tablebase()
+    probe = tablebase.probe(board, turn) if tablebase is not None else None
+    if probe is not None:
+        outcome, distance = probe
+        result.update(best_move=_move_coords(tablebase.best_move(board, turn)),
+                      result=RESULT_NAMES[outcome], distance=distance,
+                      source="tablebase")
+        return result
+
+    search = SearchEngine(depth, time_limit).search(board, turn)
+    result.update(best_move=_move_coords(search.move[0]), score=search.score,
+                  depth=search.depth, nodes=search.nodes, source="search")
+    return result
+
+
+def analyze_batch(items, depth=ANALYZE_DEPTH, time_limit=ANALYZE_TIME):
+    """Analisa uma lista de (posição compacta, vez). Roda no processo filho."""
+    return [analyze_position(packed, turn, depth, time_limit) for packed, turn in items]
+
+
+def chunked(items, size=ANALYZE_CHUNK):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+# ----------------------------------------
+# Entrada offline
+# ----------------------------------------
+
+def read_positions(lines):
+    """Posições de linhas NDJSON ou "<board> <turn>" (linhas vazias são ignoradas)."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            record = json.loads(line)
+            yield record.get("board"), record.get("turn", P1), {
+                key: value for key, value in record.items() if key not in ("board", "turn")}
+        else:
+            packed, _, turn = line.partition(" ")
+            yield packed, int(turn or P1), {}
+
+
+def logged_positions(log_path):
+    """
+    Posições das partidas terminadas do log (``game_log.py``): o tabuleiro
+    no começo de cada vez, com o id da partida e o número da jogada.
+    """
+    from checkers_game import CheckersGame
+    from game_log import GameLog
+
+    log = GameLog(log_path)
+    try:
+        for game_id, records in log.finished_games():
+            game = CheckersGame()
+            ply = 0
+            yield game.get_bitboard().encode(), game.turn, {"game": game_id, "ply": ply}
+            for record in records["moves"]:
+                if record["t"] == "timeout":
+                    game.timeout_turn()
+                elif not game.move_piece(*record["m"])[0]:
+                    break
+                if game.winner:
+                    break
+                if game._pending_paths is None:
+                    ply += 1
+                    yield game.get_bitboard().encode(), game.turn, {"game": game_id, "ply": ply}
+    finally:
+        log.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analisa posições em lote.")
+    parser.add_argument("input", nargs="?", help="arquivo de posições (padrão: stdin)")
+    parser.add_argument("--log", help="analisa as partidas terminadas deste log de partidas")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--depth", type=int, default=ANALYZE_DEPTH)
+    parser.add_argument("--time", type=float, default=ANALYZE_TIME, help="segundos por posição")
+    parser.add_argument("--out", help="arquivo de saída NDJSON (padrão: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.log:
+        positions = list(logged_positions(args.log))
+    elif args.input:
+        with open(args.input, encoding="utf-8") as f:
+            positions = list(read_positions(f))
+    else:
+        positions = list(read_positions(sys.stdin))
+
+    start = time.perf_counter()
+    items = [(packed, turn) for packed, turn, _ in positions]
+    chunks = chunked(items)
+    if args.workers > 1 and len(chunks) > 1:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=args.workers, mp_context=context) as executor:
+            batches = list(executor.map(analyze_batch, chunks,
+                                        [args.depth] * len(chunks), [args.time] * len(chunks)))
+    else:
+        batches = [analyze_batch(chunk, args.depth, args.time) for chunk in chunks]
+
+    out = open(args.out, "w", encoding="utf-8") if args.out else sys.stdout
+    try:
+        results = (result for batch in batches for result in batch)
+        for (_, _, extra), result in zip(positions, results):
+            result.update(extra)
+            out.write(json.dumps(result, separators=(",", ":")) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    print(f"{len(positions)} posições em {time.perf_counter() - start:.1f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,11 +11,25 @@ import eventlet
 eventlet.monkey_patch()
 
 # Agora podemos importar o resto
-from flask import Flask, jsonify, request, render_template
+from flask import Flask, Response, g, jsonify, request, render_template, session
 from flask_socketio import SocketIO, emit, join_room, leave_room
+import hmac
 import random
 import os
-from game_manager import GameManager
+import secrets
+import time
+from functools import wraps
+from game_manager import (GameManager, SessionRegistry, LOBBY_PAGE_SIZE,
+                          WAITING, PLAYING, FINISHED, WAITING_GUEST_NAME)
+from room_store import RoomConflict
+from checkers_game import BOARD_ENCODINGS, CheckersGame, P1, P2
+from ai_pool import AIPool, AIPoolBusy
+from analyze import ANALYZE_DEPTH, ANALYZE_MAX_DEPTH, ANALYZE_MAX_POSITIONS, ANALYZE_TIME
+from opening_book import load_opening_book
+from game_log import GameLog, GAME_LOG_PATH, GAME_LOG_FSYNC_INTERVAL
+from metrics import RateMeter, registry
+from profiler import LoopMonitor, PROFILER_INTERVAL
+import snapshots
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'dama-multiplayer-secret-key-2024'
@@ -26,493 +40,198 @@ socketio = SocketIO(
     cors_allowed_origins="*",
     async_mode='eventlet',
     ping_timeout=120,
-    ping_interval=30
+    ping_interval=30,
+    # Vários workers/nós: fila compartilhada (ex.: redis://...) para os emits
+    message_queue=os.environ.get('SOCKETIO_MESSAGE_QUEUE'),
+    # Estados da partida vão com o JSON já pronto (um por versão, para todos)
+    json=snapshots
 )
 
 # Gerenciador de salas multiplayer
 game_manager = GameManager()
 
-# Constantes
-EMPTY = 0
-P1 = 1
-P2 = 2
-P1_KING = 3
-P2_KING = 4
-
-class CheckersGame:
-    def __init__(self):
-        self.board = []
-        self.turn = P1
-        self.winner = None
-        self.player1_name = "Jogador 1"
-        self.player2_name = "Jogador 2"
-        self.mode = "pvp"  # pvp ou pvc
-        self.move_history = []
-        self.player1_times = []
-        self.player2_times = []
-        self.player1_warnings = 0
-        self.player2_warnings = 0
-        self.game_started = False
-        self.initialize_board()
-
-    def initialize_board(self):
-        """
-        Inicializa o tabuleiro seguindo as REGRAS BRASILEIRAS OFICIAIS.
-        
-        Regras de inicialização:
-        - Tabuleiro 8x8
-        - Peças só ficam em casas escuras (row + col) % 2 == 1
-        - P2 (vermelhas/pretas): linhas 0, 1, 2 (3 primeiras linhas)
-        - P1 (brancas/vermelhas): linhas 5, 6, 7 (3 últimas linhas)
-        - Linhas 3 e 4 ficam vazias (área neutra)
-        """
-        self.board = [[EMPTY for _ in range(8)] for _ in range(8)]
-        self.turn = P1
-        self.winner = None
-        self.move_history = []
-        self.player1_times = []
-        self.player2_times = []
-        self.player1_warnings = 0
-        self.player2_warnings = 0
-        
-        # Colocar peças nas casas escuras das 3 primeiras e 3 últimas linhas
-        for row in range(8):
-            for col in range(8):
-                if (row + col) % 2 == 1:  # Casa escura
-                    if row < 3:
-                        self.board[row][col] = P2  # Peças do jogador 2 (topo)
-                    elif row > 4:
-                        self.board[row][col] = P1  # Peças do jogador 1 (base)
-
-    def configure_game(self, p1_name, p2_name, mode="pvp"):
-        """Configura nomes e modo de jogo."""
-        self.player1_name = p1_name if p1_name else "Jogador 1"
-        self.player2_name = p2_name if p2_name else ("Romano" if mode == "pvc" else "Jogador 2")
-        self.mode = mode
-        self.game_started = True
-
-    def get_piece_count(self):
-        """Conta peças de cada jogador."""
-        p1_count = sum(1 for row in self.board for piece in row if piece in [P1, P1_KING])
-        p2_count = sum(1 for row in self.board for piece in row if piece in [P2, P2_KING])
-        return p1_count, p2_count
-
-    def get_average_time(self, player):
-        """Calcula tempo médio de jogadas."""
-        times = self.player1_times if player == P1 else self.player2_times
-        return sum(times) / len(times) if times else 0
-
-    def analyze_time_comparison(self, move_time):
-        """Analisa tempo comparativo (apenas avisos, sem penalidade)."""
-        if self.turn == P1:
-            self.player1_times.append(move_time)
-        else:
-            self.player2_times.append(move_time)
+# Mudanças no lobby vão para quem está inscrito na sala Socket.IO 'lobby'
+LOBBY_ROOM = 'lobby'
+game_manager.on_lobby_change = lambda event, data: socketio.emit(event, data, room=LOBBY_ROOM)
 
-        if len(self.player1_times) < 3 or len(self.player2_times) < 3:
-            return None
+# Buscas da IA em processos separados (não travam o worker eventlet)
+ai_pool = AIPool()
 
-        avg1 = self.get_average_time(P1)
-        avg2 = self.get_average_time(P2)
-        
-        message = None
-
-        # Apenas avisos informativos, SEM remover peças
-        if avg1 > 0 and avg2 > 0:
-            if avg1 > avg2 * 1.5 and self.turn == P1:
-                self.player1_warnings += 1
-                if self.player1_warnings >= 3:
-                    message = f"⚠️ {self.player1_name}, você está demorando muito! Agilize!"
-                    self.player1_warnings = 0
-                else:
-                    message = f"💡 {self.player1_name}, tente jogar mais rápido!"
-            
-            elif avg2 > avg1 * 1.5 and self.turn == P2:
-                self.player2_warnings += 1
-                if self.player2_warnings >= 3:
-                    message = f"⚠️ {self.player2_name}, você está demorando muito! Agilize!"
-                    self.player2_warnings = 0
-                else:
-                    message = f"💡 {self.player2_name}, tente jogar mais rápido!"
-
-        return {"message": message}
-
-    def is_piece_of_player(self, piece, player):
-        """Verifica se peça pertence ao jogador."""
-        if player == P1:
-            return piece in [P1, P1_KING]
-        return piece in [P2, P2_KING]
-
-    def promote_to_king(self, row, col):
-        """Promove peça a dama."""
-        piece = self.board[row][col]
-        if piece == P1 and row == 0:
-            self.board[row][col] = P1_KING
-            return True
-        elif piece == P2 and row == 7:
-            self.board[row][col] = P2_KING
-            return True
-        return False
+# Livro de aberturas (mmap): jogadas prontas para as posições mais comuns
+opening_book = load_opening_book()
 
-    def get_captures(self, row, col):
-        """
-        Retorna capturas possíveis, incluindo movimento longo de Dama.
-
-        Regras implementadas:
-        - Peças normais capturam pulando 2 casas na diagonal (como antes).
-        - Damas (P1_KING, P2_KING) podem capturar em QUALQUER distância na mesma
-          diagonal, desde que:
-            * Haja exatamente 1 peça inimiga no caminho.
-            * Todas as casas após o inimigo até o destino estejam vazias.
-            * Não haja peça própria bloqueando o caminho.
-        """
-        piece = self.board[row][col]
-        if piece == EMPTY:
-            return []
-
-        captures = []
-
-        # Peças normais (não-damas): mesma lógica antiga (2 casas)
-        if piece in (P1, P2):
-            directions = [(-2, -2), (-2, 2)] if piece == P1 else [(2, -2), (2, 2)]
-            for dr, dc in directions:
-                new_row, new_col = row + dr, col + dc
-                mid_row, mid_col = row + dr // 2, col + dc // 2
-
-                # Verificar limites E casa escura
-                if (
-                    0 <= new_row < 8 
-                    and 0 <= new_col < 8
-                    and (new_row + new_col) % 2 == 1  # Casa escura
-                ):
-                    mid_piece = self.board[mid_row][mid_col]
-                    if (
-                        mid_piece != EMPTY
-                        and not self.is_piece_of_player(mid_piece, self.turn)
-                        and self.board[new_row][new_col] == EMPTY
-                    ):
-                        captures.append((new_row, new_col, mid_row, mid_col))
-
-            return captures
-
-        # DAMAS: podem capturar em qualquer distância na diagonal
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-
-        for dr, dc in directions:
-            r = row + dr
-            c = col + dc
-            seen_enemy = False
-            enemy_pos = None
-
-            while 0 <= r < 8 and 0 <= c < 8:
-                # Verificar se é casa escura (peças só podem estar em casas escuras)
-                if (r + c) % 2 != 1:
-                    # Casa clara - pular (peças não podem estar aqui)
-                    r += dr
-                    c += dc
-                    continue
-                
-                current_piece = self.board[r][c]
-
-                if current_piece == EMPTY:
-                    # Se já vimos exatamente um inimigo antes, qualquer casa vazia ESCURA
-                    # depois dele é um destino válido de captura.
-                    if seen_enemy and enemy_pos is not None:
-                        captures.append((r, c, enemy_pos[0], enemy_pos[1]))
-                else:
-                    # Encontrou uma peça (em casa escura)
-                    if self.is_piece_of_player(current_piece, self.turn):
-                        # Peça própria bloqueia o caminho → parar nesta direção
-                        break
-
-                    # Peça inimiga
-                    if not seen_enemy:
-                        seen_enemy = True
-                        enemy_pos = (r, c)
-                    else:
-                        # Já havia inimigo no caminho → duas peças inimigas bloqueiam
-                        break
-
-                # Avançar na diagonal (pula casas claras automaticamente)
-                r += dr
-                c += dc
-
-        return captures
-
-    def get_all_captures_for_player(self):
-        """Retorna todas capturas possíveis."""
-        all_captures = []
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if self.is_piece_of_player(piece, self.turn):
-                    captures = self.get_captures(row, col)
-                    if captures:
-                        all_captures.append((row, col, captures))
-        return all_captures
-
-    def get_simple_moves(self, row, col):
-        """
-        Retorna movimentos simples (sem captura).
-
-        Regras:
-        - Peça normal: 1 casa na diagonal, apenas para frente.
-        - Dama: qualquer número de casas na diagonal (frente ou trás),
-          até encontrar uma peça ou a borda do tabuleiro.
-        - Todas as peças só podem estar em casas escuras (row + col) % 2 == 1
-        """
-        piece = self.board[row][col]
-        if piece == EMPTY:
-            return []
-
-        moves = []
-
-        # Peças normais: 1 passo na direção correta
-        if piece in (P1, P2):
-            if piece == P1:
-                directions = [(-1, -1), (-1, 1)]
-            else:
-                directions = [(1, -1), (1, 1)]
-
-            for dr, dc in directions:
-                new_row, new_col = row + dr, col + dc
-                # Verificar limites, casa vazia E casa escura
-                if (
-                    0 <= new_row < 8
-                    and 0 <= new_col < 8
-                    and (new_row + new_col) % 2 == 1  # Casa escura
-                    and self.board[new_row][new_col] == EMPTY
-                ):
-                    moves.append((new_row, new_col))
-
-            return moves
-
-        # DAMAS: podem andar várias casas na diagonal
-        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-
-        for dr, dc in directions:
-            r = row + dr
-            c = col + dc
-            while 0 <= r < 8 and 0 <= c < 8:
-                # Verificar se é casa escura (peças só podem estar em casas escuras)
-                if (r + c) % 2 == 1:
-                    if self.board[r][c] == EMPTY:
-                        moves.append((r, c))
-                    else:
-                        # Qualquer peça (própria ou inimiga) bloqueia a continuidade
-                        break
-                # Se for casa clara, pular (peças não podem estar aqui)
-                # Avançar na diagonal
-                r += dr
-                c += dc
-
-        return moves
-
-    def is_valid_move(self, start_r, start_c, end_r, end_c):
-        """
-        Valida movimento seguindo as REGRAS BRASILEIRAS OFICIAIS de damas.
-        
-        Regras:
-        1. Peças só podem estar em casas escuras (row + col) % 2 == 1
-        2. Peça normal: move 1 casa na diagonal para frente
-        3. Dama: move qualquer número de casas na diagonal (frente ou trás)
-        4. Captura é OBRIGATÓRIA se possível
-        5. Captura múltipla é obrigatória (deve continuar capturando)
-        """
-        # Validações básicas
-        if not (0 <= start_r < 8 and 0 <= start_c < 8 and 
-                0 <= end_r < 8 and 0 <= end_c < 8):
-            return False, "Posição fora do tabuleiro."
-
-        # Verificar se destino é casa escura (obrigatório)
-        if (end_r + end_c) % 2 != 1:
-            return False, "Peças só podem estar em casas escuras."
-
-        piece = self.board[start_r][start_c]
-        
-        if piece == EMPTY:
-            return False, "Não há peça na origem."
-        
-        if not self.is_piece_of_player(piece, self.turn):
-            return False, "Esta peça não pertence ao jogador atual."
+# Partidas locais/PvC, uma por sessão do navegador
+local_games = SessionRegistry()
 
-        if self.board[end_r][end_c] != EMPTY:
-            return False, "A casa de destino não está vazia."
+# Estado inicial para leituras sem partida (crawler, GET sem cookie): fica
+# fora do registro e nunca é alterado, então não tira a vaga de ninguém
+default_game = CheckersGame()
 
-        # Verificar capturas possíveis desta peça específica
-        captures_from_piece = self.get_captures(start_r, start_c)
-        
-        # 1) Verificar se este movimento é uma captura válida desta peça
-        for cap_r, cap_c, _, _ in captures_from_piece:
-            if cap_r == end_r and cap_c == end_c:
-                return True, "Captura válida."
-
-        # 2) REGRA BRASILEIRA: Se esta peça PODE capturar, mas o jogador tentou movimento simples
-        # então é inválido (captura obrigatória para esta peça)
-        if captures_from_piece:
-            return False, "Captura obrigatória! Esta peça deve capturar."
-
-        # 3) Verificar se há capturas possíveis com OUTRAS peças do jogador
-        # REGRA BRASILEIRA: Se qualquer peça pode capturar, o jogador DEVE capturar
-        all_captures = self.get_all_captures_for_player()
-        if all_captures:
-            # Se há capturas possíveis, mas esta peça não pode capturar,
-            # o jogador deve escolher uma peça que pode capturar
-            return False, "Captura obrigatória! Escolha uma peça que pode capturar."
-
-        # 4) Caso não haja capturas obrigatórias, verificar movimento simples
-        simple_moves = self.get_simple_moves(start_r, start_c)
-        for move_r, move_c in simple_moves:
-            if move_r == end_r and move_c == end_c:
-                return True, "Movimento válido."
-
-        return False, "Movimento inválido."
-
-    def check_winner(self):
-        """Verifica vencedor."""
-        p1_pieces = 0
-        p2_pieces = 0
-        p1_can_move = False
-        p2_can_move = False
-        
-        for row in range(8):
-            for col in range(8):
-                piece = self.board[row][col]
-                if piece in [P1, P1_KING]:
-                    p1_pieces += 1
-                    if not p1_can_move:
-                        if self.get_captures(row, col) or self.get_simple_moves(row, col):
-                            p1_can_move = True
-                elif piece in [P2, P2_KING]:
-                    p2_pieces += 1
-                    if not p2_can_move:
-                        if self.get_captures(row, col) or self.get_simple_moves(row, col):
-                            p2_can_move = True
-        
-        if p1_pieces == 0 or (self.turn == P1 and not p1_can_move):
-            self.winner = self.player2_name
-            return True
-        elif p2_pieces == 0 or (self.turn == P2 and not p2_can_move):
-            self.winner = self.player1_name
-            return True
-        
-        return False
+NO_GAME_ERROR = {"error": "Nenhuma partida em andamento."}
 
-    def move_piece(self, start_r, start_c, end_r, end_c, move_time=0):
-        """Executa movimento."""
-        valid, message = self.is_valid_move(start_r, start_c, end_r, end_c)
-        
-        if not valid:
-            return False, message, None, None
 
-        piece = self.board[start_r][start_c]
-        
-        # Verificar se é uma captura (antes de mover a peça)
-        captured = False
-        captured_pos = None
-        
-        # Buscar nas capturas possíveis para encontrar a posição da peça capturada
-        captures = self.get_captures(start_r, start_c)
-        for cap_end_r, cap_end_c, enemy_r, enemy_c in captures:
-            if cap_end_r == end_r and cap_end_c == end_c:
-                captured = True
-                captured_pos = (enemy_r, enemy_c)
-                break
-        
-        # Mover a peça
-        self.board[end_r][end_c] = piece
-        self.board[start_r][start_c] = EMPTY
-        
-        # Remover a peça capturada (funciona para peças normais E damas)
-        if captured and captured_pos:
-            enemy_r, enemy_c = captured_pos
-            self.board[enemy_r][enemy_c] = EMPTY
-        
-        # Promover a dama se chegou no final
-        promoted = self.promote_to_king(end_r, end_c)
-        
-        # Análise de tempo (SEM PENALIDADE DE PERDER PEÇA)
-        time_analysis = None
-        if move_time > 0:
-            time_analysis = self.analyze_time_comparison(move_time)
-            # REMOVIDO: apply_time_penalty() - era confuso e bugado
-        
-        # REGRA BRASILEIRA: Verificar se pode capturar novamente (captura múltipla obrigatória)
-        can_capture_again = False
-        if captured and not promoted:
-            next_captures = self.get_captures(end_r, end_c)
-            if next_captures:
-                can_capture_again = True
-                # Não muda o turno - jogador DEVE continuar capturando
-                return True, "Captura realizada! Você DEVE continuar capturando.", time_analysis, captured_pos
-        
-        # Só muda o turno se não houver captura múltipla obrigatória
-        if not can_capture_again:
-            self.turn = P2 if self.turn == P1 else P1
-            self.check_winner()
-        
-        return True, "Movimento realizado!", time_analysis, captured_pos
-
-    def get_ai_move(self):
-        """IA Romano escolhe jogada."""
-        all_captures = self.get_all_captures_for_player()
-        if all_captures:
-            start_r, start_c, captures = random.choice(all_captures)
-            end_r, end_c, _, _ = random.choice(captures)
-            return start_r, start_c, end_r, end_c
-        
-        for row in range(8):
-            for col in range(8):
-                if self.is_piece_of_player(self.board[row][col], self.turn):
-                    moves = self.get_simple_moves(row, col)
-                    for end_r, end_c in moves:
-                        if end_r == 7:
-                            return row, col, end_r, end_c
-        
-        all_moves = []
-        for row in range(8):
-            for col in range(8):
-                if self.is_piece_of_player(self.board[row][col], self.turn):
-                    moves = self.get_simple_moves(row, col)
-                    for end_r, end_c in moves:
-                        all_moves.append((row, col, end_r, end_c))
-        
-        if all_moves:
-            return random.choice(all_moves)
-        
-        return None
+def get_session_game(create=False):
+    """
+    Retorna a partida local da sessão atual, ou None. Só as ações que
+    começam ou jogam uma partida (``create``: configurar, reiniciar, lance)
+    criam uma no registro, o que pode tirar a sessão mais antiga.
+    """
+    if not create:
+        return local_games.get_game(session.get('game_token'))
+    token, game = local_games.get_or_create(session.get('game_token'))
+    session['game_token'] = token
+    return game
 
-    def surrender(self, player):
-        """Jogador desiste."""
-        if player == P1:
-            self.winner = self.player2_name
-        else:
-            self.winner = self.player1_name
-        return True
-
-    def get_state(self):
-        """Retorna estado do jogo."""
-        p1_count, p2_count = self.get_piece_count()
-        avg1 = self.get_average_time(P1)
-        avg2 = self.get_average_time(P2)
-        
-        return {
-            "board": self.board,
-            "turn": self.turn,
-            "player1_name": self.player1_name,
-            "player2_name": self.player2_name,
-            "turn_name": self.player1_name if self.turn == P1 else self.player2_name,
-            "winner": self.winner,
-            "mode": self.mode,
-            "p1_pieces": p1_count,
-            "p2_pieces": p2_count,
-            "p1_avg_time": round(avg1, 1),
-            "p2_avg_time": round(avg2, 1),
-            "game_started": self.game_started
-        }
 
-# Instância global do jogo (para modo local/PvC)
-game = CheckersGame()
+def session_state(game):
+    """Estado da partida no formato de tabuleiro escolhido pela sessão."""
+    return game.get_state(session.get('board_encoding'))
+
+
+def state_response(payload, status=200):
+    """Resposta JSON que reaproveita o estado já serializado (``snapshots``)."""
+    return Response(snapshots.dumps(payload), status=status, mimetype='application/json')
+
+
+def emit_room_state(room, event, extra=None):
+    """
+    Envia o estado completo da sala a cada jogador, no formato de tabuleiro
+    que ele escolheu. ``extra`` são campos adicionais do evento (o estado
+    vai então em ``game_state``).
+    """
+    for sid in (room.host_sid, room.guest_sid):
+        if not sid:
+            continue
+        state = room.game.get_state(room.encodings.get(sid))
+        payload = dict(extra, game_state=state) if extra is not None else state
+        socketio.emit(event, payload, room=sid)
+
+# ========================================
+# MÉTRICAS
+# ========================================
+
+HTTP_LATENCY = 'damas_http_request_duration_seconds'
+SOCKET_LATENCY = 'damas_socket_event_duration_seconds'
+registry.describe(HTTP_LATENCY, 'Latência das rotas HTTP (segundos).')
+registry.describe('damas_http_requests_total', 'Requisições HTTP por rota, método e status.')
+registry.describe(SOCKET_LATENCY, 'Latência dos handlers Socket.IO (segundos).')
+registry.describe('damas_socket_event_errors_total', 'Exceções nos handlers Socket.IO.')
+registry.describe('damas_game_function_duration_seconds', 'Latência de move_piece/get_state (segundos).')
+registry.describe('damas_ai_turn_duration_seconds', 'Jogada da IA completa: consulta ou busca e execução (segundos).')
+registry.describe('damas_moves_total', 'Lances (saltos) aplicados neste nó.')
+
+move_rate = RateMeter()
+connected_sockets = 0
+
+# CPU por sala, trechos lentos do loop e profiler por amostragem (o trace das
+# trocas de green thread só fica ligado com LOOP_MONITOR=1 ou com o profiler)
+loop_monitor = LoopMonitor(charge=game_manager.charge_cpu)
+loop_monitor.install()
+
+def count_move():
+    registry.inc('damas_moves_total')
+    move_rate.add()
+
+def socket_event(event):
+    """``socketio.on`` com a latência e as exceções do handler registradas."""
+    histogram = registry.histogram(SOCKET_LATENCY, event=event)
+    
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            room_id = event_room_id(request.sid)
+            loop_monitor.enter(event, room_id)
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                registry.inc('damas_socket_event_errors_total', event=event)
+                raise
+            finally:
+                loop_monitor.exit()
+                game_manager.park_room(room_id)
+                histogram.record(time.perf_counter() - start)
+        return socketio.on(event)(wrapper)
+    return decorator
+
+def event_room_id(sid):
+    """Sala do jogador ou do espectador (contexto do profiler), ou None."""
+    return game_manager.store.get_player_room(sid) or game_manager.spectating.get(sid)
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    loop_monitor.enter(request.url_rule.rule if request.url_rule else 'unmatched')
+
+@app.teardown_request
+def end_request_context(exc=None):
+    loop_monitor.exit()
+
+@app.after_request
+def record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        registry.observe(HTTP_LATENCY, time.perf_counter() - start, route=route, method=request.method)
+        registry.inc('damas_http_requests_total', route=route, method=request.method,
+                     status=response.status_code)
+    return response
+
+registry.gauge('damas_rooms', 'Salas monitoradas neste nó.', lambda: len(game_manager.deadlines))
+registry.gauge('damas_connected_sockets', 'Clientes Socket.IO conectados.', lambda: connected_sockets)
+registry.gauge('damas_spectators', 'Espectadores conectados.', lambda: len(game_manager.spectating))
+registry.gauge('damas_matchmaking_queue', 'Jogadores na fila da partida rápida.', lambda: len(game_manager.matchmaking))
+registry.gauge('damas_local_games', 'Partidas locais/PvC em memória.', lambda: len(local_games))
+registry.gauge('damas_moves_per_second', 'Lances por segundo (último minuto).', move_rate.rate)
+registry.gauge('damas_ai_active_searches', 'Buscas da IA em andamento.', lambda: ai_pool.active)
+registry.gauge('damas_ai_nodes_per_second', 'Nós da busca por segundo (último minuto).', ai_pool.node_rate.rate)
+registry.gauge('damas_ai_nodes_total', 'Nós visitados pelas buscas da IA.', lambda: ai_pool.nodes, kind='counter')
+registry.gauge('damas_ai_searches_total', 'Buscas da IA concluídas.', lambda: ai_pool.completed, kind='counter')
+registry.gauge('damas_ai_rejected_total', 'Buscas recusadas (limite de buscas simultâneas).', lambda: ai_pool.rejected, kind='counter')
+registry.gauge('damas_loop_slow_total', 'Trechos que prenderam o loop além do limite.', lambda: loop_monitor.slow_count, kind='counter')
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas no formato texto do Prometheus."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
+
+# Rotas/eventos de diagnóstico (desligados sem ADMIN_TOKEN)
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN', '')
+
+def is_admin(token):
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(str(token or ''), ADMIN_TOKEN)
+
+def profiler_command(data):
+    """
+    Aplica {"action": "start"|"stop"|"report", "interval": segundos}.
+    Retorna (relatório, None) ou (None, mensagem de erro).
+    """
+    action = data.get('action', 'report')
+    if action == 'start':
+        try:
+            interval = max(0.001, float(data.get('interval', PROFILER_INTERVAL)))
+        except (TypeError, ValueError):
+            return None, "Intervalo inválido."
+        loop_monitor.start_profiler(interval)
+    elif action == 'stop':
+        loop_monitor.stop_profiler()
+    elif action != 'report':
+        return None, "Ação inválida."
+    report = loop_monitor.report()
+    report['rooms_cpu'] = [{'room_id': room_id, 'cpu_time': round(seconds, 3)}
+                           for room_id, seconds in game_manager.room_cpu_times()]
+    return report, None
+
+@app.route('/admin/profiler', methods=['GET', 'POST'])
+def admin_profiler():
+    """Profiler do loop: POST liga/desliga, GET mostra o resultado (header X-Admin-Token)."""
+    if not is_admin(request.headers.get('X-Admin-Token')):
+        return jsonify({"error": "Acesso negado."}), 403
+    data = (request.get_json(silent=True) or {}) if request.method == 'POST' else {}
+    report, error = profiler_command(data)
+    if error:
+        return jsonify({"error": error}), 400
+    return jsonify(report)
 
 # ========================================
 # ROTAS
@@ -521,27 +240,56 @@ game = CheckersGame()
 @app.route('/')
 def home():
     """Página principal do jogo."""
+    # Identidade do navegador: os ratings da partida rápida ficam no servidor por player_id
+    if 'player_id' not in session:
+        session.permanent = True
+        session['player_id'] = secrets.token_urlsafe(16)
     return render_template('index.html')
 
 @app.route('/configure', methods=['POST'])
 def configure():
     """Configura o jogo."""
+    game = get_session_game(create=True)
     data = request.get_json()
     game.configure_game(
         data.get('player1_name', 'Jogador 1'),
         data.get('player2_name', 'Jogador 2'),
-        data.get('mode', 'pvp')
+        data.get('mode', 'pvp'),
+        data.get('difficulty')
     )
+    game.start_clock()
+    if data.get('encoding') in BOARD_ENCODINGS:
+        session['board_encoding'] = data['encoding']
     return jsonify({"status": "success"})
 
+# ETag do /game-state: versão do estado e formato (o prefixo muda a cada processo)
+STATE_ETAG_PREFIX = secrets.token_hex(4)
+
 @app.route('/game-state', methods=['GET'])
 def get_game_state():
-    """Retorna estado do jogo."""
-    return jsonify(game.get_state())
+    """
+    Retorna estado do jogo, ou 304 se o cliente já tem esta versão
+    (``If-None-Match``). O relógio muda sem mudar a versão: vai sempre no
+    cabeçalho ``X-Clock``. Sem partida na sessão, o estado inicial.
+    """
+    game = get_session_game() or default_game
+    encoding = 'packed' if session.get('board_encoding') == 'packed' else 'list'
+    etag = f'{STATE_ETAG_PREFIX}-{game.state_version}-{encoding}'
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = state_response(session_state(game))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    clock = game.get_clock()
+    if clock is not None:
+        response.headers['X-Clock'] = str(clock)
+    return response
 
 @app.route('/move', methods=['POST'])
 def move():
     """Executa um movimento."""
+    game = get_session_game(create=True)
     data = request.get_json()
     
     if not data or not all(k in data for k in ("start_row", "start_col", "end_row", "end_col")):
@@ -552,12 +300,14 @@ def move():
         start_c = int(data['start_col'])
         end_r = int(data['end_row'])
         end_c = int(data['end_col'])
-        move_time = float(data.get('move_time', 0))
     except ValueError:
         return jsonify({"error": "Os valores devem ser válidos."}), 400
 
-    result = game.move_piece(start_r, start_c, end_r, end_c, move_time)
+    # Tempo do lance medido pelo relógio do servidor
+    result = game.move_piece(start_r, start_c, end_r, end_c)
     success = result[0]
+    if success:
+        count_move()
     message = result[1]
     time_analysis = result[2]
     captured_pos = result[3] if len(result) > 3 else None
@@ -566,61 +316,139 @@ def move():
         response_data = {
             "status": "success", 
             "message": message, 
-            "game_state": game.get_state(),
+            "game_state": session_state(game),
             "time_analysis": time_analysis
         }
         # Adicionar posição da peça capturada se houver
         if captured_pos:
             response_data["captured_pos"] = {"row": captured_pos[0], "col": captured_pos[1]}
-        return jsonify(response_data), 200
+        return state_response(response_data)
     else:
         # Debug: log do erro para identificar problema
         print(f"❌ Movimento inválido: ({start_r},{start_c}) -> ({end_r},{end_c}) | Turno: {game.turn} | Erro: {message}")
-        print(f"   Peça na origem: {game.board[start_r][start_c]}")
+        print(f"   Peça na origem: {game.board[start_r * 8 + start_c]}")
         print(f"   Capturas possíveis desta peça: {game.get_captures(start_r, start_c)}")
         print(f"   Movimentos simples possíveis: {game.get_simple_moves(start_r, start_c)}")
         return jsonify({"status": "error", "message": message}), 400
 
-@app.route('/ai-move', methods=['POST'])
-def ai_move():
-    """IA faz um movimento."""
-    if game.mode != 'pvc' or game.turn != P2:
-        return jsonify({"error": "Não é a vez da IA."}), 400
+@registry.timed('damas_ai_turn_duration_seconds')
+def play_ai_turn(target_game, encoding=None):
+    """
+    Calcula a jogada da IA no ai_pool (fora do loop do eventlet) e executa a
+    sequência inteira. Retorna (payload, status_http).
+    """
+    if target_game.mode != 'pvc' or target_game.turn != P2 or target_game.winner:
+        return {"error": "Não é a vez da IA."}, 400
+    
+    position_key = target_game.position_key()
+    # Final na tablebase ou abertura no livro: consulta em vez de busca
+    path = target_game.get_tablebase_move()
+    if path is None and opening_book is not None:
+        path = opening_book.choose(position_key, target_game.get_bitboard(), P2)
+    if path is None:
+        try:
+            path = ai_pool.search(target_game.get_position(), target_game.difficulty)
+        except AIPoolBusy:
+            return {"error": "Servidor ocupado. Tente novamente."}, 503
+    
+    # A posição pode ter mudado enquanto a busca rodava (reset, timeout...)
+    if target_game.position_key() != position_key or target_game.turn != P2:
+        return {"error": "A posição mudou durante a jogada da IA."}, 409
+    target_game.set_ai_plan(path)
     
-    ai_move = game.get_ai_move()
-    if ai_move:
+    ai_move = target_game.get_ai_move()
+    success = False
+    move_time = random.uniform(3, 8)
+    # A IA executa a sequência de captura inteira (lei da maioria) na mesma requisição
+    while ai_move:
         start_r, start_c, end_r, end_c = ai_move
-        success, message, time_analysis = game.move_piece(start_r, start_c, end_r, end_c, random.uniform(3, 8))
-        
+        success, message, time_analysis, captured_pos = target_game.move_piece(start_r, start_c, end_r, end_c, move_time)
+        move_time = 0
         if success:
-            return jsonify({"status": "success", "game_state": game.get_state()}), 200
+            count_move()
+        if not success or target_game.winner or target_game.turn != P2:
+            break
+        ai_move = target_game.get_ai_move()
+    
+    if success:
+        return {"status": "success", "game_state": target_game.get_state(encoding)}, 200
     
-    return jsonify({"error": "IA não encontrou movimento válido."}), 400
+    return {"error": "IA não encontrou movimento válido."}, 400
+
+@app.route('/ai-move', methods=['POST'])
+def ai_move():
+    """IA faz um movimento."""
+    game = get_session_game()
+    if game is None:
+        return jsonify(NO_GAME_ERROR), 400
+    payload, status = play_ai_turn(game, session.get('board_encoding'))
+    return state_response(payload, status)
 
 @app.route('/timeout', methods=['POST'])
 def timeout():
-    """Passa a vez quando o tempo acaba."""
-    game.turn = P2 if game.turn == P1 else P1
-    game.check_winner()
-    return jsonify({"status": "success", "game_state": game.get_state()})
+    """
+    Passa a vez quando o tempo acaba. O relógio é do servidor: antes do
+    prazo a vez não muda e o cliente recebe o tempo restante.
+    """
+    game = get_session_game()
+    if game is None:
+        return jsonify(NO_GAME_ERROR), 400
+    timed_out = game.clock_expired()
+    if timed_out:
+        game.timeout_turn()
+    return state_response({"status": "success", "timed_out": timed_out, "game_state": session_state(game)})
 
 @app.route('/surrender', methods=['POST'])
 def surrender():
     """Jogador desiste."""
+    game = get_session_game()
+    if game is None:
+        return jsonify(NO_GAME_ERROR), 400
     game.surrender(game.turn)
-    return jsonify({"status": "success", "game_state": game.get_state()})
+    return state_response({"status": "success", "game_state": session_state(game)})
 
 @app.route('/reset', methods=['POST'])
 def reset_game():
     """Reinicia o jogo."""
+    game = get_session_game(create=True)
     p1_name = game.player1_name
     p2_name = game.player2_name
     mode = game.mode
+    difficulty = game.difficulty
     
     game.initialize_board()
-    game.configure_game(p1_name, p2_name, mode)
+    game.configure_game(p1_name, p2_name, mode, difficulty)
+    game.start_clock()
     
-    return jsonify({"status": "success", "game_state": game.get_state()})
+    return state_response({"status": "success", "game_state": session_state(game)})
+
+@app.route('/analyze', methods=['POST'])
+def analyze_positions():
+    """
+    Analisa posições em lote: {"positions": [{"board": <compacto>, "turn": 1}],
+    "depth": 6}. Retorna jogadas legais, avaliação e melhor jogada de cada uma.
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('positions'), list):
+        return jsonify({"error": "Parâmetros inválidos."}), 400
+    positions = data['positions']
+    if len(positions) > ANALYZE_MAX_POSITIONS:
+        return jsonify({"error": f"Máximo de {ANALYZE_MAX_POSITIONS} posições por pedido."}), 400
+
+    try:
+        depth = max(1, min(int(data.get('depth', ANALYZE_DEPTH)), ANALYZE_MAX_DEPTH))
+        items = [(str(position['board']), int(position.get('turn', P1))) for position in positions]
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return jsonify({"error": "Os valores devem ser válidos."}), 400
+
+    start = time.perf_counter()
+    try:
+        results = ai_pool.analyze(items, depth, ANALYZE_TIME)
+    except AIPoolBusy:
+        return jsonify({"error": "Servidor ocupado. Tente novamente."}), 503
+    if results is None:
+        return jsonify({"error": "Análise não concluída. Tente um lote menor."}), 503
+    return jsonify({"results": results, "elapsed": round(time.perf_counter() - start, 3)})
 
 # ========================================
 # ROTAS MULTIPLAYER
@@ -628,53 +456,398 @@ def reset_game():
 
 @app.route('/rooms', methods=['GET'])
 def get_rooms():
-    """Retorna lista de salas disponíveis."""
-    rooms = game_manager.get_available_rooms()
-    return jsonify({"rooms": rooms})
+    """Retorna uma página de salas disponíveis (?cursor=...&limit=...)."""
+    try:
+        page = game_manager.get_available_rooms(
+            request.args.get('cursor'),
+            request.args.get('limit', LOBBY_PAGE_SIZE)
+        )
+    except ValueError:
+        return jsonify({"error": "Parâmetros inválidos."}), 400
+    return jsonify(page)
+
+@app.route('/matchmaking/stats', methods=['GET'])
+def get_matchmaking_stats():
+    """Fila da partida rápida: tamanho, pareamentos/s e espera média."""
+    return jsonify(game_manager.matchmaking.get_stats())
+
+@app.route('/rooms/stats', methods=['GET'])
+def get_rooms_stats():
+    """Salas monitoradas e salas/partidas recuperadas pela expiração."""
+    return jsonify({
+        "rooms_tracked": len(game_manager.deadlines),
+        "local_games": len(local_games),
+        "local_games_evicted": local_games.evicted,
+        **game_manager.expiry_stats
+    })
+
+# ========================================
+# REGISTRO DE PARTIDAS
+# ========================================
+
+# Log só de acréscimo com os lances de todas as partidas (GAME_LOG="" desliga);
+# um arquivo para todos os workers, cada registro gravado sob flock (com um
+# worker só, sem trava)
+game_log = GameLog(GAME_LOG_PATH, shared=game_manager.store.shared) if GAME_LOG_PATH else None
+
+def log_game_start(room):
+    if game_log:
+        game_log.start_game(room, room.tokens)
+
+def log_game_move(room, move, move_time):
+    if game_log:
+        game_log.record_move(room.room_id, room.game.seq, move, move_time)
+
+def log_game_timeout(room):
+    if game_log:
+        game_log.record_timeout(room.room_id, room.game.seq)
+
+def log_game_end(room_id, game=None, reason=None, player=None):
+    """Fim da partida; sem ``reason`` é deduzido do jogo (vitória/empate)."""
+    if not game_log:
+        return
+    if reason is None:
+        reason = "draw" if game.draw else "winner"
+    game_log.end_game(room_id, game.winner if game else None, reason, player)
+
+def restore_logged_games():
+    """Recria as salas das partidas que estavam em andamento quando o processo parou."""
+    restored = 0
+    for room_id, game_id in game_log.unfinished_games().items():
+        try:
+            game, start = game_log.replay(game_id)
+        except (ValueError, KeyError) as e:
+            print(f"❌ Partida {game_id} não pôde ser reconstruída: {str(e)}")
+            game_log.end_game(room_id, reason="abandoned")
+            continue
+        if game.winner:
+            log_game_end(room_id, game)
+        else:
+            try:
+                if game_manager.restore_room(room_id, game, start.get("tokens", {})):
+                    restored += 1
+            except RoomConflict:
+                pass  # Outro worker que subiu junto já a recriou
+    if restored:
+        print(f"♻️ {restored} partida(s) restaurada(s) do log")
+
+def game_log_sync_loop():
+    """Green thread: fsync em lote do log de partidas."""
+    while True:
+        socketio.sleep(GAME_LOG_FSYNC_INTERVAL)
+        try:
+            game_log.sync()
+        except OSError as e:
+            print(f"❌ Erro ao gravar o log de partidas: {str(e)}")
+
+if game_log:
+    restore_logged_games()
+    socketio.start_background_task(game_log_sync_loop)
+
+# ========================================
+# EXPIRAÇÃO DE SALAS
+# ========================================
+
+EXPIRY_INTERVAL = int(os.environ.get('ROOM_EXPIRY_INTERVAL', 30))
+
+EXPIRY_MESSAGES = {
+    WAITING: "Sala expirada: nenhum adversário entrou.",
+    PLAYING: "Sala expirada por inatividade.",
+    FINISHED: "Sala encerrada."
+}
+
+def expire_rooms_loop():
+    """Green thread: remove salas vencidas e partidas locais ociosas; solta os caches das salas paradas."""
+    while True:
+        socketio.sleep(EXPIRY_INTERVAL)
+        try:
+            for room in game_manager.expire_rooms():
+                cancel_clock(room.room_id)
+                log_game_end(room.room_id, reason="abandoned")
+                message = EXPIRY_MESSAGES.get(room.status, "Sala encerrada.")
+                payload = {
+                    'room_id': room.room_id,
+                    'status': room.status,
+                    'message': message
+                }
+                socketio.emit('room_expired', payload, room=room.room_id)
+                socketio.emit('room_expired', payload, room=watch_room(room.room_id))
+                socketio.close_room(room.room_id)
+                socketio.close_room(watch_room(room.room_id))
+            game_manager.release_idle_rooms()
+            local_games.cleanup_idle_games()
+        except Exception as e:
+            print(f"❌ Erro na expiração de salas: {str(e)}")
+
+socketio.start_background_task(expire_rooms_loop)
+
+# ========================================
+# PARTIDA RÁPIDA
+# ========================================
+
+MATCH_INTERVAL = float(os.environ.get('MATCH_INTERVAL', 1))
+
+def start_match(host, guest):
+    """Cria a sala de um par da fila e avisa os dois jogadores."""
+    room = game_manager.create_match(host, guest)
+    log_game_start(room)
+    schedule_clock(room)
+    for entry in (host, guest):
+        # Fora do handler do próprio jogador: entra na sala pelo servidor
+        socketio.server.enter_room(entry.sid, room.room_id, namespace='/')
+        socketio.emit('room_joined', {
+            'room_id': room.room_id,
+            'player1_name': room.host_name,
+            'player2_name': room.guest_name,
+            'your_sid': entry.sid,
+            'is_player1': entry.sid == room.player1_sid,
+            'rating': entry.rating,
+            'rejoin_token': room.tokens['host' if entry is host else 'guest']
+        }, room=entry.sid)
+    emit_room_state(room, 'game_state')
+    socketio.emit('game_started', {'message': 'Jogo iniciado!'}, room=room.room_id)
+    print(f"⚡ Partida rápida {room.room_id}: {host.name} ({host.rating}) x {guest.name} ({guest.rating})")
+
+def matchmaking_loop():
+    """Green thread: pareia quem está na fila conforme a janela de rating cresce."""
+    while True:
+        socketio.sleep(MATCH_INTERVAL)
+        try:
+            for host, guest in game_manager.matchmaking.pair_waiting():
+                start_match(host, guest)
+        except Exception as e:
+            print(f"❌ Erro no pareamento: {str(e)}")
+
+def finish_room(room):
+    """
+    Encerra a sala (``GameManager.finish_room``: grava e atualiza os
+    ratings) e para o relógio. Levanta ``RoomConflict`` se outro worker
+    gravou a sala antes; nada foi gravado e o relógio continua.
+    """
+    ratings = game_manager.finish_room(room)
+    cancel_clock(room.room_id)
+    return ratings
+
+socketio.start_background_task(matchmaking_loop)
+
+# ========================================
+# ESPECTADORES
+# ========================================
+
+# Intervalo do controle de lentidão (limite em SPECTATOR_MAX_BACKLOG, no game_manager)
+SPECTATOR_CHECK_INTERVAL = float(os.environ.get('SPECTATOR_CHECK_INTERVAL', 2))
+
+def watch_room(room_id):
+    """Sala Socket.IO dos espectadores (separada da sala dos jogadores)."""
+    return f'{room_id}:watch'
+
+def emit_spectators(room, event, extra=None):
+    """
+    Envia o estado completo a todos os espectadores com um único emit: o
+    estado é montado uma vez (tabuleiro compacto), não uma vez por cliente.
+    Sempre emite: com vários workers os espectadores podem estar em outro
+    processo (a fila de mensagens os alcança) e a contagem daqui não os vê.
+    """
+    state = room.game.get_state('packed')
+    payload = dict(extra, game_state=state) if extra is not None else state
+    socketio.emit(event, payload, room=watch_room(room.room_id))
+
+def spectator_backpressure_loop():
+    """
+    Green thread: espectador lento sai da sala de transmissão (os lances
+    deixam de se acumular para ele); quando confirma o que já estava a
+    caminho, recebe o estado atual e volta a receber os lances
+    (``GameManager.check_spectator_backlog``).
+    """
+    while True:
+        socketio.sleep(SPECTATOR_CHECK_INTERVAL)
+        try:
+            paused, resumed = game_manager.check_spectator_backlog()
+            for sid, room in paused:
+                socketio.server.leave_room(sid, watch_room(room.room_id), namespace='/')
+            for sid, room in resumed:
+                socketio.emit('game_state', room.game.get_state('packed'), room=sid)
+                socketio.server.enter_room(sid, watch_room(room.room_id), namespace='/')
+        except Exception as e:
+            print(f"❌ Erro no controle de espectadores: {str(e)}")
+
+socketio.start_background_task(spectator_backpressure_loop)
+
+# ========================================
+# RELÓGIOS
+# ========================================
+
+# Um timer do hub do eventlet por sala, no prazo da vez atual
+clock_timers = {}
+
+def schedule_clock(room):
+    """(Re)agenda a queda de bandeira da sala para o prazo da vez atual."""
+    cancel_clock(room.room_id)
+    deadline = room.game.turn_deadline() if room.game else None
+    if deadline is None:
+        return
+    clock_timers[room.room_id] = eventlet.spawn_after(
+        max(0, deadline - time.time()), flag_fall, room.room_id, deadline)
+
+def cancel_clock(room_id):
+    timer = clock_timers.pop(room_id, None)
+    if timer is not None:
+        timer.cancel()
+
+def flag_fall(room_id, deadline):
+    """Prazo da vez esgotado: passa a vez e avisa jogadores e espectadores."""
+    clock_timers.pop(room_id, None)
+    loop_monitor.enter('flag_fall', room_id)
+    try:
+        room = game_manager.get_room(room_id)
+        if not room or not room.game or room.status != PLAYING:
+            return
+        if room.game.turn_deadline() != deadline:
+            # Houve lance depois do agendamento (talvez em outro worker)
+            schedule_clock(room)
+            return
+        room.game.timeout_turn()
+        try:
+            if room.game.winner:
+                ratings = finish_room(room)
+            else:
+                game_manager.save_room(room)
+        except RoomConflict:
+            room = game_manager.get_room(room_id)
+            if room and room.game:
+                schedule_clock(room)
+            return
+        log_game_timeout(room)
+        
+        player_name = room.game.player2_name if room.game.turn == P1 else room.game.player1_name
+        extra = {'message': f'⏰ Tempo esgotado para {player_name}!'}
+        if room.game.winner:
+            log_game_end(room_id, room.game)
+            emit_room_state(room, 'game_over', {'winner': room.game.winner, 'ratings': ratings})
+            emit_spectators(room, 'game_over', {'winner': room.game.winner})
+            return
+        emit_room_state(room, 'turn_timeout', extra)
+        emit_spectators(room, 'turn_timeout', extra)
+        schedule_clock(room)
+    except Exception as e:
+        print(f"❌ Erro no relógio da sala {room_id}: {str(e)}")
+    finally:
+        loop_monitor.exit()
+        game_manager.park_room(room_id)
+
+# ========================================
+# RECONEXÃO
+# ========================================
+
+# Segundos que o lugar de um jogador que caiu fica guardado para o rejoin_room
+REJOIN_GRACE = int(os.environ.get('REJOIN_GRACE', 30))
+
+# Lugares guardados: {(room_id, "host"/"guest"): timer que libera o lugar}
+seat_timers = {}
+
+def hold_seat(sid):
+    """
+    Jogador caiu no meio da sala: o lugar fica guardado por ``REJOIN_GRACE``
+    segundos (o relógio da partida continua). Retorna False se não há lugar
+    a guardar.
+    """
+    room_id = game_manager.store.get_player_room(sid)
+    room = game_manager.get_room(room_id) if room_id else None
+    if room is None or room.status == FINISHED:
+        return False
+    if sid == room.host_sid:
+        side, name = "host", room.host_name
+    elif sid == room.guest_sid:
+        side, name = "guest", room.guest_name
+    else:
+        return False
+    cancel_seat_timer(room_id, side)
+    seat_timers[(room_id, side)] = eventlet.spawn_after(REJOIN_GRACE, release_seat, room_id, side, sid)
+    socketio.emit('player_disconnected', {
+        'message': f'{name} perdeu a conexão. Aguardando a volta ({REJOIN_GRACE}s)...'
+    }, room=room_id, skip_sid=sid)
+    return True
+
+def cancel_seat_timer(room_id, side):
+    timer = seat_timers.pop((room_id, side), None)
+    if timer is not None:
+        timer.cancel()
+
+def release_seat(room_id, side, sid):
+    """Fim do prazo de reconexão: o jogador não voltou e sai da sala."""
+    seat_timers.pop((room_id, side), None)
+    loop_monitor.enter('release_seat', room_id)
+    try:
+        leave_seat(sid)
+    except Exception as e:
+        print(f"❌ Erro ao liberar o lugar na sala {room_id}: {str(e)}")
+    finally:
+        loop_monitor.exit()
+        game_manager.park_room(room_id)
+
+def leave_seat(sid):
+    """Tira o jogador da sala (host fecha a sala, guest libera a vaga) e avisa os outros."""
+    result = game_manager.leave_room(sid)
+    if not result:
+        return
+    room_id, player_type = result
+    cancel_clock(room_id)
+    log_game_end(room_id, reason="abandoned")
+    if player_type == "host":
+        # Notificar guest que o host saiu
+        room = game_manager.get_room(room_id)
+        if room and room.guest_sid:
+            socketio.emit('host_left', {'message': 'O host saiu da sala'}, room=room.guest_sid)
+        # A sala foi removida: encerra a transmissão aos espectadores
+        socketio.emit('spectate_ended', {'message': 'A partida foi encerrada.'}, room=watch_room(room_id))
+        socketio.close_room(watch_room(room_id))
+    else:
+        # Notificar host que o guest saiu
+        room = game_manager.get_room(room_id)
+        if room and room.host_sid:
+            socketio.emit('guest_left', {'message': 'O adversário saiu da sala'}, room=room.host_sid)
+            socketio.emit('guest_left', {'message': 'O adversário saiu da sala'}, room=watch_room(room_id))
 
 # ========================================
 # WEBSOCKET EVENTS - MULTIPLAYER
 # ========================================
 
-@socketio.on('connect')
-def handle_connect():
+@socket_event('connect')
+def handle_connect(auth=None):
     """Quando um cliente se conecta."""
+    global connected_sockets
+    connected_sockets += 1
     try:
         print(f"✅ Cliente conectado: {request.sid}")
         emit('connected', {'message': 'Conectado ao servidor!'})
     except Exception as e:
         print(f"❌ Erro ao conectar cliente {request.sid}: {str(e)}")
 
-@socketio.on('ping')
+@socket_event('ping')
 def handle_ping():
     """Responde a ping para manter conexão viva."""
     emit('pong')
 
-@socketio.on('disconnect')
-def handle_disconnect():
+@socket_event('disconnect')
+def handle_disconnect(reason=None):
     """Quando um cliente se desconecta."""
+    global connected_sockets
+    connected_sockets -= 1
     try:
         print(f"❌ Cliente desconectado: {request.sid}")
-        result = game_manager.leave_room(request.sid)
-        if result:
-            room_id, player_type = result
-            if player_type == "host":
-                # Notificar guest que o host saiu
-                room = game_manager.get_room(room_id)
-                if room and room.guest_sid:
-                    socketio.emit('host_left', {'message': 'O host saiu da sala'}, room=room.guest_sid)
-            else:
-                # Notificar host que o guest saiu
-                room = game_manager.get_room(room_id)
-                if room and room.host_sid:
-                    socketio.emit('guest_left', {'message': 'O adversário saiu da sala'}, room=room.host_sid)
-                    room.status = "waiting"
-                    room.guest_name = None
-                    room.guest_sid = None
+        game_manager.matchmaking.cancel(request.sid)
+        spectated = game_manager.remove_spectator(request.sid)
+        if spectated:
+            socketio.emit('spectators_update', {
+                'count': game_manager.spectator_count(spectated)
+            }, room=spectated)
+        # Saída pelo menu libera o lugar na hora; queda de conexão espera a volta
+        if reason == socketio.server.reason.CLIENT_DISCONNECT or not hold_seat(request.sid):
+            leave_seat(request.sid)
     except Exception as e:
         print(f"❌ Erro ao desconectar cliente {request.sid}: {str(e)}")
 
-@socketio.on('create_room')
+@socket_event('create_room')
 def handle_create_room(data):
     """Cria uma nova sala de jogo."""
     try:
@@ -703,17 +876,19 @@ def handle_create_room(data):
             })
             return
         
-        room.game = CheckersGame()
-        room.game.configure_game(room.host_name, "Aguardando...", "multiplayer")
+        if data.get('encoding') in BOARD_ENCODINGS:
+            room.encodings[request.sid] = data['encoding']
+            game_manager.save_room(room)
         
         join_room(room_id)
         emit('room_created', {
             'room_id': room_id,
-            'message': f'Sala {room_id} criada com sucesso!'
+            'message': f'Sala {room_id} criada com sucesso!',
+            'rejoin_token': room.tokens['host']
         })
         
         # Enviar estado inicial
-        emit('game_state', room.game.get_state())
+        emit('game_state', room.game.get_state(room.encodings.get(request.sid)))
         
         print(f"✅ Sala {room_id} criada por {player_name} (SID: {request.sid})")
         
@@ -723,7 +898,7 @@ def handle_create_room(data):
             'message': f'Erro ao criar sala: {str(e)}'
         })
 
-@socketio.on('join_room')
+@socket_event('join_room')
 def handle_join_room(data):
     """Entra em uma sala existente."""
     room_id = data.get('room_id', '').upper()
@@ -734,14 +909,18 @@ def handle_join_room(data):
     if success:
         room = game_manager.get_room(room_id)
         join_room(room_id)
+        if data.get('encoding') in BOARD_ENCODINGS:
+            room.encodings[request.sid] = data['encoding']
         print(f"✅ Jogador '{player_name}' entrou na sala {room_id} | SID: {request.sid}")
         
-        # Configurar o jogo com os nomes dos jogadores
-        room.game = CheckersGame()
-        room.game.configure_game(room.host_name, room.guest_name, "multiplayer")
+        # O jogo da sala já está com os nomes dos dois jogadores
+        room.game.start_clock()
         
         # Atribuir lados aos jogadores
         p1_sid, p2_sid = game_manager.assign_player_sides(room)
+        game_manager.save_room(room)
+        log_game_start(room)
+        schedule_clock(room)
         
         # Notificar ambos os jogadores
         emit('room_joined', {
@@ -749,23 +928,158 @@ def handle_join_room(data):
             'player1_name': room.host_name,
             'player2_name': room.guest_name,
             'your_sid': request.sid,
-            'is_player1': request.sid == p1_sid
+            'is_player1': request.sid == p1_sid,
+            'rejoin_token': room.tokens['guest']
         })
         
         # Enviar estado do jogo para ambos
-        socketio.emit('game_state', room.game.get_state(), room=room_id)
+        emit_room_state(room, 'game_state')
         socketio.emit('game_started', {'message': 'Jogo iniciado!'}, room=room_id)
     else:
         print(f"❌ Erro ao entrar na sala {room_id} | SID: {request.sid} | Motivo: {message}")
         emit('join_error', {'message': message})
 
-@socketio.on('get_rooms')
-def handle_get_rooms():
-    """Retorna lista de salas disponíveis."""
-    rooms = game_manager.get_available_rooms()
-    emit('rooms_list', {'rooms': rooms})
+@socket_event('quick_match')
+def handle_quick_match(data):
+    """Entra na fila da partida rápida (pareamento por rating)."""
+    player_name = (data.get('player_name') or '').strip()
+    if len(player_name) < 2:
+        emit('match_error', {'message': 'Nome inválido! Deve ter pelo menos 2 caracteres.'})
+        return
+    if game_manager.get_room_by_socket(request.sid):
+        emit('match_error', {'message': 'Você já está em uma sala!'})
+        return
+    # Rating guardado no servidor (o cliente não informa o próprio rating)
+    player_id = session.get('player_id')
+    rating = game_manager.get_rating(player_id)
+    
+    encoding = data.get('encoding') if data.get('encoding') in BOARD_ENCODINGS else None
+    pair = game_manager.matchmaking.enqueue(request.sid, player_name, rating, encoding=encoding,
+                                            player_id=player_id)
+    if pair:
+        start_match(*pair)
+    else:
+        emit('match_waiting', {
+            'message': 'Procurando adversário...',
+            'queued': len(game_manager.matchmaking),
+            'rating': rating
+        })
+
+@socket_event('cancel_quick_match')
+def handle_cancel_quick_match():
+    """Sai da fila da partida rápida."""
+    game_manager.matchmaking.cancel(request.sid)
+    emit('match_cancelled', {'message': 'Busca cancelada.'})
+
+@socket_event('rejoin_room')
+def handle_rejoin_room(data):
+    """Volta à sala depois de reconectar (ou de o servidor reiniciar)."""
+    room_id = (data.get('room_id') or '').upper()
+    room, side = game_manager.rejoin_room(room_id, data.get('token'), request.sid)
+    if room is None:
+        emit('rejoin_error', {'message': side})
+        return
+    cancel_seat_timer(room_id, side)
+    
+    join_room(room_id)
+    if room.game and room.status == PLAYING and not room.game.winner:
+        if room.game.turn_started is None:
+            # Partida restaurada do log: o relógio recomeça na volta
+            room.game.start_clock()
+            game_manager.save_room(room)
+        if room_id not in clock_timers:
+            schedule_clock(room)
+    emit('room_joined', {
+        'room_id': room_id,
+        'player1_name': room.host_name,
+        'player2_name': room.guest_name or WAITING_GUEST_NAME,
+        'your_sid': request.sid,
+        'is_player1': request.sid == room.player1_sid,
+        'rejoin_token': data.get('token')
+    })
+    if room.game:
+        emit('game_state', room.game.get_state(room.encodings.get(request.sid)))
+    socketio.emit('player_rejoined', {
+        'message': f'{room.host_name if side == "host" else room.guest_name} voltou à partida.'
+    }, room=room_id, skip_sid=request.sid)
+
+@socket_event('spectate_room')
+def handle_spectate_room(data):
+    """Entra como espectador (só recebe os lances)."""
+    room_id = (data.get('room_id') or '').upper()
+    name = (data.get('player_name') or 'Espectador').strip()[:30]
+    
+    room, message = game_manager.add_spectator(room_id, request.sid, name)
+    if room is None:
+        emit('spectate_error', {'message': message})
+        return
+    
+    join_room(watch_room(room_id))
+    count = game_manager.spectator_count(room_id)
+    emit('spectating', {
+        'room_id': room_id,
+        'player1_name': room.game.player1_name,
+        'player2_name': room.game.player2_name,
+        'spectators': count
+    })
+    emit('game_state', room.game.get_state('packed'))
+    socketio.emit('spectators_update', {'count': count}, room=room_id)
+
+@socket_event('stop_spectating')
+def handle_stop_spectating():
+    """Sai da transmissão da partida."""
+    room_id = game_manager.remove_spectator(request.sid)
+    if room_id:
+        leave_room(watch_room(room_id))
+        socketio.emit('spectators_update', {
+            'count': game_manager.spectator_count(room_id)
+        }, room=room_id)
+
+@socket_event('spectator_ack')
+def handle_spectator_ack(data):
+    """Espectador confirma o último lance aplicado (``{seq}``), para o controle de lentidão."""
+    try:
+        seq = int((data or {}).get('seq'))
+    except (TypeError, ValueError):
+        return
+    game_manager.ack_spectator(request.sid, seq)
+
+@socket_event('admin_profiler')
+def handle_admin_profiler(data):
+    """Profiler do loop pelo socket: {token, action, interval}."""
+    data = data or {}
+    if not is_admin(data.get('token')):
+        emit('admin_error', {'message': 'Acesso negado.'})
+        return
+    report, error = profiler_command(data)
+    if error:
+        emit('admin_error', {'message': error})
+    else:
+        emit('profiler_report', report)
 
-@socketio.on('make_move')
+@socket_event('get_rooms')
+def handle_get_rooms(data=None):
+    """Retorna uma página de salas disponíveis."""
+    data = data or {}
+    try:
+        page = game_manager.get_available_rooms(data.get('cursor'), data.get('limit', LOBBY_PAGE_SIZE))
+    except (ValueError, TypeError):
+        emit('rooms_list', {'rooms': [], 'next_cursor': None})
+        return
+    emit('rooms_list', page)
+
+@socket_event('lobby_subscribe')
+def handle_lobby_subscribe():
+    """Passa a receber 'room_added'/'room_removed' e recebe a primeira página."""
+    join_room(LOBBY_ROOM)
+    emit('rooms_list', game_manager.get_available_rooms())
+
+@socket_event('lobby_unsubscribe')
+def handle_lobby_unsubscribe():
+    """Para de receber as atualizações do lobby."""
+    leave_room(LOBBY_ROOM)
+
+@socket_event('make_move')
 def handle_make_move(data):
     """Processa um movimento no jogo multiplayer."""
     room = game_manager.get_room_by_socket(request.sid)
@@ -787,60 +1101,112 @@ def handle_make_move(data):
         start_c = int(data['start_col'])
         end_r = int(data['end_row'])
         end_c = int(data['end_col'])
-        move_time = float(data.get('move_time', 0))
     except (ValueError, KeyError):
         emit('move_error', {'message': 'Parâmetros inválidos!'})
         return
     
-    # Executar movimento
+    # Executar movimento (tempo medido pelo relógio do servidor)
+    turn_started = room.game.turn_started
+    move_time = time.time() - turn_started if turn_started is not None else 0
     result = room.game.move_piece(start_r, start_c, end_r, end_c, move_time)
     success = result[0]
     message = result[1]
     time_analysis = result[2]
-    captured_pos = result[3] if len(result) > 3 else None
     
     if success:
+        count_move()
+        ratings = None
+        try:
+            if room.game.winner:
+                ratings = finish_room(room)
+            else:
+                game_manager.save_room(room)
+        except RoomConflict:
+            # Outro worker gravou a sala antes: o lance é descartado
+            room = game_manager.get_room(room.room_id)
+            emit('move_error', {'message': 'A partida mudou. Sincronizando...'})
+            if room and room.game:
+                emit('game_state', room.game.get_state(room.encodings.get(request.sid)))
+            return
+        
+        log_game_move(room, (start_r, start_c, end_r, end_c), move_time)
+        if room.game.winner:
+            log_game_end(room.room_id, room.game)
+        else:
+            schedule_clock(room)
+        
+        # Só o delta do lance; o estado completo vai no join e no 'request_sync'
         response_data = {
             "status": "success",
             "message": message,
-            "game_state": room.game.get_state(),
+            "delta": room.game.get_move_delta(),
             "time_analysis": time_analysis
         }
         
-        if captured_pos:
-            response_data["captured_pos"] = {"row": captured_pos[0], "col": captured_pos[1]}
-        
-        # Enviar para todos na sala
+        # Enviar para todos na sala e, num único emit, para os espectadores
         socketio.emit('move_result', response_data, room=room.room_id)
+        socketio.emit('move_result', response_data, room=watch_room(room.room_id))
         
         # Verificar se há vencedor
         if room.game.winner:
-            socketio.emit('game_over', {
-                'winner': room.game.winner,
-                'game_state': room.game.get_state()
-            }, room=room.room_id)
-            room.status = "finished"
+            emit_room_state(room, 'game_over', {'winner': room.game.winner, 'ratings': ratings})
+            emit_spectators(room, 'game_over', {'winner': room.game.winner})
     else:
         emit('move_error', {'message': message})
 
-@socketio.on('surrender')
-def handle_surrender():
-    """Jogador desiste."""
+@socket_event('request_sync')
+def handle_request_sync():
+    """Reenvia o estado completo (cliente detectou um lance perdido)."""
     room = game_manager.get_room_by_socket(request.sid)
+    if room is None:
+        # Espectador: sempre no formato compacto
+        room = game_manager.get_spectator_room(request.sid)
+        if room and room.game:
+            emit('game_state', room.game.get_state('packed'))
+            return
     
     if not room or not room.game:
-        emit('error', {'message': 'Você não está em uma sala!'})
+        emit('move_error', {'message': 'Você não está em uma sala!'})
         return
     
-    is_player1 = request.sid == room.player1_sid
-    room.game.surrender(P1 if is_player1 else P2)
+    emit('game_state', room.game.get_state(room.encodings.get(request.sid)))
+
+# Tentativas de gravar a desistência quando outro worker grava a sala junto
+SURRENDER_RETRIES = 3
+
+@socket_event('surrender')
+def handle_surrender():
+    """Jogador desiste."""
+    for _ in range(SURRENDER_RETRIES):
+        room = game_manager.get_room_by_socket(request.sid)
+        
+        if not room or not room.game:
+            emit('error', {'message': 'Você não está em uma sala!'})
+            return
+        
+        if room.game.winner:
+            # A partida terminou antes (ex.: lance gravado por outro worker)
+            emit('game_state', room.game.get_state(room.encodings.get(request.sid)))
+            return
+        
+        player = P1 if request.sid == room.player1_sid else P2
+        room.game.surrender(player)
+        try:
+            ratings = finish_room(room)
+            break
+        except RoomConflict:
+            continue  # Outro worker gravou a sala: relê e tenta de novo
+    else:
+        emit('move_error', {'message': 'A partida mudou. Tente desistir de novo.'})
+        room = game_manager.get_room_by_socket(request.sid)
+        if room and room.game:
+            emit('game_state', room.game.get_state(room.encodings.get(request.sid)))
+        return
     
-    socketio.emit('game_over', {
-        'winner': room.game.winner,
-        'game_state': room.game.get_state()
-    }, room=room.room_id)
+    log_game_end(room.room_id, room.game, "surrender", player)
     
-    room.status = "finished"
+    emit_room_state(room, 'game_over', {'winner': room.game.winner, 'ratings': ratings})
+    emit_spectators(room, 'game_over', {'winner': room.game.winner})
 
 if __name__ == '__main__':
     import os
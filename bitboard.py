@@ -0,0 +1,486 @@
+"""
+Motor compacto de regras baseado em bitboards.
+
+Só as 32 casas escuras do tabuleiro 8x8 podem conter peças, então cada
+conjunto de peças (pedras/damas de cada jogador) cabe em um inteiro de 32 bits.
+A casa escura (row, col) recebe o índice ``row * 4 + col // 2``.
+
+A geração de movimentos das pedras é feita com deslocamentos e máscaras
+pré-calculadas; as damas usam os raios diagonais pré-calculados.
+As regras são as mesmas do ``CheckersGame`` (pedras andam e capturam só para
+frente, damas voam em qualquer distância).
+"""
+
+import base64
+import struct
+from collections import namedtuple
+
+EMPTY = 0
+P1 = 1
+P2 = 2
+P1_KING = 3
+P2_KING = 4
+
+SQUARES = 32
+FULL_MASK = (1 << SQUARES) - 1
+
+# Direções diagonais: (delta_row, delta_col)
+UP_LEFT, UP_RIGHT, DOWN_LEFT, DOWN_RIGHT = range(4)
+DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+
+# Direções de avanço das pedras de cada jogador
+FORWARD = {
+    P1: (UP_LEFT, UP_RIGHT),
+    P2: (DOWN_LEFT, DOWN_RIGHT),
+}
+OPPOSITE = (DOWN_RIGHT, DOWN_LEFT, UP_RIGHT, UP_LEFT)
+
+# Formato compacto: os quatro bitboards como uint32 little-endian (16 bytes)
+PACKED_FORMAT = "<4I"
+
+SQUARE_ROW = tuple(sq // 4 for sq in range(SQUARES))
+SQUARE_COL = tuple(2 * (sq % 4) + (1 if (sq // 4) % 2 == 0 else 0) for sq in range(SQUARES))
+BIT = tuple(1 << sq for sq in range(SQUARES))
+# Posição da casa escura no tabuleiro de 64 casas do ``CheckersGame`` (linha a linha)
+SQUARE_CELL = tuple(SQUARE_ROW[sq] * 8 + SQUARE_COL[sq] for sq in range(SQUARES))
+
+
+def square_index(row, col):
+    """Retorna o índice (0-31) da casa escura, ou -1 se for casa clara/fora."""
+    if not (0 <= row < 8 and 0 <= col < 8) or (row + col) % 2 != 1:
+        return -1
+    return row * 4 + col // 2
+
+
+def square_coords(sq):
+    """Retorna (row, col) de um índice de casa escura."""
+    return SQUARE_ROW[sq], SQUARE_COL[sq]
+
+
+def _build_neighbors():
+    neighbors = []
+    for dr, dc in DIRECTIONS:
+        table = []
+        for sq in range(SQUARES):
+            table.append(square_index(SQUARE_ROW[sq] + dr, SQUARE_COL[sq] + dc))
+        neighbors.append(tuple(table))
+    return tuple(neighbors)
+
+
+def _build_rays():
+    rays = []
+    for d in range(4):
+        table = []
+        for sq in range(SQUARES):
+            ray = []
+            nxt = NEIGHBOR[d][sq]
+            while nxt != -1:
+                ray.append(nxt)
+                nxt = NEIGHBOR[d][nxt]
+            table.append(tuple(ray))
+        rays.append(tuple(table))
+    return tuple(rays)
+
+
+def _build_shifts():
+    """
+    Para cada direção, o deslocamento de índice depende da paridade da linha.
+    Guarda pares (máscara de origem, deslocamento) para linhas pares e ímpares.
+    """
+    shifts = []
+    for d in range(4):
+        pairs = []
+        for parity in (0, 1):
+            mask = 0
+            offset = None
+            for sq in range(SQUARES):
+                if SQUARE_ROW[sq] % 2 != parity or NEIGHBOR[d][sq] == -1:
+                    continue
+                mask |= BIT[sq]
+                offset = NEIGHBOR[d][sq] - sq
+            pairs.append((mask, offset))
+        shifts.append(tuple(pairs))
+    return tuple(shifts)
+
+
+NEIGHBOR = _build_neighbors()
+RAYS = _build_rays()
+SHIFTS = _build_shifts()
+
+ROW_MASK = tuple(sum(BIT[sq] for sq in range(SQUARES) if SQUARE_ROW[sq] == row) for row in range(8))
+PROMOTION_MASK = {P1: ROW_MASK[0], P2: ROW_MASK[7]}
+
+
+# Sequência completa de captura: casas visitadas (origem, pouso1, pouso2, ...)
+# e casas das peças capturadas, na ordem dos saltos.
+CapturePath = namedtuple("CapturePath", ["squares", "captured"])
+
+
+def shift(bits, d):
+    """Desloca todas as peças de ``bits`` uma casa na direção ``d``."""
+    result = 0
+    for mask, offset in SHIFTS[d]:
+        moved = bits & mask
+        if moved:
+            result |= (moved << offset) if offset > 0 else (moved >> -offset)
+    return result
+
+
+def iter_bits(bits):
+    """Itera os índices das casas marcadas em ``bits``."""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+
+def opponent(player):
+    return P2 if player == P1 else P1
+
+
+class BitBoard:
+    """Posição representada por quatro bitboards de 32 bits."""
+
+    __slots__ = ("p1_men", "p1_kings", "p2_men", "p2_kings")
+
+    def __init__(self, p1_men=0, p1_kings=0, p2_men=0, p2_kings=0):
+        self.p1_men = p1_men
+        self.p1_kings = p1_kings
+        self.p2_men = p2_men
+        self.p2_kings = p2_kings
+
+    @classmethod
+    def from_board(cls, board):
+        """Constrói a partir de uma matriz 8x8 (formato JSON do frontend)."""
+        bb = cls()
+        for sq in range(SQUARES):
+            piece = board[SQUARE_ROW[sq]][SQUARE_COL[sq]]
+            if piece != EMPTY:
+                bb.set_piece(sq, piece)
+        return bb
+
+    @classmethod
+    def from_cells(cls, cells):
+        """Constrói a partir das 64 casas (``bytearray``) do ``CheckersGame``."""
+        bb = cls()
+        for sq in range(SQUARES):
+            piece = cells[SQUARE_CELL[sq]]
+            if piece != EMPTY:
+                bb.set_piece(sq, piece)
+        return bb
+
+    def to_board(self):
+        """Reconstrói a matriz 8x8 (formato JSON do frontend)."""
+        board = [[EMPTY] * 8 for _ in range(8)]
+        for sq in range(SQUARES):
+            piece = self.piece_at(sq)
+            if piece != EMPTY:
+                board[SQUARE_ROW[sq]][SQUARE_COL[sq]] = piece
+        return board
+
+    def encode(self):
+        """
+        Posição compacta para o frontend: 16 bytes (p1_men, p1_kings, p2_men,
+        p2_kings como uint32 little-endian) em base64 - 24 caracteres.
+        """
+        return base64.b64encode(struct.pack(PACKED_FORMAT, *self.key())).decode("ascii")
+
+    @classmethod
+    def decode(cls, data):
+        """Inverso de ``encode``."""
+        return cls(*struct.unpack(PACKED_FORMAT, base64.b64decode(data)))
+
+    def copy(self):
+        return BitBoard(self.p1_men, self.p1_kings, self.p2_men, self.p2_kings)
+
+    def __eq__(self, other):
+        return isinstance(other, BitBoard) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def key(self):
+        return self.p1_men, self.p1_kings, self.p2_men, self.p2_kings
+
+    # ----------------------------------------
+    # Consultas
+    # ----------------------------------------
+
+    def occupied(self):
+        return self.p1_men | self.p1_kings | self.p2_men | self.p2_kings
+
+    def empty(self):
+        return ~self.occupied() & FULL_MASK
+
+    def men(self, player):
+        return self.p1_men if player == P1 else self.p2_men
+
+    def kings(self, player):
+        return self.p1_kings if player == P1 else self.p2_kings
+
+    def pieces(self, player):
+        if player == P1:
+            return self.p1_men | self.p1_kings
+        return self.p2_men | self.p2_kings
+
+    def piece_at(self, sq):
+        bit = BIT[sq]
+        if self.p1_men & bit:
+            return P1
+        if self.p2_men & bit:
+            return P2
+        if self.p1_kings & bit:
+            return P1_KING
+        if self.p2_kings & bit:
+            return P2_KING
+        return EMPTY
+
+    def piece_count(self):
+        return popcount(self.pieces(P1)), popcount(self.pieces(P2))
+
+    # ----------------------------------------
+    # Alterações
+    # ----------------------------------------
+
+    def set_piece(self, sq, piece):
+        self.clear(sq)
+        bit = BIT[sq]
+        if piece == P1:
+            self.p1_men |= bit
+        elif piece == P2:
+            self.p2_men |= bit
+        elif piece == P1_KING:
+            self.p1_kings |= bit
+        elif piece == P2_KING:
+            self.p2_kings |= bit
+
+    def clear(self, sq):
+        mask = ~BIT[sq]
+        self.p1_men &= mask
+        self.p1_kings &= mask
+        self.p2_men &= mask
+        self.p2_kings &= mask
+
+    # ----------------------------------------
+    # Geração de movimentos (uma casa de origem)
+    # ----------------------------------------
+
+    def captures(self, sq, player):
+        """
+        Capturas simples (um salto) da peça em ``sq``.
+        Retorna lista de (casa_destino, casa_capturada), na mesma ordem do
+        ``CheckersGame.get_captures``.
+        """
+        bit = BIT[sq]
+        enemy = self.pieces(opponent(player))
+        empty = self.empty()
+        result = []
+
+        if self.men(player) & bit:
+            for d in FORWARD[player]:
+                mid = NEIGHBOR[d][sq]
+                if mid == -1 or not enemy & BIT[mid]:
+                    continue
+                land = NEIGHBOR[d][mid]
+                if land != -1 and empty & BIT[land]:
+                    result.append((land, mid))
+            return result
+
+        if not self.kings(player) & bit:
+            return result
+
+        for d in range(4):
+            enemy_sq = -1
+            for nxt in RAYS[d][sq]:
+                nbit = BIT[nxt]
+                if empty & nbit:
+                    if enemy_sq != -1:
+                        result.append((nxt, enemy_sq))
+                elif enemy & nbit and enemy_sq == -1:
+                    enemy_sq = nxt
+                else:
+                    # Peça própria ou segunda peça inimiga bloqueia
+                    break
+        return result
+
+    def simple_moves(self, sq, player):
+        """Movimentos sem captura da peça em ``sq`` (lista de casas destino)."""
+        bit = BIT[sq]
+        empty = self.empty()
+        result = []
+
+        if self.men(player) & bit:
+            for d in FORWARD[player]:
+                nxt = NEIGHBOR[d][sq]
+                if nxt != -1 and empty & BIT[nxt]:
+                    result.append(nxt)
+            return result
+
+        if not self.kings(player) & bit:
+            return result
+
+        for d in range(4):
+            for nxt in RAYS[d][sq]:
+                if not empty & BIT[nxt]:
+                    break
+                result.append(nxt)
+        return result
+
+    # ----------------------------------------
+    # Consultas em lote (shift-and-mask)
+    # ----------------------------------------
+
+    def men_with_captures(self, player):
+        """Bitboard das pedras de ``player`` que têm captura disponível."""
+        men = self.men(player)
+        if not men:
+            return 0
+        enemy = self.pieces(opponent(player))
+        empty = self.empty()
+        result = 0
+        for d in FORWARD[player]:
+            # Inimigos vizinhos com casa vazia logo depois, projetados de volta
+            jumpable = shift(shift(men, d) & enemy, d) & empty
+            if jumpable:
+                back = OPPOSITE[d]
+                result |= shift(shift(jumpable, back), back) & men
+        return result
+
+    def men_with_simple_moves(self, player):
+        """Bitboard das pedras de ``player`` com algum passo simples livre."""
+        men = self.men(player)
+        if not men:
+            return 0
+        empty = self.empty()
+        result = 0
+        for d in FORWARD[player]:
+            result |= shift(empty, OPPOSITE[d]) & men
+        return result
+
+    def has_captures(self, player):
+        if self.men_with_captures(player):
+            return True
+        return any(self.captures(sq, player) for sq in iter_bits(self.kings(player)))
+
+    def has_moves(self, player):
+        """Verifica se ``player`` tem ao menos um movimento (captura ou simples)."""
+        if self.men_with_simple_moves(player) or self.men_with_captures(player):
+            return True
+        for sq in iter_bits(self.kings(player)):
+            if self.simple_moves(sq, player) or self.captures(sq, player):
+                return True
+        return False
+
+    def all_captures(self, player):
+        """Equivalente a ``CheckersGame.get_all_captures_for_player``."""
+        result = []
+        for sq in iter_bits(self.pieces(player)):
+            caps = self.captures(sq, player)
+            if caps:
+                result.append((sq, caps))
+        return result
+
+    def legal_moves(self, player):
+        """
+        Tabela de movimentos legais (um salto) de ``player``.
+
+        Retorna (is_capture, {origem: {destino: casa_capturada ou None}}).
+        Se houver captura, só capturas são retornadas (captura obrigatória).
+        """
+        table = {}
+        capturing = self.men_with_captures(player)
+        for sq in iter_bits(self.kings(player)):
+            if self.captures(sq, player):
+                capturing |= BIT[sq]
+        if capturing:
+            for sq in iter_bits(capturing):
+                table[sq] = {land: enemy for land, enemy in self.captures(sq, player)}
+            return True, table
+        return False, self.simple_move_table(player)
+
+    def simple_move_table(self, player):
+        """Movimentos sem captura de ``player``: {origem: {destino: None}}."""
+        table = {}
+        empty = self.empty()
+        men = self.men(player)
+        for d in FORWARD[player]:
+            back = OPPOSITE[d]
+            for to_sq in iter_bits(shift(men, d) & empty):
+                from_sq = NEIGHBOR[back][to_sq]
+                table.setdefault(from_sq, {})[to_sq] = None
+        for sq in iter_bits(self.kings(player)):
+            moves = self.simple_moves(sq, player)
+            if moves:
+                table[sq] = dict.fromkeys(moves)
+        return table
+
+    # ----------------------------------------
+    # Sequências completas de captura
+    # ----------------------------------------
+
+    def capture_sequences(self, player):
+        """
+        Todas as sequências de captura de ``player`` que respeitam a LEI DA
+        MAIORIA (só as que capturam o maior número de peças).
+
+        As peças capturadas só saem do tabuleiro no fim da sequência: não
+        podem ser saltadas duas vezes e continuam bloqueando o caminho.
+        """
+        paths = []
+        enemy = self.pieces(opponent(player))
+        kings = self.kings(player)
+        occupied = self.occupied()
+        for sq in iter_bits(self.pieces(player)):
+            # A casa de origem fica livre durante a sequência
+            empty = ~(occupied ^ BIT[sq]) & FULL_MASK
+            self._extend_sequence(
+                sq, player, bool(kings & BIT[sq]), enemy, empty, 0, (sq,), (), paths
+            )
+
+        if not paths:
+            return paths
+        best = max(len(path.captured) for path in paths)
+        return [path for path in paths if len(path.captured) == best]
+
+    def _extend_sequence(self, sq, player, is_king, enemy, empty, taken, squares, captured, out):
+        extended = False
+        if is_king:
+            for d in range(4):
+                ray = RAYS[d][sq]
+                i = 0
+                while i < len(ray) and empty & BIT[ray[i]]:
+                    i += 1
+                if i == len(ray):
+                    continue
+                mid = ray[i]
+                if not enemy & BIT[mid] or taken & BIT[mid]:
+                    continue
+                i += 1
+                while i < len(ray) and empty & BIT[ray[i]]:
+                    land = ray[i]
+                    extended = True
+                    self._extend_sequence(
+                        land, player, True, enemy, empty, taken | BIT[mid],
+                        squares + (land,), captured + (mid,), out
+                    )
+                    i += 1
+        else:
+            for d in FORWARD[player]:
+                mid = NEIGHBOR[d][sq]
+                if mid == -1 or not enemy & BIT[mid] or taken & BIT[mid]:
+                    continue
+                land = NEIGHBOR[d][mid]
+                if land == -1 or not empty & BIT[land]:
+                    continue
+                extended = True
+                self._extend_sequence(
+                    land, player, False, enemy, empty, taken | BIT[mid],
+                    squares + (land,), captured + (mid,), out
+                )
+
+        if not extended and captured:
+            out.append(CapturePath(squares, captured))
@@ -0,0 +1,1050 @@
+# -*- coding: utf-8 -*-
+"""
+Regras do jogo de damas (REGRAS BRASILEIRAS).
+
+Separado do app.py para que o motor possa ser usado sem Flask/eventlet
+(comparação com o motor de bitboards, ferramentas offline).
+"""
+
+import itertools
+import os
+import random
+import sys
+import time
+
+from bitboard import BitBoard, CapturePath, square_index, square_coords
+from metrics import registry
+from search import SearchEngine, DEFAULT_DIFFICULTY, DIFFICULTY_LEVELS
+from snapshots import StateSnapshot, serialize
+from tablebase import DRAW as TABLEBASE_DRAW, KING_MOVES_DRAW_LIMIT, get_tablebase
+from zobrist import SIDE_KEY, get_move_table, piece_key
+
+# Constantes
+EMPTY = 0
+P1 = 1
+P2 = 2
+P1_KING = 3
+P2_KING = 4
+
+# Regras de empate
+REPETITION_LIMIT = 3  # mesma posição 3 vezes
+# KING_MOVES_DRAW_LIMIT (20 lances seguidos só de damas) vem da tablebase, que resolve os finais com ela
+DRAW_NAME = "Empate"
+# Formatos do tabuleiro em get_state(): matriz 8x8 ou BitBoard.encode()
+BOARD_ENCODINGS = ("list", "packed")
+# Relógio: segundos de cada vez (estourou, a vez passa para o adversário)
+TURN_TIME = int(os.environ.get("TURN_TIME", 60))
+# Peso do último lance na média móvel exponencial dos tempos
+TIME_EWMA_ALPHA = 0.3
+# Versões do estado: crescentes e sem repetição entre partidas do processo
+STATE_VERSIONS = itertools.count(1)
+
+
+class TimeStats:
+    """Tempos de jogada de um jogador: contagem, média e média móvel (O(1) por lance)."""
+
+    __slots__ = ("count", "mean", "ewma")
+
+    def __init__(self, count=0, mean=0.0, ewma=0.0):
+        self.count = count
+        self.mean = mean
+        self.ewma = ewma
+
+    def add(self, value):
+        self.count += 1
+        self.mean += (value - self.mean) / self.count
+        self.ewma = value if self.count == 1 else self.ewma + TIME_EWMA_ALPHA * (value - self.ewma)
+
+    def to_list(self):
+        return [self.count, self.mean, self.ewma]
+
+    @classmethod
+    def from_samples(cls, samples):
+        """Agregado de uma lista de tempos (formato antigo de ``to_dict``)."""
+        stats = cls()
+        for value in samples:
+            stats.add(value)
+        return stats
+
+
+class CheckersGame:
+    # Um servidor guarda dezenas de milhares de partidas: atributos fixos
+    # (sem __dict__), tabuleiro e histórico em bytearray
+    __slots__ = (
+        "use_bitboard", "bitboard", "board",
+        "_legal_moves", "_legal_moves_turn", "_legal_moves_capture", "_piece_counts",
+        "_hop_paths", "_pending_paths", "_pending_hop", "_pending_turn",
+        "turn", "winner", "winner_side", "draw", "hash", "position_counts", "king_moves_without_progress",
+        "player1_name", "player2_name", "mode", "difficulty", "_ai_path", "_ai_path_key",
+        "move_history", "seq", "last_move", "player1_times", "player2_times",
+        "player1_warnings", "player2_warnings", "game_started", "turn_started",
+        "state_version", "_snapshots",
+    )
+
+    def __init__(self, use_bitboard=True):
+        # use_bitboard: regras calculadas pelo motor de bitboards (bitboard.py),
+        # o das partidas servidas; self.board continua sendo mantido para o
+        # JSON do frontend. use_bitboard=False é o motor de listas, referência
+        # do teste de paridade.
+        self.use_bitboard = use_bitboard
+        self.bitboard = None
+        # 64 casas linha a linha: a casa (row, col) é self.board[row * 8 + col]
+        self.board = bytearray(64)
+        # Tabela de movimentos legais da posição atual (calculada sob demanda)
+        self._legal_moves = None
+        self._legal_moves_turn = None
+        self._legal_moves_capture = False
+        self._piece_counts = None
+        # Sequências de captura (lei da maioria) válidas para o salto atual
+        self._hop_paths = {}
+        self._pending_paths = None
+        self._pending_hop = 0
+        self._pending_turn = None
+        self.turn = P1
+        self.winner = None  # Nome do vencedor (ou DRAW_NAME) para o frontend
+        self.winner_side = None  # P1 ou P2 que venceu; None sem vencedor ou empate
+        self.draw = False
+        # Hash Zobrist das peças (atualizado a cada casa alterada)
+        self.hash = 0
+        self.position_counts = {}
+        self.king_moves_without_progress = 0
+        self.player1_name = "Jogador 1"
+        self.player2_name = "Jogador 2"
+        self.mode = "pvp"  # pvp ou pvc
+        self.difficulty = DEFAULT_DIFFICULTY  # facil, medio ou dificil (modo pvc)
+        self._ai_path = None  # Sequência de captura escolhida pela busca
+        self._ai_path_key = None  # Posição para a qual _ai_path foi calculado
+        self.move_history = bytearray()  # Dois bytes por salto: casa de origem e de destino
+        self.seq = 0  # Lances (saltos) aplicados; numera os deltas enviados
+        self.last_move = None  # (origem, destino, capturada, promoveu) do último lance
+        self.player1_times = TimeStats()
+        self.player2_times = TimeStats()
+        self.player1_warnings = 0
+        self.player2_warnings = 0
+        self.game_started = False
+        self.turn_started = None  # time.time() do início da vez atual; None = relógio parado
+        # Muda a cada alteração do estado (touch_state); o estado montado e
+        # serializado de cada formato vale até a próxima versão
+        self.state_version = 0
+        self._snapshots = None  # {formato: (estado, JSON)}
+        self.initialize_board()
+
+    def initialize_board(self):
+        """
+        Inicializa o tabuleiro seguindo as REGRAS BRASILEIRAS OFICIAIS.
+        
+        Regras de inicialização:
+        - Tabuleiro 8x8
+        - Peças só ficam em casas escuras (row + col) % 2 == 1
+        - P2 (vermelhas/pretas): linhas 0, 1, 2 (3 primeiras linhas)
+        - P1 (brancas/vermelhas): linhas 5, 6, 7 (3 últimas linhas)
+        - Linhas 3 e 4 ficam vazias (área neutra)
+        """
+        self.board = bytearray(64)
+        self.invalidate_legal_moves()
+        self.touch_state()
+        self._pending_paths = None
+        self.turn = P1
+        self.winner = None
+        self.winner_side = None
+        self.draw = False
+        self.move_history = bytearray()
+        self.seq = 0
+        self.last_move = None
+        self.player1_times = TimeStats()
+        self.player2_times = TimeStats()
+        self.player1_warnings = 0
+        self.player2_warnings = 0
+        self.turn_started = None
+        
+        # Colocar peças nas casas escuras das 3 primeiras e 3 últimas linhas
+        for row in range(8):
+            for col in range(8):
+                if (row + col) % 2 == 1:  # Casa escura
+                    if row < 3:
+                        self.board[row * 8 + col] = P2  # Peças do jogador 2 (topo)
+                    elif row > 4:
+                        self.board[row * 8 + col] = P1  # Peças do jogador 1 (base)
+
+        self.hash = 0
+        for row in range(8):
+            for col in range((row + 1) % 2, 8, 2):
+                self.hash ^= piece_key(self.board[row * 8 + col], square_index(row, col))
+        # Só posições desde o último lance irreversível podem se repetir
+        self.position_counts = {self.position_key(): 1}
+        self.king_moves_without_progress = 0
+
+        if self.use_bitboard:
+            self.bitboard = BitBoard.from_cells(self.board)
+
+    def load_position(self, board, turn=P1):
+        """
+        Carrega uma posição qualquer (matriz 8x8 + vez), como se a partida
+        tivesse começado nela. Usado pelo perft e pela análise de posições.
+        """
+        self.initialize_board()
+        for row in range(8):
+            for col in range((row + 1) % 2, 8, 2):
+                self.set_cell(row, col, board[row][col])
+        self.turn = turn
+        self.position_counts = {self.position_key(): 1}
+
+    def set_cell(self, row, col, piece):
+        """Altera uma casa mantendo o bitboard e o hash sincronizados."""
+        sq = square_index(row, col)
+        if sq != -1:
+            self.hash ^= piece_key(self.board[row * 8 + col], sq) ^ piece_key(piece, sq)
+            if self.bitboard is not None:
+                self.bitboard.set_piece(sq, piece)
+        self.board[row * 8 + col] = piece
+        self.invalidate_legal_moves()
+        self.touch_state()
+
+    def board_rows(self):
+        """Tabuleiro como matriz 8x8 (formato JSON do frontend)."""
+        return [list(self.board[start:start + 8]) for start in range(0, 64, 8)]
+
+    def get_move_history(self):
+        """Saltos da partida como [start_r, start_c, end_r, end_c]."""
+        history = self.move_history
+        return [
+            [*divmod(history[i], 8), *divmod(history[i + 1], 8)]
+            for i in range(0, len(history), 2)
+        ]
+
+    def position_key(self):
+        """Hash Zobrist da posição (peças + lado a jogar)."""
+        return self.hash ^ SIDE_KEY if self.turn == P2 else self.hash
+
+    def invalidate_legal_moves(self):
+        """Descarta a tabela de movimentos legais (tabuleiro mudou)."""
+        self._legal_moves = None
+        self._piece_counts = None
+
+    def release_caches(self):
+        """
+        Partida parada esperando o próximo lance: solta a tabela de
+        movimentos legais (metade da memória de uma partida residente) e o
+        estado serializado, recalculados quando forem usados.
+        """
+        self.invalidate_legal_moves()
+        self._hop_paths = {}
+        self._snapshots = None
+
+    def touch_state(self):
+        """
+        O estado mudou: nova versão. Todo método que altera o que vai em
+        ``get_state`` chama (direta ou indiretamente, ex.: ``set_cell``).
+        """
+        self.state_version = next(STATE_VERSIONS)
+        self._snapshots = None
+
+    def get_legal_moves(self):
+        """
+        Tabela de movimentos legais do jogador da vez, calculada uma vez por
+        posição e reutilizada pela validação, busca da peça capturada,
+        verificação de captura múltipla, IA e detecção de fim de jogo.
+
+        Formato: {(row, col): {(end_row, end_col): captured_pos ou None}}
+        Se houver captura, a tabela contém SÓ o próximo salto das sequências
+        que capturam o maior número de peças (lei da maioria).
+        """
+        if self._legal_moves is None or self._legal_moves_turn != self.turn:
+            self._generate_legal_moves()
+        return self._legal_moves
+
+    def has_mandatory_capture(self):
+        """Indica se a tabela atual é de capturas obrigatórias."""
+        self.get_legal_moves()
+        return self._legal_moves_capture
+
+    def get_capture_paths(self):
+        """
+        Sequências completas de captura ainda válidas para o jogador da vez
+        (lista de ``CapturePath`` em índices de casa do bitboard).
+        """
+        self.get_legal_moves()
+        paths = []
+        for hop_paths in self._hop_paths.values():
+            paths.extend(hop_paths)
+        return paths
+
+    def _generate_legal_moves(self):
+        self._hop_paths = {}
+
+        # Captura múltipla em andamento: só os próximos saltos das sequências escolhidas
+        if self._pending_paths is not None and self._pending_turn == self.turn:
+            self._build_capture_table(self._pending_paths, self._pending_hop)
+            return
+        self._pending_paths = None
+
+        if self.bitboard is not None:
+            # Posição já vista (nesta ou em outra partida): tabela pelo hash Zobrist
+            key = self.position_key()
+            move_table = get_move_table()
+            cached = move_table.get(key)
+            if cached is None:
+                cached = self._generate_bitboard_moves()
+                move_table.put(key, cached)
+            is_capture, moves = cached
+            if is_capture:
+                self._build_capture_table(moves, 0)
+                self._piece_counts = self.bitboard.piece_count()
+            else:
+                self._set_legal_moves(moves, False, self.bitboard.piece_count())
+            return
+
+        # Motor de listas (só a referência do teste de paridade e do perft): sempre gera
+        board = BitBoard.from_cells(self.board)
+        paths = board.capture_sequences(self.turn)
+        if paths:
+            self._build_capture_table(paths, 0)
+            self._piece_counts = board.piece_count()
+            return
+
+        simple = {}
+        p1_count = 0
+        p2_count = 0
+        for row in range(8):
+            for col in range((row + 1) % 2, 8, 2):  # Só casas escuras
+                piece = self.board[row * 8 + col]
+                if piece == EMPTY:
+                    continue
+                if piece in (P1, P1_KING):
+                    p1_count += 1
+                else:
+                    p2_count += 1
+                if self.is_piece_of_player(piece, self.turn):
+                    moves = self.get_simple_moves(row, col)
+                    if moves:
+                        simple[(row, col)] = {move: None for move in moves}
+        self._set_legal_moves(simple, False, (p1_count, p2_count))
+
+    def _generate_bitboard_moves(self):
+        """
+        (é captura, jogadas) da posição pelo bitboard: as sequências de
+        captura ou a tabela de lances simples já em coordenadas. Guardado na
+        ``MoveTable`` e compartilhado, então não é alterado depois.
+        """
+        paths = self.bitboard.capture_sequences(self.turn)
+        if paths:
+            return True, tuple(paths)
+        legal_moves = {}
+        table = self.bitboard.simple_move_table(self.turn)
+        for from_sq in sorted(table):
+            legal_moves[square_coords(from_sq)] = {
+                square_coords(to_sq): None for to_sq in table[from_sq]
+            }
+        return False, legal_moves
+
+    def _build_capture_table(self, paths, hop):
+        """Monta a tabela do salto ``hop`` a partir das sequências de captura."""
+        legal_moves = {}
+        for path in paths:
+            start = square_coords(path.squares[hop])
+            end = square_coords(path.squares[hop + 1])
+            legal_moves.setdefault(start, {})[end] = square_coords(path.captured[hop])
+            self._hop_paths.setdefault((start, end), []).append(path)
+        self._set_legal_moves(legal_moves, True, None)
+
+    def _set_legal_moves(self, legal_moves, is_capture, piece_counts):
+        self._legal_moves = legal_moves
+        self._legal_moves_capture = is_capture
+        self._legal_moves_turn = self.turn
+        self._piece_counts = piece_counts
+
+    def configure_game(self, p1_name, p2_name, mode="pvp", difficulty=None):
+        """Configura nomes, modo de jogo e dificuldade da IA."""
+        self.player1_name = p1_name if p1_name else "Jogador 1"
+        self.player2_name = p2_name if p2_name else ("Romano" if mode == "pvc" else "Jogador 2")
+        self.mode = mode
+        if difficulty in DIFFICULTY_LEVELS:
+            self.difficulty = difficulty
+        self.game_started = True
+        self.touch_state()
+
+    def get_piece_count(self):
+        """Conta peças de cada jogador."""
+        if self._piece_counts is not None:
+            return self._piece_counts
+        if self.bitboard is not None:
+            return self.bitboard.piece_count()
+        p1_count = self.board.count(P1) + self.board.count(P1_KING)
+        p2_count = self.board.count(P2) + self.board.count(P2_KING)
+        return p1_count, p2_count
+
+    def get_average_time(self, player):
+        """Calcula tempo médio de jogadas."""
+        return (self.player1_times if player == P1 else self.player2_times).mean
+
+    def get_recent_time(self, player):
+        """Média móvel exponencial dos tempos (ritmo dos últimos lances)."""
+        return (self.player1_times if player == P1 else self.player2_times).ewma
+
+    def analyze_time_comparison(self, move_time):
+        """Analisa tempo comparativo (apenas avisos, sem penalidade)."""
+        if self.turn == P1:
+            self.player1_times.add(move_time)
+        else:
+            self.player2_times.add(move_time)
+
+        if self.player1_times.count < 3 or self.player2_times.count < 3:
+            return None
+
+        avg1 = self.get_average_time(P1)
+        avg2 = self.get_average_time(P2)
+        
+        message = None
+
+        # Apenas avisos informativos, SEM remover peças
+        if avg1 > 0 and avg2 > 0:
+            if avg1 > avg2 * 1.5 and self.turn == P1:
+                self.player1_warnings += 1
+                if self.player1_warnings >= 3:
+                    message = f"⚠️ {self.player1_name}, você está demorando muito! Agilize!"
+                    self.player1_warnings = 0
+                else:
+                    message = f"💡 {self.player1_name}, tente jogar mais rápido!"
+            
+            elif avg2 > avg1 * 1.5 and self.turn == P2:
+                self.player2_warnings += 1
+                if self.player2_warnings >= 3:
+                    message = f"⚠️ {self.player2_name}, você está demorando muito! Agilize!"
+                    self.player2_warnings = 0
+                else:
+                    message = f"💡 {self.player2_name}, tente jogar mais rápido!"
+
+        return {"message": message}
+
+    # ----------------------------------------
+    # Relógio (autoritativo no servidor)
+    # ----------------------------------------
+
+    def start_clock(self, now=None):
+        """(Re)inicia a contagem da vez atual."""
+        self.turn_started = time.time() if now is None else now
+
+    def stop_clock(self):
+        self.turn_started = None
+
+    def turn_deadline(self):
+        """``time.time()`` em que a vez atual estoura, ou None com o relógio parado."""
+        if self.turn_started is None or self.winner:
+            return None
+        return self.turn_started + TURN_TIME
+
+    def clock_remaining(self, now=None):
+        """Segundos restantes da vez atual (None com o relógio parado)."""
+        deadline = self.turn_deadline()
+        if deadline is None:
+            return None
+        return max(0.0, deadline - (time.time() if now is None else now))
+
+    def clock_expired(self, now=None):
+        deadline = self.turn_deadline()
+        return deadline is not None and (time.time() if now is None else now) >= deadline
+
+    def timeout_turn(self, now=None):
+        """
+        Tempo da vez esgotado: a vez passa para o adversário (uma captura
+        múltipla pela metade é abandonada) e o relógio recomeça.
+        """
+        self._pending_paths = None
+        self.invalidate_legal_moves()
+        self.touch_state()
+        self.turn = P2 if self.turn == P1 else P1
+        if not self.check_winner() and self.turn_started is not None:
+            self.start_clock(now)
+        return True
+
+    def is_piece_of_player(self, piece, player):
+        """Verifica se peça pertence ao jogador."""
+        if player == P1:
+            return piece in [P1, P1_KING]
+        return piece in [P2, P2_KING]
+
+    def promote_to_king(self, row, col):
+        """Promove peça a dama."""
+        piece = self.board[row * 8 + col]
+        if piece == P1 and row == 0:
+            self.set_cell(row, col, P1_KING)
+            return True
+        elif piece == P2 and row == 7:
+            self.set_cell(row, col, P2_KING)
+            return True
+        return False
+
+    def get_captures(self, row, col):
+        """
+        Retorna capturas possíveis, incluindo movimento longo de Dama.
+
+        Regras implementadas:
+        - Peças normais capturam pulando 2 casas na diagonal (como antes).
+        - Damas (P1_KING, P2_KING) podem capturar em QUALQUER distância na mesma
+          diagonal, desde que:
+            * Haja exatamente 1 peça inimiga no caminho.
+            * Todas as casas após o inimigo até o destino estejam vazias.
+            * Não haja peça própria bloqueando o caminho.
+        """
+        piece = self.board[row * 8 + col]
+        if piece == EMPTY:
+            return []
+
+        if self.bitboard is not None:
+            sq = square_index(row, col)
+            owner = P1 if piece in (P1, P1_KING) else P2
+            captures = []
+            for land, enemy in self.bitboard.captures(sq, owner):
+                captures.append(square_coords(land) + square_coords(enemy))
+            return captures
+
+        captures = []
+
+        # Peças normais (não-damas): mesma lógica antiga (2 casas)
+        if piece in (P1, P2):
+            directions = [(-2, -2), (-2, 2)] if piece == P1 else [(2, -2), (2, 2)]
+            for dr, dc in directions:
+                new_row, new_col = row + dr, col + dc
+                mid_row, mid_col = row + dr // 2, col + dc // 2
+
+                # Verificar limites E casa escura
+                if (
+                    0 <= new_row < 8 
+                    and 0 <= new_col < 8
+                    and (new_row + new_col) % 2 == 1  # Casa escura
+                ):
+                    mid_piece = self.board[mid_row * 8 + mid_col]
+                    if (
+                        mid_piece != EMPTY
+                        and not self.is_piece_of_player(mid_piece, self.turn)
+                        and self.board[new_row * 8 + new_col] == EMPTY
+                    ):
+                        captures.append((new_row, new_col, mid_row, mid_col))
+
+            return captures
+
+        # DAMAS: podem capturar em qualquer distância na diagonal
+        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+        for dr, dc in directions:
+            r = row + dr
+            c = col + dc
+            seen_enemy = False
+            enemy_pos = None
+
+            while 0 <= r < 8 and 0 <= c < 8:
+                # Verificar se é casa escura (peças só podem estar em casas escuras)
+                if (r + c) % 2 != 1:
+                    # Casa clara - pular (peças não podem estar aqui)
+                    r += dr
+                    c += dc
+                    continue
+                
+                current_piece = self.board[r * 8 + c]
+
+                if current_piece == EMPTY:
+                    # Se já vimos exatamente um inimigo antes, qualquer casa vazia ESCURA
+                    # depois dele é um destino válido de captura.
+                    if seen_enemy and enemy_pos is not None:
+                        captures.append((r, c, enemy_pos[0], enemy_pos[1]))
+                else:
+                    # Encontrou uma peça (em casa escura)
+                    if self.is_piece_of_player(current_piece, self.turn):
+                        # Peça própria bloqueia o caminho → parar nesta direção
+                        break
+
+                    # Peça inimiga
+                    if not seen_enemy:
+                        seen_enemy = True
+                        enemy_pos = (r, c)
+                    else:
+                        # Já havia inimigo no caminho → duas peças inimigas bloqueiam
+                        break
+
+                # Avançar na diagonal (pula casas claras automaticamente)
+                r += dr
+                c += dc
+
+        return captures
+
+    def get_all_captures_for_player(self):
+        """Retorna todas capturas possíveis."""
+        if self.bitboard is not None:
+            return [
+                square_coords(sq) + ([square_coords(land) + square_coords(enemy) for land, enemy in caps],)
+                for sq, caps in self.bitboard.all_captures(self.turn)
+            ]
+
+        all_captures = []
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row * 8 + col]
+                if self.is_piece_of_player(piece, self.turn):
+                    captures = self.get_captures(row, col)
+                    if captures:
+                        all_captures.append((row, col, captures))
+        return all_captures
+
+    def get_simple_moves(self, row, col):
+        """
+        Retorna movimentos simples (sem captura).
+
+        Regras:
+        - Peça normal: 1 casa na diagonal, apenas para frente.
+        - Dama: qualquer número de casas na diagonal (frente ou trás),
+          até encontrar uma peça ou a borda do tabuleiro.
+        - Todas as peças só podem estar em casas escuras (row + col) % 2 == 1
+        """
+        piece = self.board[row * 8 + col]
+        if piece == EMPTY:
+            return []
+
+        if self.bitboard is not None:
+            owner = P1 if piece in (P1, P1_KING) else P2
+            return [square_coords(sq) for sq in self.bitboard.simple_moves(square_index(row, col), owner)]
+
+        moves = []
+
+        # Peças normais: 1 passo na direção correta
+        if piece in (P1, P2):
+            if piece == P1:
+                directions = [(-1, -1), (-1, 1)]
+            else:
+                directions = [(1, -1), (1, 1)]
+
+            for dr, dc in directions:
+                new_row, new_col = row + dr, col + dc
+                # Verificar limites, casa vazia E casa escura
+                if (
+                    0 <= new_row < 8
+                    and 0 <= new_col < 8
+                    and (new_row + new_col) % 2 == 1  # Casa escura
+                    and self.board[new_row * 8 + new_col] == EMPTY
+                ):
+                    moves.append((new_row, new_col))
+
+            return moves
+
+        # DAMAS: podem andar várias casas na diagonal
+        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+
+        for dr, dc in directions:
+            r = row + dr
+            c = col + dc
+            while 0 <= r < 8 and 0 <= c < 8:
+                # Verificar se é casa escura (peças só podem estar em casas escuras)
+                if (r + c) % 2 == 1:
+                    if self.board[r * 8 + c] == EMPTY:
+                        moves.append((r, c))
+                    else:
+                        # Qualquer peça (própria ou inimiga) bloqueia a continuidade
+                        break
+                # Se for casa clara, pular (peças não podem estar aqui)
+                # Avançar na diagonal
+                r += dr
+                c += dc
+
+        return moves
+
+    def is_valid_move(self, start_r, start_c, end_r, end_c):
+        """
+        Valida movimento seguindo as REGRAS BRASILEIRAS OFICIAIS de damas.
+        
+        Regras:
+        1. Peças só podem estar em casas escuras (row + col) % 2 == 1
+        2. Peça normal: move 1 casa na diagonal para frente
+        3. Dama: move qualquer número de casas na diagonal (frente ou trás)
+        4. Captura é OBRIGATÓRIA se possível
+        5. Captura múltipla é obrigatória (deve continuar capturando)
+        """
+        # Validações básicas
+        if not (0 <= start_r < 8 and 0 <= start_c < 8 and 
+                0 <= end_r < 8 and 0 <= end_c < 8):
+            return False, "Posição fora do tabuleiro."
+
+        # Verificar se destino é casa escura (obrigatório)
+        if (end_r + end_c) % 2 != 1:
+            return False, "Peças só podem estar em casas escuras."
+
+        piece = self.board[start_r * 8 + start_c]
+        
+        if piece == EMPTY:
+            return False, "Não há peça na origem."
+        
+        if not self.is_piece_of_player(piece, self.turn):
+            return False, "Esta peça não pertence ao jogador atual."
+
+        if self.board[end_r * 8 + end_c] != EMPTY:
+            return False, "A casa de destino não está vazia."
+
+        # Consulta à tabela de movimentos legais da posição (calculada uma vez)
+        legal_moves = self.get_legal_moves()
+        piece_moves = legal_moves.get((start_r, start_c))
+
+        # 1) Movimento presente na tabela
+        if piece_moves and (end_r, end_c) in piece_moves:
+            if self._legal_moves_capture:
+                return True, "Captura válida."
+            return True, "Movimento válido."
+
+        # 2) REGRA BRASILEIRA: Se esta peça PODE capturar, mas o jogador tentou movimento simples
+        # então é inválido (captura obrigatória para esta peça)
+        if self._legal_moves_capture:
+            if self._pending_paths is not None:
+                return False, "Continue a captura com a mesma peça!"
+            if any(cap_r == end_r and cap_c == end_c
+                   for cap_r, cap_c, _, _ in self.get_captures(start_r, start_c)):
+                return False, "Lei da maioria! Escolha a captura que toma mais peças."
+            if piece_moves:
+                return False, "Captura obrigatória! Esta peça deve capturar."
+            # 3) Se há capturas possíveis, mas esta peça não pode capturar,
+            # o jogador deve escolher uma peça que pode capturar
+            return False, "Captura obrigatória! Escolha uma peça que pode capturar."
+
+        return False, "Movimento inválido."
+
+    def check_winner(self):
+        """Verifica vencedor."""
+        # A mesma tabela de movimentos legais serve para a próxima validação
+        legal_moves = self.get_legal_moves()
+        p1_pieces, p2_pieces = self.get_piece_count()
+        can_move = bool(legal_moves)
+
+        if p1_pieces == 0 or (self.turn == P1 and not can_move):
+            self.set_winner(P2)
+            return True
+        elif p2_pieces == 0 or (self.turn == P2 and not can_move):
+            self.set_winner(P1)
+            return True
+        
+        return False
+
+    def set_winner(self, player):
+        """
+        Fim da partida com vitória de ``player``. O lado fica em
+        ``winner_side``: os nomes podem se repetir (ou ser "Empate").
+        """
+        self.winner_side = player
+        self.winner = self.player1_name if player == P1 else self.player2_name
+        self.touch_state()
+
+    @registry.timed("damas_game_function_duration_seconds", function="move_piece")
+    def move_piece(self, start_r, start_c, end_r, end_c, move_time=None):
+        """
+        Executa movimento. Sem ``move_time`` o tempo do lance é medido pelo
+        relógio da partida (zero com o relógio parado).
+        """
+        valid, message = self.is_valid_move(start_r, start_c, end_r, end_c)
+        
+        if not valid:
+            return False, message, None, None
+        
+        now = time.time()
+        if move_time is None:
+            move_time = now - self.turn_started if self.turn_started is not None else 0
+
+        piece = self.board[start_r * 8 + start_c]
+        
+        # Posição da peça capturada vem da mesma tabela usada na validação
+        captured_pos = self.get_legal_moves()[(start_r, start_c)][(end_r, end_c)]
+        captured = captured_pos is not None
+        hop_paths = self._hop_paths.get(((start_r, start_c), (end_r, end_c)), [])
+        self.move_history += bytes((start_r * 8 + start_c, end_r * 8 + end_c))
+        self.seq += 1
+        self.last_move = ((start_r, start_c), (end_r, end_c), captured_pos, False)
+        
+        # Mover a peça
+        self.set_cell(end_r, end_c, piece)
+        self.set_cell(start_r, start_c, EMPTY)
+        
+        # Remover a peça capturada (funciona para peças normais E damas)
+        if captured and captured_pos:
+            enemy_r, enemy_c = captured_pos
+            self.set_cell(enemy_r, enemy_c, EMPTY)
+        
+        # Análise de tempo (SEM PENALIDADE DE PERDER PEÇA)
+        time_analysis = None
+        if move_time > 0:
+            time_analysis = self.analyze_time_comparison(move_time)
+            # REMOVIDO: apply_time_penalty() - era confuso e bugado
+        
+        # REGRA BRASILEIRA: captura múltipla obrigatória. As sequências da lei da
+        # maioria já foram calculadas; basta ver se a escolhida tem mais saltos.
+        if captured:
+            next_hop = (self._pending_hop + 1) if self._pending_paths is not None else 1
+            remaining = [path for path in hop_paths if len(path.squares) > next_hop + 1]
+            if remaining:
+                self._pending_paths = remaining
+                self._pending_hop = next_hop
+                self._pending_turn = self.turn
+                if self.turn_started is not None:
+                    self.start_clock(now)
+                # Não muda o turno - jogador DEVE continuar capturando
+                return True, "Captura realizada! Você DEVE continuar capturando.", time_analysis, captured_pos
+        
+        # Promover a dama só no fim da jogada (se terminou na última linha)
+        if self.promote_to_king(end_r, end_c):
+            self.last_move = ((start_r, start_c), (end_r, end_c), captured_pos, True)
+        self._pending_paths = None
+        
+        # Lance irreversível (pedra andou ou houve captura) zera as regras de empate
+        if captured or piece in (P1, P2):
+            self.position_counts = {}
+            self.king_moves_without_progress = 0
+        else:
+            self.king_moves_without_progress += 1
+        
+        self.turn = P2 if self.turn == P1 else P1
+        key = self.position_key()
+        self.position_counts[key] = self.position_counts.get(key, 0) + 1
+        if not self.check_winner():
+            self.check_draw()
+        if self.turn_started is not None:
+            self.start_clock(now)
+        
+        return True, "Movimento realizado!", time_analysis, captured_pos
+
+    def get_bitboard(self):
+        """Cópia da posição como ``BitBoard`` (independente do motor usado)."""
+        if self.bitboard is not None:
+            return self.bitboard.copy()
+        return BitBoard.from_cells(self.board)
+
+    def get_position(self):
+        """Posição serializada: (p1_men, p1_kings, p2_men, p2_kings, turn)."""
+        return self.get_bitboard().key() + (self.turn,)
+
+    def set_ai_plan(self, path):
+        """Define a jogada da IA (caminho de casas) para a posição atual."""
+        self._ai_path = tuple(path) if path else None
+        self._ai_path_key = self.position_key()
+
+    def get_ai_move(self):
+        """
+        IA Romano escolhe jogada (um salto por chamada).
+
+        No início da vez, a busca alpha-beta escolhe a jogada completa; nos
+        saltos seguintes de uma captura múltipla, a sequência escolhida é
+        continuada.
+        """
+        legal_moves = self.get_legal_moves()
+        if not legal_moves:
+            return None
+
+        # Busca local só se ninguém (ex.: ai_pool) já calculou a jogada desta posição
+        if self._pending_paths is None and self._ai_path_key != self.position_key():
+            path = self.get_tablebase_move()
+            if path is None:
+                result = SearchEngine.for_difficulty(self.difficulty).search(self.get_bitboard(), self.turn)
+                path = result.move[0] if result.move is not None else None
+            self.set_ai_plan(path)
+
+        hop = self._pending_hop if self._pending_paths is not None else 0
+        if self._ai_path is not None and hop + 1 < len(self._ai_path):
+            start = square_coords(self._ai_path[hop])
+            end = square_coords(self._ai_path[hop + 1])
+            if end in legal_moves.get(start, ()):
+                return start + end
+
+        # Sem plano válido: qualquer movimento legal
+        (start_r, start_c), moves = random.choice(list(legal_moves.items()))
+        end_r, end_c = random.choice(list(moves))
+        return start_r, start_c, end_r, end_c
+
+    def get_tablebase_move(self):
+        """Jogada perfeita da tablebase (caminho de casas), ou None fora dela."""
+        tablebase = get_tablebase()
+        if tablebase is None or self._pending_paths is not None:
+            return None
+        if sum(self.get_piece_count()) > tablebase.max_pieces:
+            return None
+        return tablebase.best_move(self.get_bitboard(), self.turn, self.king_moves_without_progress)
+
+    def check_draw(self):
+        """
+        Empate por repetição (3x a mesma posição), 20 lances só de damas ou
+        final que a tablebase mostra ser empate com jogo perfeito.
+        """
+        if self.position_counts.get(self.position_key(), 0) >= REPETITION_LIMIT:
+            return self.declare_draw()
+        if self.king_moves_without_progress >= KING_MOVES_DRAW_LIMIT:
+            return self.declare_draw()
+        tablebase = get_tablebase()
+        if tablebase is not None and sum(self.get_piece_count()) <= tablebase.max_pieces:
+            result = tablebase.probe(self.get_bitboard(), self.turn, self.king_moves_without_progress)
+            if result is not None and result[0] == TABLEBASE_DRAW:
+                return self.declare_draw()
+        return False
+
+    def declare_draw(self):
+        self.draw = True
+        self.winner_side = None
+        self.winner = DRAW_NAME
+        self.touch_state()
+        return True
+
+    def surrender(self, player):
+        """Jogador desiste."""
+        self.set_winner(P2 if player == P1 else P1)
+        return True
+
+    def get_capture_moves(self):
+        """Saltos de captura permitidos (lei da maioria) como [sr, sc, er, ec]."""
+        if self.winner or not self.has_mandatory_capture():
+            return []
+        return [
+            [start_r, start_c, end_r, end_c]
+            for (start_r, start_c), moves in self.get_legal_moves().items()
+            for end_r, end_c in moves
+        ]
+
+    def get_move_delta(self):
+        """
+        Resumo do último lance para clientes que já têm o tabuleiro: só o que
+        mudou, com ``seq`` para detectarem lances perdidos.
+        """
+        start, end, captured_pos, promoted = self.last_move
+        return {
+            "seq": self.seq,
+            "from": start,
+            "to": end,
+            "captured": captured_pos,
+            "promoted": promoted,
+            "turn": self.turn,
+            "winner": self.winner,
+            "draw": self.draw,
+            "p1_avg_time": round(self.get_average_time(P1), 1),
+            "p2_avg_time": round(self.get_average_time(P2), 1),
+            "clock": self.get_clock(),
+            "capture_moves": self.get_capture_moves()
+        }
+
+    def get_clock(self):
+        """Segundos restantes da vez (arredondados) para o cronômetro do cliente."""
+        remaining = self.clock_remaining()
+        return round(remaining, 1) if remaining is not None else None
+
+    @registry.timed("damas_game_function_duration_seconds", function="get_state")
+    def get_state(self, encoding=None):
+        """
+        Retorna estado do jogo (``StateSnapshot``). Com ``encoding="packed"``
+        o tabuleiro vai em ``board_packed`` (``BitBoard.encode``) em vez da
+        matriz 8x8. Montado e serializado uma vez por versão e formato; nas
+        leituras seguintes só o relógio é calculado.
+        """
+        encoding = "packed" if encoding == "packed" else "list"
+        if self._snapshots is None:
+            self._snapshots = {}
+        cached = self._snapshots.get(encoding)
+        if cached is None:
+            state = self._build_state(encoding)
+            cached = self._snapshots[encoding] = (state, serialize(state))
+        state, body = cached
+        return StateSnapshot.build(state, body, clock=self.get_clock())
+
+    def _build_state(self, encoding):
+        p1_count, p2_count = self.get_piece_count()
+        avg1 = self.get_average_time(P1)
+        avg2 = self.get_average_time(P2)
+        
+        state = {
+            "version": self.state_version,
+            "seq": self.seq,
+            "turn": self.turn,
+            "player1_name": self.player1_name,
+            "player2_name": self.player2_name,
+            "turn_name": self.player1_name if self.turn == P1 else self.player2_name,
+            "winner": self.winner,
+            "draw": self.draw,
+            "mode": self.mode,
+            "difficulty": self.difficulty,
+            "p1_pieces": p1_count,
+            "p2_pieces": p2_count,
+            "p1_avg_time": round(avg1, 1),
+            "p2_avg_time": round(avg2, 1),
+            "p1_recent_time": round(self.get_recent_time(P1), 1),
+            "p2_recent_time": round(self.get_recent_time(P2), 1),
+            "turn_time": TURN_TIME,
+            "game_started": self.game_started,
+            # Saltos de captura permitidos (lei da maioria) para o frontend destacar
+            "capture_moves": self.get_capture_moves()
+        }
+        if encoding == "packed":
+            board = self.bitboard if self.bitboard is not None else BitBoard.from_cells(self.board)
+            state["board_packed"] = board.encode()
+        else:
+            state["board"] = self.board_rows()
+        return state
+
+    def to_dict(self):
+        """
+        Estado completo serializável (JSON) para guardar a partida fora do
+        processo (``room_store``). O tabuleiro vai compacto (``BitBoard.encode``).
+        """
+        board = self.bitboard if self.bitboard is not None else BitBoard.from_cells(self.board)
+        pending = None
+        if self._pending_paths is not None:
+            pending = {
+                "paths": [[list(path.squares), list(path.captured)] for path in self._pending_paths],
+                "hop": self._pending_hop,
+                "turn": self._pending_turn,
+            }
+        return {
+            "board": board.encode(),
+            "use_bitboard": self.use_bitboard,
+            "turn": self.turn,
+            "winner": self.winner,
+            "winner_side": self.winner_side,
+            "draw": self.draw,
+            "seq": self.seq,
+            "last_move": self.last_move,
+            "pending": pending,
+            "position_counts": list(self.position_counts.items()),
+            "king_moves": self.king_moves_without_progress,
+            "names": [self.player1_name, self.player2_name],
+            "mode": self.mode,
+            "difficulty": self.difficulty,
+            "history": self.get_move_history(),
+            "time_stats": [self.player1_times.to_list(), self.player2_times.to_list()],
+            "turn_started": self.turn_started,
+            "warnings": [self.player1_warnings, self.player2_warnings],
+            "game_started": self.game_started,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói a partida de ``to_dict()``."""
+        game = cls(use_bitboard=data["use_bitboard"])
+        game.load_position(BitBoard.decode(data["board"]).to_board(), data["turn"])
+        game.winner = data["winner"]
+        game.winner_side = data.get("winner_side")
+        game.draw = data["draw"]
+        game.seq = data["seq"]
+        last_move = data["last_move"]
+        if last_move is not None:
+            start, end, captured_pos, promoted = last_move
+            game.last_move = (tuple(start), tuple(end),
+                              tuple(captured_pos) if captured_pos else None, promoted)
+        pending = data["pending"]
+        if pending is not None:
+            game._pending_paths = [CapturePath(tuple(squares), tuple(captured))
+                                   for squares, captured in pending["paths"]]
+            game._pending_hop = pending["hop"]
+            game._pending_turn = pending["turn"]
+        game.position_counts = dict(data["position_counts"])
+        game.king_moves_without_progress = data["king_moves"]
+        game.player1_name, game.player2_name = data["names"]
+        # Mesmos objetos das constantes (não uma cópia da string por partida)
+        game.mode = sys.intern(data["mode"])
+        game.difficulty = sys.intern(data["difficulty"])
+        game.move_history = bytearray(
+            cell for start_r, start_c, end_r, end_c in data["history"]
+            for cell in (start_r * 8 + start_c, end_r * 8 + end_c))
+        if "time_stats" in data:
+            game.player1_times, game.player2_times = (TimeStats(*stats) for stats in data["time_stats"])
+        else:
+            game.player1_times, game.player2_times = (TimeStats.from_samples(times) for times in data["times"])
+        game.turn_started = data.get("turn_started")
+        game.player1_warnings, game.player2_warnings = data["warnings"]
+        game.game_started = data["game_started"]
+        return game
@@ -0,0 +1,351 @@
+"""
+Registro das partidas multiplayer em um log só de acréscimo.
+
+Cada evento é uma linha JSON (NDJSON) gravada no fim do arquivo:
+
+    {"t":"start","g":"ABC123-1718000000000","room":"ABC123","p1":"Ana","p2":"Bia",...}
+    {"t":"move","g":"ABC123-1718000000000","n":1,"m":[5,0,4,1],"dt":3.2}
+    {"t":"timeout","g":"ABC123-1718000000000","n":1}
+    {"t":"end","g":"ABC123-1718000000000","winner":"Ana","reason":"surrender","player":2}
+
+Cada linha vai para o sistema operacional assim que é escrita (``flush``);
+o ``fsync`` é feito em lotes (a cada ``GAME_LOG_FSYNC_BATCH`` registros ou
+pela green thread do app), então um lance não espera o disco.
+
+Com vários workers (``shared``) o arquivo é um só: cada registro é escrito
+com a trava exclusiva (``flock``) e, se o tamanho do arquivo não é o que
+este worker deixou, ele lê antes as linhas que os outros acrescentaram.
+Assim qualquer worker que atenda a sala (store compartilhado) grava os
+lances dela no registro certo, e as posições do índice valem em todos.
+Com um worker só o índice já está sempre em dia: sem trava e sem leitura
+por lance. Um registro cuja partida não está no log não é perdido em
+silêncio: vai para ``stats["missed"]`` com um aviso.
+
+Ao abrir, o arquivo é lido uma vez para montar o índice
+{partida: posições dos registros}; depois só o trecho novo é lido. O
+índice guarda só as partidas em andamento: no registro de fim a partida
+sai dele, então a memória do servidor não cresce com o histórico. Uma
+partida terminada é lida do arquivo quando pedida (``read_game``,
+``replay``); ``list_games`` e ``finished_games`` leem o arquivo inteiro
+uma vez, para as ferramentas offline.
+``replay`` lê só as linhas da partida pedida e reaplica os lances até
+qualquer ply. Partidas sem registro de fim
+são as que estavam em andamento quando o processo parou: o app as recria
+na inicialização e os jogadores voltam com o token de reconexão.
+
+Uso offline:
+    python game_log.py                   # lista as partidas do log
+    python game_log.py ABC123-17180...   # mostra a partida (e --ply N)
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava (um worker)
+    fcntl = None
+
+from checkers_game import CheckersGame, P1
+
+GAME_LOG_PATH = os.environ.get("GAME_LOG", "game_log.ndjson")  # vazio desliga
+GAME_LOG_FSYNC_BATCH = int(os.environ.get("GAME_LOG_FSYNC_BATCH", 64))
+GAME_LOG_FSYNC_INTERVAL = float(os.environ.get("GAME_LOG_FSYNC_INTERVAL", 1.0))
+
+
+class GameLog:
+    """Log de partidas (NDJSON) com índice em memória."""
+
+    def __init__(self, path=GAME_LOG_PATH, fsync_batch=GAME_LOG_FSYNC_BATCH, shared=True):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self.shared = shared  # Outros processos escrevem no arquivo (vários workers)
+        # {game_id: {"start": posição, "moves": [posições de lances e tempos esgotados],
+        #  "end": posição ou None}} - só as partidas em andamento
+        self.index = {}
+        self.live = {}  # {room_id: game_id} - partidas sem registro de fim
+        self.indexed = 0  # Bytes do arquivo já lidos para o índice
+        self.pending = 0  # registros escritos desde o último fsync
+        self.stats = {"records": 0, "bytes": 0, "fsyncs": 0, "missed": 0}
+        self.file = open(path, "ab")
+        with self._locked(exclusive=True):
+            self._catch_up(truncate=True)
+
+    @contextlib.contextmanager
+    def _locked(self, exclusive):
+        """Trava o arquivo entre processos (sem ``fcntl`` ou sem ``shared``: um worker só)."""
+        if fcntl is None or not self.shared:
+            yield
+            return
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+    def _catch_up(self, truncate=False):
+        """
+        Indexa as linhas acrescentadas (por qualquer worker) desde a última
+        leitura. Com a trava exclusiva (``truncate``), uma última linha
+        incompleta só pode ser de um processo que caiu no meio: é descartada.
+        """
+        size = os.fstat(self.file.fileno()).st_size
+        if size == self.indexed:
+            return
+        offset = self.indexed
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                self._index_record(record, offset)
+                offset += len(line)
+        self.indexed = offset
+        if truncate and offset != size:
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+
+    def _refresh(self):
+        """Índice em dia com as linhas dos outros workers (leitura)."""
+        if self.shared:
+            with self._locked(exclusive=False):
+                self._catch_up()
+
+    @staticmethod
+    def _add_record(index, record, offset):
+        """Posição do registro na entrada da partida em ``index`` (ou None sem início)."""
+        kind = record["t"]
+        if kind == "start":
+            index[record["g"]] = {"start": offset, "moves": [], "end": None}
+        entry = index.get(record["g"])
+        if entry is not None:
+            if kind in ("move", "timeout"):
+                entry["moves"].append(offset)
+            elif kind == "end":
+                entry["end"] = offset
+        return entry
+
+    def _index_record(self, record, offset):
+        game_id = record["g"]
+        entry = self._add_record(self.index, record, offset)
+        if record["t"] == "start":
+            self.live[record["room"]] = game_id
+        elif record["t"] == "end" and entry is not None:
+            del self.index[game_id]  # Terminada: relida do arquivo quando pedida
+            room_id = game_id.split("-", 1)[0]
+            if self.live.get(room_id) == game_id:
+                del self.live[room_id]
+
+    def _scan(self):
+        """Índice de todas as partidas (terminadas inclusive), lido do arquivo inteiro."""
+        self._refresh()
+        index = {}
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if offset >= self.indexed:
+                    break
+                self._add_record(index, json.loads(line), offset)
+                offset += len(line)
+        return index
+
+    # ----------------------------------------
+    # Escrita
+    # ----------------------------------------
+
+    def append(self, record, room_id=None, optional=False):
+        """
+        Acrescenta um registro; o fsync sai a cada ``fsync_batch`` registros.
+        Com ``room_id``, o registro vai para a partida em andamento da sala
+        (campo "g"), vista no log depois das linhas dos outros workers;
+        sem partida, conta em ``stats["missed"]`` e retorna False. Com
+        ``optional`` a falta de partida é esperada e só retorna False.
+        """
+        with self._locked(exclusive=True):
+            if self.shared:
+                self._catch_up(truncate=True)
+            if room_id is not None:
+                game_id = self.live.get(room_id)
+                if game_id is None:
+                    if optional:
+                        return False
+                    self.stats["missed"] += 1
+                    print(f"⚠️ Log de partidas: registro {record['t']!r} da sala {room_id} "
+                          "sem partida em andamento")
+                    return False
+                record = {"t": record["t"], "g": game_id, **record}
+            line = json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+            self.file.seek(0, os.SEEK_END)
+            self.file.write(line)
+            self.file.flush()
+            self._index_record(record, self.indexed)
+            self.indexed += len(line)
+        self.stats["records"] += 1
+        self.stats["bytes"] += len(line)
+        self.pending += 1
+        if self.pending >= self.fsync_batch:
+            self.sync()
+        return True
+
+    def sync(self):
+        """Garante no disco o que já foi escrito (chamado em lote)."""
+        if self.pending:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+            self.stats["fsyncs"] += 1
+
+    def start_game(self, room, tokens=None):
+        """Início da partida da sala; retorna o id da partida no log."""
+        game_id = f"{room.room_id}-{int(time.time() * 1000)}"
+        game = room.game
+        self.append({
+            "t": "start", "g": game_id, "room": room.room_id,
+            "p1": game.player1_name, "p2": game.player2_name, "mode": game.mode,
+            "tokens": tokens or {}, "ts": round(time.time(), 3),
+        })
+        return game_id
+
+    def record_move(self, room_id, seq, move, move_time=0):
+        """Um salto aplicado (``move`` = (linha, coluna, linha, coluna))."""
+        record = {"t": "move", "n": seq, "m": list(move)}
+        if move_time:
+            record["dt"] = round(move_time, 2)
+        return self.append(record, room_id)
+
+    def record_timeout(self, room_id, seq):
+        """Tempo da vez esgotado depois do salto ``seq`` (a vez passou)."""
+        return self.append({"t": "timeout", "n": seq}, room_id)
+
+    def end_game(self, room_id, winner=None, reason="winner", player=None):
+        """
+        Fim da partida: ``reason`` é "winner" (lance final), "surrender"
+        (``player`` desistiu), "draw" ou "abandoned" (sala fechada no meio).
+        Uma sala fechada sem partida em andamento (ninguém entrou, ou o fim
+        já foi registrado) não é registro perdido: "abandoned" só vale se a
+        partida está no log.
+        """
+        record = {"t": "end", "winner": winner, "reason": reason}
+        if player is not None:
+            record["player"] = player
+        return self.append(record, room_id, optional=reason == "abandoned")
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+    # ----------------------------------------
+    # Leitura e replay
+    # ----------------------------------------
+
+    @staticmethod
+    def _read_entry(f, entry):
+        def read(offset):
+            f.seek(offset)
+            return json.loads(f.readline())
+        return {
+            "start": read(entry["start"]),
+            "moves": [read(offset) for offset in entry["moves"]],
+            "end": read(entry["end"]) if entry["end"] is not None else None,
+        }
+
+    def read_game(self, game_id):
+        """
+        Registros da partida: {"start": ..., "moves": [...], "end": ... ou None}.
+        Uma partida terminada não está no índice: o arquivo é lido inteiro.
+        """
+        self._refresh()
+        entry = self.index.get(game_id) or self._scan().get(game_id)
+        if entry is None:
+            return None
+        with open(self.path, "rb") as f:
+            return self._read_entry(f, entry)
+
+    def replay(self, game_id, ply=None):
+        """
+        Reconstrói a partida até o ``ply`` (saltos e tempos esgotados
+        aplicados; None = até o fim, incluindo desistência). Retorna (CheckersGame, registro de início)
+        ou None se a partida não está no log.
+        """
+        records = self.read_game(game_id)
+        if records is None:
+            return None
+        start = records["start"]
+        game = CheckersGame()
+        game.configure_game(start["p1"], start["p2"], start.get("mode", "multiplayer"))
+        moves = records["moves"] if ply is None else records["moves"][:ply]
+        for record in moves:
+            if record["t"] == "timeout":
+                game.timeout_turn()
+                continue
+            start_r, start_c, end_r, end_c = record["m"]
+            success, message = game.move_piece(start_r, start_c, end_r, end_c, record.get("dt", 0))[:2]
+            if not success:
+                raise ValueError(f"{game_id}: lance {record['n']} inválido no replay ({message})")
+        end = records["end"]
+        if ply is None and end is not None and not game.winner:
+            if end["reason"] == "surrender":
+                game.surrender(end["player"])
+            elif end["reason"] == "draw":
+                game.declare_draw()
+        return game, start
+
+    def unfinished_games(self):
+        """{room_id: game_id} das partidas que não terminaram."""
+        self._refresh()
+        return dict(self.live)
+
+    def list_games(self):
+        """[(game_id, lances, terminou)] em ordem de início."""
+        return [(game_id, len(entry["moves"]), entry["end"] is not None)
+                for game_id, entry in sorted(self._scan().items(), key=lambda item: item[1]["start"])]
+
+    def finished_games(self):
+        """(game_id, registros como em ``read_game``) das partidas terminadas, numa leitura só."""
+        index = self._scan()
+        with open(self.path, "rb") as f:
+            for game_id, entry in sorted(index.items(), key=lambda item: item[1]["start"]):
+                if entry["end"] is not None:
+                    yield game_id, self._read_entry(f, entry)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lista e reproduz partidas do log.")
+    parser.add_argument("game_id", nargs="?", help="partida a reproduzir")
+    parser.add_argument("--log", default=GAME_LOG_PATH)
+    parser.add_argument("--ply", type=int, help="para depois deste salto")
+    args = parser.parse_args(argv)
+
+    log = GameLog(args.log)
+    try:
+        if args.game_id is None:
+            for game_id, moves, finished in log.list_games():
+                print(f"{game_id:24} {moves:4} lances {'fim' if finished else 'em andamento'}")
+            return 0
+        result = log.replay(args.game_id, args.ply)
+        if result is None:
+            print(f"Partida não encontrada: {args.game_id}")
+            return 1
+        game, start = result
+        symbols = {0: ".", 1: "o", 2: "x", 3: "O", 4: "X"}
+        print(f"{start['p1']} (o) x {start['p2']} (x) - {game.seq} lances")
+        for row in game.board_rows():
+            print(" ".join(symbols[cell] for cell in row))
+        if game.winner:
+            print(f"Vencedor: {game.winner}")
+        else:
+            print(f"Vez de: {game.player1_name if game.turn == P1 else game.player2_name}")
+        return 0
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
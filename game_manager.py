@@ -3,58 +3,196 @@ Gerenciador de Salas de Jogo Multiplayer
 Gerencia múltiplas partidas simultâneas
 """
 
+import bisect
+import heapq
+import json
+import os
 import random
+import secrets
 import string
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
 
-# Importar CheckersGame do app.py
-# Será importado dinamicamente para evitar dependência circular
+from checkers_game import CheckersGame, P1
+from room_store import RoomConflict, create_room_store
+
+# Partidas locais/PvC simultâneas por nó e tempo ocioso até a remoção
+SESSION_MAX_GAMES = int(os.environ.get("SESSION_MAX_GAMES", 5000))
+SESSION_IDLE_TIMEOUT = int(os.environ.get("SESSION_IDLE_TIMEOUT", 1800))  # 30 minutos
+
+# Salas por página na listagem do lobby
+LOBBY_PAGE_SIZE = 20
+LOBBY_MAX_PAGE_SIZE = 100
+
+# Espectadores por sala (por nó)
+SPECTATOR_LIMIT = int(os.environ.get("SPECTATOR_LIMIT", 200))
+# Lances enviados a um espectador e ainda não confirmados antes de considerá-lo lento
+SPECTATOR_MAX_BACKLOG = int(os.environ.get("SPECTATOR_MAX_BACKLOG", 16))
+
+# Partida rápida: rating Elo e janela de diferença aceita (cresce com a espera)
+DEFAULT_RATING = 1200
+MIN_RATING, MAX_RATING = 100, 3000
+ELO_K = 32
+MATCH_BASE_WINDOW = 100  # Diferença aceita logo ao entrar na fila
+MATCH_WINDOW_GROWTH = 25  # Pontos a mais por segundo de espera
+MATCH_MAX_WINDOW = 800
+MATCH_RATE_WINDOW = 60  # Segundos usados no cálculo de pareamentos/s
+
+# Status da sala. Salas lidas do room store voltam para estes mesmos objetos
+# (from_dict), em vez de uma cópia da string em cada sala
+WAITING, PLAYING, FINISHED = "waiting", "playing", "finished"
+ROOM_STATUSES = {status: status for status in (WAITING, PLAYING, FINISHED)}
+
+# Tempo sem atividade até a sala expirar, por status
+ROOM_TTL = {
+    WAITING: int(os.environ.get("ROOM_WAITING_TTL", 3600)),  # 1 hora sem adversário
+    PLAYING: int(os.environ.get("ROOM_IDLE_TTL", 1800)),  # 30 minutos sem lances
+    FINISHED: int(os.environ.get("ROOM_FINISHED_TTL", 300)),  # 5 minutos após o fim
+}
+
+# Segundos sem eventos até a partida soltar a tabela de movimentos e o estado serializado
+ROOM_CACHE_IDLE = int(os.environ.get("ROOM_CACHE_IDLE", 60))
+
+# Nome do convidado mostrado enquanto a sala espera um adversário
+WAITING_GUEST_NAME = "Aguardando..."
 
 class GameRoom:
     """Representa uma sala de jogo."""
     
+    __slots__ = (
+        "room_id", "host_name", "host_sid", "guest_name", "guest_sid", "game",
+        "created_at", "status", "player1_sid", "player2_sid", "encodings",
+        "version", "rated_players", "tokens", "cpu_time",
+    )
+    
     def __init__(self, room_id, host_name, host_sid):
         self.room_id = room_id
         self.host_name = host_name
         self.host_sid = host_sid  # Socket ID do host
         self.guest_name = None
         self.guest_sid = None
-        self.game = None  # Instância do CheckersGame
-        self.created_at = datetime.now()
-        self.status = "waiting"  # waiting, playing, finished
+        self.game = None  # Instância do CheckersGame (uma só durante toda a vida da sala)
+        self.created_at = time.time()
+        self.status = WAITING  # WAITING, PLAYING ou FINISHED
         self.player1_sid = None
         self.player2_sid = None
+        self.encodings = {}  # {socket_id: formato do tabuleiro} - ver BOARD_ENCODINGS
+        self.version = 0  # Versão no room store compartilhado (0 = ainda não gravada)
+        self.rated_players = {}  # {socket_id: player_id} - só em salas da partida rápida
+        # Tokens de reconexão ("host"/"guest"): voltam à sala com outro socket
+        self.tokens = {"host": secrets.token_urlsafe(12)}
+        self.cpu_time = 0.0  # Segundos de CPU gastos nos handlers da sala (todos os nós)
+    
+    def lobby_summary(self):
+        """Resumo da sala na listagem do lobby."""
+        return {
+            "room_id": self.room_id,
+            "host_name": self.host_name,
+            "created_at": self.created_at_iso()
+        }
+    
+    def created_at_iso(self):
+        return datetime.fromtimestamp(self.created_at).isoformat()
+    
+    def to_dict(self):
+        """Sala serializável (JSON) para o room store compartilhado."""
+        return {
+            "room_id": self.room_id,
+            "host_name": self.host_name,
+            "host_sid": self.host_sid,
+            "guest_name": self.guest_name,
+            "guest_sid": self.guest_sid,
+            "game": self.game.to_dict() if self.game else None,
+            "created_at": self.created_at_iso(),
+            "status": self.status,
+            "player1_sid": self.player1_sid,
+            "player2_sid": self.player2_sid,
+            "encodings": self.encodings,
+            "rated_players": self.rated_players,
+            "tokens": self.tokens,
+            "cpu_time": self.cpu_time,
+        }
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói a sala de ``to_dict()``."""
+        room = cls(data["room_id"], data["host_name"], data["host_sid"])
+        room.guest_name = data["guest_name"]
+        room.guest_sid = data["guest_sid"]
+        room.game = CheckersGame.from_dict(data["game"]) if data["game"] else None
+        room.created_at = datetime.fromisoformat(data["created_at"]).timestamp()
+        room.status = ROOM_STATUSES[data["status"]]
+        room.player1_sid = data["player1_sid"]
+        room.player2_sid = data["player2_sid"]
+        room.encodings = data["encodings"]
+        room.rated_players = data.get("rated_players", {})
+        room.tokens = data.get("tokens", {})
+        room.cpu_time = data.get("cpu_time", 0.0)
+        return room
 
 class GameManager:
     """Gerencia todas as salas de jogo."""
     
-    def __init__(self):
-        self.rooms = {}  # {room_id: GameRoom}
-        self.player_rooms = {}  # {socket_id: room_id} - mapeia jogador para sala
+    def __init__(self, store=None):
+        # Salas e {socket_id: room_id} ficam no room store (memória ou compartilhado)
+        self.store = store if store is not None else create_room_store(room_factory=GameRoom.from_dict)
+        # Expiração: heap de (prazo, room_id) com uma entrada válida por sala
+        self.expiry_heap = []
+        self.deadlines = {}  # {room_id: prazo atual (time.monotonic())}
+        self.scheduled = {}  # {room_id: prazo da entrada válida no heap}
+        self.expiry_stats = {
+            "rooms_expired": 0,
+            "by_status": {status: 0 for status in ROOM_TTL},
+            "bytes_freed": 0,
+        }
+        # Lobby: salas aguardando adversário em ordem de entrada na lista.
+        # Cada entrada recebe um número crescente (cursor da paginação).
+        self.lobby = {}  # {room_id: (número, resumo)}
+        self.lobby_numbers = []  # números em ordem (pode ter removidos)
+        self.lobby_rooms = {}  # {número: room_id} - só os presentes
+        self._lobby_next = 0
+        # Chamado com ("room_added", resumo) / ("room_removed", {"room_id"})
+        self.on_lobby_change = None
+        self.matchmaking = MatchmakingQueue()
+        # CPU dos handlers por sala ainda não gravada (somada no próximo save_room)
+        self.cpu_pending = {}  # {room_id: segundos}
+        # Salas cujas partidas estão com os caches montados, a mais parada primeiro
+        self.warm_rooms = OrderedDict()  # {room_id: fim do último evento (time.monotonic())}
+        # Espectadores deste nó. Ficam fora do room store: entrar e sair não
+        # mudam a versão da sala nem disputam o compare-and-set dos lances.
+        self.spectators = {}  # {room_id: {socket_id: nome}}
+        self.spectating = {}  # {socket_id: room_id}
+        self.spectator_acks = {}  # {socket_id: último lance (seq) confirmado}
+        self.lagging_spectators = {}  # {socket_id: seq quando saiu da transmissão}
     
     def generate_room_id(self):
         """Gera um ID único para a sala."""
         while True:
             room_id = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-            if room_id not in self.rooms:
+            if room_id not in self.store:
                 return room_id
     
-    def create_room(self, host_name, host_sid):
-        """Cria uma nova sala de jogo."""
+    def create_room(self, host_name, host_sid, listed=True):
+        """Cria uma nova sala de jogo (``listed=False``: fora do lobby)."""
         room_id = self.generate_room_id()
         room = GameRoom(room_id, host_name, host_sid)
-        self.rooms[room_id] = room
-        self.player_rooms[host_sid] = room_id
+        room.game = CheckersGame()
+        room.game.configure_game(host_name, WAITING_GUEST_NAME, "multiplayer")
+        self.store.save(room)
+        self.store.set_player_room(host_sid, room_id)
+        self.touch_room(room)
+        if listed:
+            self._lobby_add(room)
         return room_id
     
     def join_room(self, room_id, guest_name, guest_sid):
         """Adiciona um jogador a uma sala existente."""
-        if room_id not in self.rooms:
+        room = self.store.get(room_id)
+        if room is None:
             return False, "Sala não encontrada!"
         
-        room = self.rooms[room_id]
-        
-        if room.status != "waiting":
+        if room.status != WAITING:
             return False, "Sala já está em jogo!"
         
         if room.guest_name:
@@ -62,79 +200,457 @@ class GameManager:
         
         room.guest_name = guest_name
         room.guest_sid = guest_sid
-        self.player_rooms[guest_sid] = room_id
-        room.status = "playing"
+        room.status = PLAYING
+        # O jogo criado com a sala recomeça do zero (o convidado anterior pode ter jogado)
+        room.game.initialize_board()
+        room.game.configure_game(room.host_name, guest_name, "multiplayer")
+        room.tokens["guest"] = secrets.token_urlsafe(12)
+        try:
+            self.store.save(room)
+        except RoomConflict:
+            return False, "Sala já está em jogo!"
+        self.store.set_player_room(guest_sid, room_id)
+        self.touch_room(room)
+        self._lobby_remove(room_id)
         
         return True, "Entrou na sala com sucesso!"
     
     def leave_room(self, socket_id):
         """Remove um jogador de uma sala."""
-        if socket_id not in self.player_rooms:
+        room_id = self.store.get_player_room(socket_id)
+        if room_id is None:
             return None
         
-        room_id = self.player_rooms[socket_id]
-        if room_id not in self.rooms:
+        room = self.store.get(room_id)
+        if room is None:
+            self.store.remove_player(socket_id)
             return None
         
-        room = self.rooms[room_id]
-        
         # Se o host sair, deleta a sala
         if socket_id == room.host_sid:
-            del self.rooms[room_id]
+            self.store.delete(room_id)
+            self.forget_room(room_id)
+            self._lobby_remove(room_id)
             if room.guest_sid:
-                del self.player_rooms[room.guest_sid]
-            del self.player_rooms[socket_id]
+                self.store.remove_player(room.guest_sid)
+            self.store.remove_player(socket_id)
             return room_id, "host"
         
         # Se o guest sair, apenas remove ele
         elif socket_id == room.guest_sid:
             room.guest_name = None
             room.guest_sid = None
-            room.status = "waiting"
-            del self.player_rooms[socket_id]
+            room.status = WAITING
+            room.encodings.pop(socket_id, None)
+            room.tokens.pop("guest", None)
+            self.save_room(room)
+            self.store.remove_player(socket_id)
+            self._lobby_add(room)
             return room_id, "guest"
         
         return None
     
+    def rejoin_room(self, room_id, token, socket_id):
+        """
+        Volta à sala com um novo socket (reconexão ou servidor reiniciado).
+        Retorna (sala, "host"/"guest") ou (None, mensagem de erro).
+        """
+        room = self.store.get(room_id)
+        if room is None or not token:
+            return None, "Sala não encontrada!"
+        
+        if token == room.tokens.get("host"):
+            side = "host"
+        elif token == room.tokens.get("guest"):
+            side = "guest"
+        else:
+            return None, "Token de reconexão inválido!"
+        
+        old_sid = room.host_sid if side == "host" else room.guest_sid
+        if old_sid:
+            self.store.remove_player(old_sid)
+        for mapping in (room.encodings, room.rated_players):
+            if old_sid in mapping:
+                mapping[socket_id] = mapping.pop(old_sid)
+        if side == "host":
+            room.host_sid = socket_id
+        else:
+            room.guest_sid = socket_id
+        if room.game is not None:
+            self.assign_player_sides(room)
+        self.save_room(room)
+        self.store.set_player_room(socket_id, room_id)
+        return room, side
+    
+    def restore_room(self, room_id, game, tokens):
+        """
+        Recria uma sala em andamento a partir do log de partidas (processo
+        reiniciado). Os jogadores voltam com ``rejoin_room``. Retorna a sala,
+        ou None se ela já existe no store.
+        """
+        if room_id in self.store:
+            return None
+        room = GameRoom(room_id, game.player1_name, None)
+        room.guest_name = game.player2_name
+        room.status = PLAYING
+        room.game = game
+        room.tokens = dict(tokens)
+        self.store.save(room)
+        self.touch_room(room)
+        return room
+    
     def get_room(self, room_id):
         """Retorna uma sala pelo ID."""
-        return self.rooms.get(room_id)
+        return self.store.get(room_id)
     
     def get_room_by_socket(self, socket_id):
         """Retorna a sala de um jogador pelo socket ID."""
-        if socket_id not in self.player_rooms:
+        room_id = self.store.get_player_room(socket_id)
+        if room_id is None:
             return None
-        room_id = self.player_rooms[socket_id]
-        return self.rooms.get(room_id)
-    
-    def get_available_rooms(self):
-        """Retorna lista de salas disponíveis."""
-        available = []
-        for room_id, room in self.rooms.items():
-            if room.status == "waiting" and not room.guest_name:
-                available.append({
-                    "room_id": room_id,
-                    "host_name": room.host_name,
-                    "created_at": room.created_at.isoformat()
-                })
-        return available
-    
-    def cleanup_empty_rooms(self):
-        """Remove salas vazias antigas (mais de 1 hora)."""
-        now = datetime.now()
-        to_remove = []
+        return self.store.get(room_id)
+    
+    def save_room(self, room):
+        """
+        Grava a sala alterada. No store compartilhado levanta ``RoomConflict``
+        se outro worker gravou a sala depois que ela foi lida.
+        """
+        pending = self.cpu_pending.pop(room.room_id, 0.0)
+        room.cpu_time += pending
+        try:
+            self.store.save(room)
+        except RoomConflict:
+            room.cpu_time -= pending
+            self.charge_cpu(room.room_id, pending)
+            raise
+        self.touch_room(room)
+    
+    def park_room(self, room_id, now=None):
+        """
+        Fim de um evento da sala. A partida mantém a tabela de movimentos
+        legais e o estado serializado para o próximo lance; só solta depois
+        de ``ROOM_CACHE_IDLE`` segundos sem eventos (``release_idle_rooms``).
+        No store compartilhado as salas não ficam residentes e não há o que
+        soltar.
+        """
+        if room_id is None or self.store.shared:
+            return
+        self.warm_rooms[room_id] = time.monotonic() if now is None else now
+        self.warm_rooms.move_to_end(room_id)
+    
+    def release_room(self, room_id):
+        """Solta os caches da partida (ver ``CheckersGame.release_caches``)."""
+        self.warm_rooms.pop(room_id, None)
+        room = self.store.get(room_id)
+        if room is not None and room.game is not None:
+            room.game.release_caches()
+    
+    def release_idle_rooms(self, now=None, idle=ROOM_CACHE_IDLE):
+        """
+        Solta os caches das partidas sem eventos há ``idle`` segundos. Só
+        olha o início da fila: o custo é proporcional às salas soltas.
+        Retorna quantas foram soltas.
+        """
+        limit = (time.monotonic() if now is None else now) - idle
+        released = 0
+        while self.warm_rooms:
+            room_id, parked = next(iter(self.warm_rooms.items()))
+            if parked > limit:
+                break
+            self.release_room(room_id)
+            released += 1
+        return released
+    
+    def charge_cpu(self, room_id, seconds):
+        """
+        Soma CPU gasta com a sala (vai para ``GameRoom.cpu_time`` no próximo
+        save). Só conta salas que este nó acompanha (``deadlines``): o trecho
+        que termina depois de ``forget_room`` (ex.: o handler que fechou a
+        sala) não deixa entrada para trás.
+        """
+        if room_id in self.deadlines:
+            self.cpu_pending[room_id] = self.cpu_pending.get(room_id, 0.0) + seconds
+    
+    def room_cpu_times(self, limit=10):
+        """[(room_id, segundos de CPU)] das salas deste nó que mais gastaram."""
+        totals = []
+        for room_id in self.deadlines:
+            room = self.store.get(room_id)
+            if room is not None:
+                totals.append((room_id, room.cpu_time + self.cpu_pending.get(room_id, 0.0)))
+        return heapq.nlargest(limit, totals, key=lambda item: item[1])
+    
+    def get_available_rooms(self, cursor=None, limit=LOBBY_PAGE_SIZE):
+        """
+        Página de salas disponíveis depois de ``cursor``. Retorna
+        {"rooms": [...], "next_cursor": número ou None}. Custa O(página):
+        o índice já está ordenado e os resumos prontos.
+        """
+        limit = max(1, min(int(limit), LOBBY_MAX_PAGE_SIZE))
+        after = int(cursor) if cursor is not None else -1
+        if self.store.shared:
+            # Salas de outros workers não passam por este índice
+            rooms, next_cursor = self.store.list_waiting(after, limit)
+            return {"rooms": rooms, "next_cursor": next_cursor}
+
+        numbers = self.lobby_numbers
+        rooms = []
+        last_number = after
+        next_cursor = None
+        for index in range(bisect.bisect_right(numbers, after), len(numbers)):
+            room_id = self.lobby_rooms.get(numbers[index])
+            if room_id is None:
+                continue  # Removida do lobby
+            if len(rooms) == limit:
+                next_cursor = last_number  # Há mais salas depois desta página
+                break
+            rooms.append(self.lobby[room_id][1])
+            last_number = numbers[index]
+        return {"rooms": rooms, "next_cursor": next_cursor}
+    
+    def _lobby_add(self, room):
+        if room.room_id in self.lobby:
+            return
+        number = self._lobby_next
+        self._lobby_next += 1
+        summary = room.lobby_summary()
+        self.lobby[room.room_id] = (number, summary)
+        self.lobby_numbers.append(number)
+        self.lobby_rooms[number] = room.room_id
+        if self.on_lobby_change:
+            self.on_lobby_change("room_added", summary)
+    
+    def _lobby_remove(self, room_id):
+        entry = self.lobby.pop(room_id, None)
+        if entry is None:
+            return
+        del self.lobby_rooms[entry[0]]
+        # Compacta quando a lista acumula muitos números removidos
+        if len(self.lobby_numbers) > 2 * len(self.lobby) + 64:
+            self.lobby_numbers = [n for n in self.lobby_numbers if n in self.lobby_rooms]
+        if self.on_lobby_change:
+            self.on_lobby_change("room_removed", {"room_id": room_id})
+    
+    def touch_room(self, room):
+        """Atividade na sala: adia a expiração conforme o status (O(log n))."""
+        deadline = time.monotonic() + ROOM_TTL.get(room.status, ROOM_TTL[PLAYING])
+        self.deadlines[room.room_id] = deadline
+        # Só empilha se o prazo encurtou (ex.: partida terminou); se aumentou,
+        # a entrada atual é reagendada quando vencer
+        scheduled = self.scheduled.get(room.room_id)
+        if scheduled is None or deadline < scheduled:
+            self.scheduled[room.room_id] = deadline
+            heapq.heappush(self.expiry_heap, (deadline, room.room_id))
+    
+    def forget_room(self, room_id):
+        """Sala removida: as entradas dela no heap passam a ser ignoradas."""
+        self.deadlines.pop(room_id, None)
+        self.scheduled.pop(room_id, None)
+        self.cpu_pending.pop(room_id, None)
+        self.warm_rooms.pop(room_id, None)
+        for socket_id in self.spectators.pop(room_id, {}):
+            self.spectating.pop(socket_id, None)
+            self.spectator_acks.pop(socket_id, None)
+            self.lagging_spectators.pop(socket_id, None)
+    
+    def expire_rooms(self, now=None):
+        """
+        Remove as salas cujo prazo venceu. Só olha o topo do heap: o custo é
+        proporcional às salas vencidas (mais entradas reagendadas), não ao
+        total de salas. Retorna a lista de salas removidas.
+        """
+        now = time.monotonic() if now is None else now
+        heap = self.expiry_heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            deadline, room_id = heapq.heappop(heap)
+            if self.scheduled.get(room_id) != deadline:
+                continue  # Entrada substituída por outra mais curta
+            current = self.deadlines[room_id]
+            if current > now:
+                # Houve atividade depois do agendamento: reagenda
+                self.scheduled[room_id] = current
+                heapq.heappush(heap, (current, room_id))
+                continue
+
+            if self.store.shared:
+                # O prazo daqui só vê a atividade deste worker: o banco decide
+                # pelo updated_at da sala, que qualquer worker atualiza
+                room, idle_until = self.store.delete_expired(room_id, ROOM_TTL, ROOM_TTL[PLAYING])
+                if room is None and idle_until is not None:
+                    current = now + max(idle_until - time.time(), 0) + 1
+                    self.deadlines[room_id] = current
+                    self.scheduled[room_id] = current
+                    heapq.heappush(heap, (current, room_id))
+                    continue
+                self.forget_room(room_id)
+                self._lobby_remove(room_id)
+                if room is None:
+                    continue
+            else:
+                self.forget_room(room_id)
+                self._lobby_remove(room_id)
+                room = self.store.get(room_id)
+                if room is None:
+                    continue
+                self.store.delete(room_id)
+            for sid in (room.host_sid, room.guest_sid):
+                if sid:
+                    self.store.remove_player(sid)
+
+            stats = self.expiry_stats
+            stats["rooms_expired"] += 1
+            stats["by_status"][room.status] = stats["by_status"].get(room.status, 0) + 1
+            # Estimativa: tamanho do estado serializado da sala
+            stats["bytes_freed"] += len(json.dumps(room.to_dict(), separators=(",", ":")))
+            expired.append(room)
+        return expired
+    
+    def add_spectator(self, room_id, socket_id, name):
+        """Adiciona um espectador (só leitura). Retorna (sala ou None, mensagem)."""
+        room = self.store.get(room_id)
+        if room is None or room.game is None:
+            return None, "Sala não encontrada!"
         
-        for room_id, room in self.rooms.items():
-            if room.status == "waiting" and not room.guest_name:
-                delta = now - room.created_at
-                if delta.total_seconds() > 3600:  # 1 hora
-                    to_remove.append(room_id)
+        if socket_id in (room.host_sid, room.guest_sid):
+            return None, "Você já joga nesta sala!"
         
-        for room_id in to_remove:
-            room = self.rooms[room_id]
-            if room.host_sid in self.player_rooms:
-                del self.player_rooms[room.host_sid]
-            del self.rooms[room_id]
+        if self.store.get_player_room(socket_id):
+            return None, "Você já está em uma sala!"
+        
+        self.remove_spectator(socket_id)
+        watchers = self.spectators.setdefault(room_id, {})
+        if len(watchers) >= SPECTATOR_LIMIT:
+            return None, "Limite de espectadores atingido!"
+        
+        watchers[socket_id] = name
+        self.spectating[socket_id] = room_id
+        self.spectator_acks[socket_id] = room.game.seq
+        return room, "Assistindo à partida."
+    
+    def remove_spectator(self, socket_id):
+        """Tira o espectador da sala. Retorna o room_id ou None."""
+        room_id = self.spectating.pop(socket_id, None)
+        if room_id is None:
+            return None
+        self.spectator_acks.pop(socket_id, None)
+        self.lagging_spectators.pop(socket_id, None)
+        watchers = self.spectators.get(room_id)
+        if watchers is not None:
+            watchers.pop(socket_id, None)
+            if not watchers:
+                del self.spectators[room_id]
+        return room_id
+    
+    def get_spectator_room(self, socket_id):
+        """Sala que o socket está assistindo (ou None)."""
+        room_id = self.spectating.get(socket_id)
+        return self.store.get(room_id) if room_id else None
+    
+    def spectator_count(self, room_id):
+        return len(self.spectators.get(room_id, ()))
+    
+    def ack_spectator(self, socket_id, seq):
+        """Espectador confirmou ter aplicado o lance ``seq``. False se não está assistindo."""
+        if socket_id not in self.spectating:
+            return False
+        self.spectator_acks[socket_id] = seq
+        return True
+    
+    def check_spectator_backlog(self, max_backlog=SPECTATOR_MAX_BACKLOG):
+        """
+        Controle de lentidão dos espectadores, só pelas confirmações do
+        cliente. Quem tem mais de ``max_backlog`` lances sem confirmação é
+        pausado (sai da transmissão); um pausado que confirmou o que já
+        estava a caminho é retomado (recebe o estado atual e volta). Retorna
+        (pausados, retomados) como listas de (socket_id, sala).
+        """
+        paused = []
+        resumed = []
+        rooms = {}
+        for socket_id, room_id in list(self.spectating.items()):
+            if room_id not in rooms:
+                rooms[room_id] = self.store.get(room_id)
+            room = rooms[room_id]
+            if room is None or room.game is None:
+                continue
+            seq = room.game.seq
+            acked = self.spectator_acks.get(socket_id, seq)
+            if socket_id not in self.lagging_spectators:
+                if seq - acked > max_backlog:
+                    self.lagging_spectators[socket_id] = seq
+                    paused.append((socket_id, room))
+            elif acked >= self.lagging_spectators[socket_id]:
+                del self.lagging_spectators[socket_id]
+                self.spectator_acks[socket_id] = seq
+                resumed.append((socket_id, room))
+        return paused, resumed
+    
+    def create_match(self, host, guest):
+        """
+        Cria a sala de um par da partida rápida (entradas da fila) e atribui
+        os lados. Retorna a sala com o jogo configurado.
+        """
+        room_id = self.create_room(host.name, host.sid, listed=False)
+        success, message = self.join_room(room_id, guest.name, guest.sid)
+        if not success:
+            raise RuntimeError(message)
+        room = self.store.get(room_id)
+        room.rated_players = {entry.sid: entry.player_id for entry in (host, guest) if entry.player_id}
+        room.encodings = {entry.sid: entry.encoding for entry in (host, guest) if entry.encoding}
+        self.assign_player_sides(room)
+        self.save_room(room)
+        return room
+    
+    def get_rating(self, player_id):
+        """Rating do jogador guardado no servidor (``DEFAULT_RATING`` se nunca jogou)."""
+        rating = self.store.get_rating(player_id) if player_id else None
+        return DEFAULT_RATING if rating is None else rating
+    
+    def finish_room(self, room):
+        """
+        Encerra a sala e grava; só depois atualiza os ratings. No store
+        compartilhado, ``RoomConflict`` sai antes de qualquer rating gravado:
+        quem chama relê a sala e tenta de novo sem contar a partida duas
+        vezes. Retorna os novos ratings (``update_ratings``) ou None.
+        """
+        status, rated_players = room.status, room.rated_players
+        room.status = FINISHED
+        room.rated_players = {}  # Só uma atualização por partida
+        try:
+            self.save_room(room)
+        except RoomConflict:
+            room.status, room.rated_players = status, rated_players
+            raise
+        return self.update_ratings(room, rated_players)
+    
+    def update_ratings(self, room, rated_players=None):
+        """
+        Fim de partida da partida rápida: novos ratings Elo dos dois
+        jogadores, gravados no store. ``rated_players`` é o
+        {socket_id: player_id} já tirado da sala (``finish_room``).
+        Retorna {"player1": rating, "player2": rating} ou None.
+        """
+        if rated_players is None:
+            rated_players = room.rated_players
+        if not rated_players or not room.game or not room.game.winner:
+            return None
+        id1 = rated_players.get(room.player1_sid)
+        id2 = rated_players.get(room.player2_sid)
+        room.rated_players = {}  # Só uma atualização por partida
+        if id1 == id2:
+            return None  # Mesmo navegador dos dois lados
+        # Pelo lado vencedor: os nomes da partida rápida podem se repetir (ou ser "Empate")
+        if room.game.draw:
+            score1 = 0.5
+        else:
+            score1 = 1.0 if room.game.winner_side == P1 else 0.0
+        new1, new2 = (max(MIN_RATING, min(MAX_RATING, rating))
+                      for rating in elo_update(self.get_rating(id1), self.get_rating(id2), score1))
+        for player_id, rating in ((id1, new1), (id2, new2)):
+            if player_id:
+                self.store.set_rating(player_id, rating)
+        return {"player1": new1, "player2": new2}
     
     def assign_player_sides(self, room):
         """Atribui lados aos jogadores (P1 ou P2)."""
@@ -143,3 +659,297 @@ class GameManager:
         room.player2_sid = room.guest_sid
         return room.host_sid, room.guest_sid
 
+
+def elo_update(rating1, rating2, score1, k=ELO_K):
+    """Novos ratings Elo depois de uma partida (``score1``: 1, 0.5 ou 0)."""
+    expected1 = 1 / (1 + 10 ** ((rating2 - rating1) / 400))
+    change = round(k * (score1 - expected1))
+    return rating1 + change, rating2 - change
+
+
+class QueueEntry:
+    """Jogador na fila da partida rápida."""
+
+    __slots__ = ("sid", "name", "rating", "joined_at", "encoding", "player_id")
+
+    def __init__(self, sid, name, rating, joined_at, encoding=None, player_id=None):
+        self.sid = sid
+        self.name = name
+        self.rating = rating  # Lido do store pelo servidor, nunca do cliente
+        self.joined_at = joined_at
+        self.encoding = encoding  # Formato do tabuleiro pedido pelo cliente
+        self.player_id = player_id  # Dono do rating (sessão do navegador)
+
+    def window(self, now):
+        """Diferença de rating aceita, que cresce com o tempo de espera."""
+        waited = now - self.joined_at
+        return min(MATCH_MAX_WINDOW, MATCH_BASE_WINDOW + MATCH_WINDOW_GROWTH * waited)
+
+
+class RatingIndex:
+    """
+    Jogadores da fila em ordem de (rating, chegada).
+
+    Os ratings são inteiros entre ``MIN_RATING`` e ``MAX_RATING``: cada
+    rating tem um balde (dict na ordem de chegada) e uma árvore de Fenwick
+    conta os jogadores por rating. Inserir, remover e achar o rating ocupado
+    anterior/seguinte custam O(log R) (R = faixa de ratings), sem deslocar
+    listas.
+    """
+
+    def __init__(self, low=MIN_RATING, high=MAX_RATING):
+        self.low = low
+        self.size = high - low + 1
+        self.tree = [0] * (self.size + 1)
+        self.buckets = {}  # {rating: {sid: QueueEntry}}
+        self.count = 0
+
+    def _add(self, rating, delta):
+        i = rating - self.low + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, rating):
+        """Jogadores com rating <= ``rating``."""
+        i = min(rating - self.low + 1, self.size)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _kth(self, k):
+        """Rating do k-ésimo jogador (1 = menor rating)."""
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < k:
+                position = nxt
+                k -= self.tree[nxt]
+            step >>= 1
+        return position + self.low
+
+    def add(self, entry):
+        self.buckets.setdefault(entry.rating, {})[entry.sid] = entry
+        self._add(entry.rating, 1)
+        self.count += 1
+
+    def remove(self, entry):
+        bucket = self.buckets[entry.rating]
+        del bucket[entry.sid]
+        if not bucket:
+            del self.buckets[entry.rating]
+        self._add(entry.rating, -1)
+        self.count -= 1
+
+    def neighbors(self, entry):
+        """
+        Vizinhos imediatos de ``entry`` (a última a chegar no seu rating):
+        (anterior, seguinte) na ordem, ou None nas pontas.
+        """
+        bucket = self.buckets[entry.rating]
+        previous = None
+        if len(bucket) > 1:
+            iterator = reversed(bucket)
+            next(iterator)
+            previous = bucket[next(iterator)]
+        else:
+            below = self._prefix(entry.rating - 1)
+            if below:
+                previous = next(reversed(self.buckets[self._kth(below)].values()))
+        following = None
+        upto = self._prefix(entry.rating)
+        if upto < self.count:
+            following = next(iter(self.buckets[self._kth(upto + 1)].values()))
+        return previous, following
+
+    def ordered(self):
+        """Todos os jogadores em ordem (varredura periódica)."""
+        return [entry for rating in sorted(self.buckets) for entry in self.buckets[rating].values()]
+
+
+class MatchmakingQueue:
+    """
+    Fila da partida rápida ordenada por rating.
+
+    A fila é um ``RatingIndex`` (ordem de rating e chegada): ``enqueue``
+    insere em O(log R) e só compara o jogador com os vizinhos imediatos
+    (os ratings mais próximos). Quem não encontrou par fica na fila e a
+    janela aceita cresce com a espera; ``pair_waiting`` (chamado
+    periodicamente) tenta de novo os vizinhos adjacentes.
+    """
+
+    def __init__(self):
+        self.index = RatingIndex()
+        self.entries = {}  # {sid: QueueEntry}
+        self.started_at = time.monotonic()
+        self.recent_pairings = deque()  # instantes dos últimos pareamentos
+        self.stats = {"enqueued": 0, "pairings": 0, "cancelled": 0, "total_wait": 0.0}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, sid):
+        return sid in self.entries
+
+    def enqueue(self, sid, name, rating, now=None, encoding=None, player_id=None):
+        """
+        Coloca o jogador na fila. Retorna o par (host, convidado) se já houver
+        adversário dentro da janela, senão None.
+        """
+        now = time.monotonic() if now is None else now
+        rating = max(MIN_RATING, min(MAX_RATING, int(rating)))
+        if sid in self.entries:
+            self._remove(self.entries[sid])
+        entry = QueueEntry(sid, name, rating, now, encoding, player_id)
+        self.index.add(entry)
+        self.entries[sid] = entry
+        self.stats["enqueued"] += 1
+
+        # Vizinhos imediatos: o de rating menor e o de rating maior
+        best = None
+        for other in self.index.neighbors(entry):
+            if other is not None and self._compatible(entry, other, now):
+                diff = abs(entry.rating - other.rating)
+                if best is None or diff < best[0]:
+                    best = (diff, other)
+        if best is None:
+            return None
+        return self._pair(best[1], entry, now)
+
+    def cancel(self, sid):
+        """Tira o jogador da fila (desistiu ou desconectou)."""
+        entry = self.entries.get(sid)
+        if entry is None:
+            return False
+        self._remove(entry)
+        self.stats["cancelled"] += 1
+        return True
+
+    def _remove(self, entry):
+        del self.entries[entry.sid]
+        self.index.remove(entry)
+
+    def pair_waiting(self, now=None):
+        """Pareia vizinhos que passaram a caber na janela. Retorna os pares."""
+        now = time.monotonic() if now is None else now
+        pairs = []
+        first = None
+        for second in self.index.ordered():
+            if first is not None and self._compatible(first, second, now):
+                # Quem espera há mais tempo é o host
+                host, guest = (second, first) if second.joined_at < first.joined_at else (first, second)
+                pairs.append(self._pair(host, guest, now))
+                first = None
+            else:
+                first = second
+        return pairs
+
+    def _compatible(self, first, second, now):
+        diff = abs(first.rating - second.rating)
+        return diff <= max(first.window(now), second.window(now))
+
+    def _pair(self, host, guest, now):
+        for entry in (host, guest):
+            self._remove(entry)
+            self.stats["total_wait"] += now - entry.joined_at
+        self.stats["pairings"] += 1
+        self.recent_pairings.append(now)
+        return host, guest
+
+    def get_stats(self, now=None):
+        """Fila atual, pareamentos/s (último minuto) e espera média."""
+        now = time.monotonic() if now is None else now
+        recent = self.recent_pairings
+        while recent and recent[0] < now - MATCH_RATE_WINDOW:
+            recent.popleft()
+        pairings = self.stats["pairings"]
+        window = min(MATCH_RATE_WINDOW, max(1e-9, now - self.started_at))
+        return {
+            "queued": len(self.entries),
+            "enqueued": self.stats["enqueued"],
+            "cancelled": self.stats["cancelled"],
+            "pairings": pairings,
+            "pairings_per_sec": round(len(recent) / window, 3),
+            "avg_wait": round(self.stats["total_wait"] / (2 * pairings), 2) if pairings else 0.0,
+        }
+
+
+class SessionRegistry:
+    """
+    Partidas locais/PvC, uma por sessão do navegador.
+
+    Cada sessão recebe um token aleatório (guardado no cookie de sessão do
+    Flask) e o registro mapeia token -> CheckersGame em um ``OrderedDict``
+    na ordem do último acesso: busca, inserção e remoção em O(1). O número
+    de partidas é limitado (a menos usada recentemente sai primeiro) e
+    sessões ociosas há mais de ``idle_timeout`` segundos são removidas.
+    """
+
+    def __init__(self, max_games=SESSION_MAX_GAMES, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_games = max_games
+        self.idle_timeout = idle_timeout
+        self.games = OrderedDict()  # {token: CheckersGame} - mais antigo primeiro
+        self.last_seen = {}  # {token: time.monotonic() do último acesso}
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.games)
+
+    def generate_token(self):
+        """Gera um token de sessão único."""
+        while True:
+            token = secrets.token_urlsafe(16)
+            if token not in self.games:
+                return token
+
+    def get_game(self, token):
+        """Retorna a partida da sessão (ou None) e marca o acesso."""
+        game = self.games.get(token) if token else None
+        if game is None:
+            return None
+        self.games.move_to_end(token)
+        self.last_seen[token] = time.monotonic()
+        return game
+
+    def get_or_create(self, token):
+        """
+        Retorna (token, partida), criando uma partida nova se preciso. Só
+        para ações explícitas (novo jogo, lance): criar pode tirar a partida
+        usada há mais tempo quando o registro está cheio; leituras usam
+        ``get_game``.
+        """
+        game = self.get_game(token)
+        if game is not None:
+            return token, game
+
+        self.cleanup_idle_games()
+        while len(self.games) >= self.max_games:
+            self.remove_game(next(iter(self.games)))
+            self.evicted += 1
+
+        token = self.generate_token()
+        game = CheckersGame()
+        self.games[token] = game
+        self.last_seen[token] = time.monotonic()
+        return token, game
+
+    def remove_game(self, token):
+        """Remove a partida de uma sessão."""
+        self.last_seen.pop(token, None)
+        return self.games.pop(token, None)
+
+    def cleanup_idle_games(self):
+        """Remove as sessões ociosas (as mais antigas ficam no início)."""
+        limit = time.monotonic() - self.idle_timeout
+        removed = 0
+        while self.games:
+            token = next(iter(self.games))
+            if self.last_seen[token] > limit:
+                break
+            self.remove_game(token)
+            removed += 1
+        self.evicted += removed
+        return removed
@@ -0,0 +1,354 @@
+"""
+Teste de carga do multiplayer (Socket.IO).
+
+Cria N pares de jogadores simulados contra o servidor eventlet. Cada par
+segue o fluxo do MULTIPLAYER.md: o host faz ``create_room``, o convidado
+faz ``join_room`` e os dois jogam a partida inteira com ``make_move``. As
+jogadas são lances legais escolhidos pelo motor de regras (``CheckersGame``
+local de cada cliente, mantido com os deltas de ``move_result``). Partidas
+longas demais terminam com ``surrender``.
+
+Mede a latência de ida e volta de cada lance (``make_move`` até o
+``move_result`` correspondente), eventos recebidos por segundo e a memória
+do servidor por sala (RSS do processo, lido em /proc - só Linux).
+
+Precisa do cliente Socket.IO:
+    pip install "python-socketio[client]"
+
+Uso:
+    python loadtest.py --spawn --pairs 10,50,100
+    python loadtest.py --url http://localhost:5000 --server-pid 1234 --pairs 50
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+from checkers_game import CheckersGame, P1, P2
+
+try:
+    import socketio
+except ImportError:  # Só o teste de carga precisa do cliente
+    socketio = None
+
+
+def percentile(values, pct):
+    """Percentil por posição mais próxima (``values`` já ordenado)."""
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values))) - 1))
+    return values[index]
+
+
+def read_rss(pid):
+    """Memória residente (bytes) do processo, ou None fora do Linux."""
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+class Stats:
+    """Contadores compartilhados pelos clientes de uma rodada."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.events = 0
+        self.moves = 0
+        self.errors = 0
+        self.resyncs = 0
+        self.games_finished = 0
+        self.rooms_ready = 0
+
+    def add(self, field, amount=1):
+        with self.lock:
+            setattr(self, field, getattr(self, field) + amount)
+
+    def add_latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.moves += 1
+
+
+class SimulatedPlayer:
+    """Um jogador: conexão Socket.IO + réplica local da partida."""
+
+    def __init__(self, pair, name, side):
+        self.pair = pair
+        self.name = name
+        self.side = side
+        self.stats = pair.stats
+        self.replica = None
+        self.sent = {}  # {seq esperado: perf_counter do envio}
+        self.sio = socketio.Client(reconnection=False)
+        for event in ("room_created", "game_state", "move_result", "move_error",
+                      "game_over", "join_error", "create_room_error"):
+            self.sio.on(event, self._wrap(getattr(self, "on_" + event)))
+
+    def _wrap(self, handler):
+        def counted(data=None):
+            self.stats.add("events")
+            handler(data)
+        return counted
+
+    def connect(self):
+        self.sio.connect(self.pair.url, transports=["websocket"])
+
+    def disconnect(self):
+        if self.sio.connected:
+            self.sio.disconnect()
+
+    # ----------------------------------------
+    # Eventos do servidor
+    # ----------------------------------------
+
+    def on_room_created(self, data):
+        self.pair.room_created(data["room_id"])
+
+    def on_game_state(self, state):
+        replica = CheckersGame()
+        replica.load_position(state["board"], state["turn"])
+        replica.seq = state["seq"]
+        self.replica = replica
+        if state["player2_name"] == "Aguardando...":
+            return  # Sala criada, ainda sem adversário
+        if self.side == P2 and not self.pair.ready:
+            self.pair.ready = True
+            self.stats.add("rooms_ready")
+        self.play()
+
+    def on_move_result(self, data):
+        delta = data["delta"]
+        if self.replica is None or delta["seq"] != self.replica.seq + 1:
+            self.stats.add("resyncs")
+            self.sio.emit("request_sync")
+            return
+        sent = self.sent.pop(delta["seq"], None)
+        if sent is not None:
+            self.stats.add_latency(time.perf_counter() - sent)
+        start_r, start_c = delta["from"]
+        end_r, end_c = delta["to"]
+        self.replica.move_piece(start_r, start_c, end_r, end_c)
+        if not delta["winner"]:
+            self.play()
+
+    def on_move_error(self, data):
+        self.stats.add("errors")
+        self.sent.clear()
+        self.sio.emit("request_sync")
+
+    def on_game_over(self, data):
+        if self.side == P1:
+            self.stats.add("games_finished")
+        self.pair.finished(self)
+
+    def on_join_error(self, data):
+        self.stats.add("errors")
+        self.pair.finished(self)
+
+    on_create_room_error = on_join_error
+
+    # ----------------------------------------
+    # Jogadas
+    # ----------------------------------------
+
+    def play(self):
+        replica = self.replica
+        if replica.turn != self.side or replica.winner:
+            return
+        if self.pair.think:
+            self.sio.sleep(self.pair.rng.uniform(0, self.pair.think))
+        if replica.seq >= self.pair.max_hops:
+            self.sio.emit("surrender")
+            return
+        legal_moves = replica.get_legal_moves()
+        if not legal_moves:
+            return
+        start = self.pair.rng.choice(sorted(legal_moves))
+        end = self.pair.rng.choice(sorted(legal_moves[start]))
+        self.sent[replica.seq + 1] = time.perf_counter()
+        self.sio.emit("make_move", {
+            "start_row": start[0], "start_col": start[1],
+            "end_row": end[0], "end_col": end[1],
+        })
+
+
+class PlayerPair:
+    """Host (P1) e convidado (P2) de uma sala."""
+
+    def __init__(self, index, url, stats, max_hops, think, seed):
+        self.url = url
+        self.stats = stats
+        self.max_hops = max_hops
+        self.think = think
+        self.rng = random.Random(seed + index)
+        self.done = threading.Event()
+        self.host = SimulatedPlayer(self, f"host{index}", P1)
+        self.guest = SimulatedPlayer(self, f"guest{index}", P2)
+        self.room_id = None
+        self.ready = False
+
+    def start(self):
+        self.host.connect()
+        self.host.sio.emit("create_room", {"player_name": self.host.name})
+
+    def room_created(self, room_id):
+        self.room_id = room_id
+        self.guest.connect()
+        self.guest.sio.emit("join_room", {"room_id": room_id, "player_name": self.guest.name})
+
+    def finished(self, player):
+        self.done.set()
+
+    def close(self):
+        self.guest.disconnect()
+        self.host.disconnect()
+
+
+def run_level(args, pairs_count, server_pid):
+    """Roda ``pairs_count`` pares simultâneos e devolve o resumo da rodada."""
+    stats = Stats()
+    rss_before = read_rss(server_pid) if server_pid else None
+    pairs = [PlayerPair(i, args.url, stats, args.max_hops, args.think, args.seed)
+             for i in range(pairs_count)]
+
+    start = time.perf_counter()
+    ramp_delay = args.ramp / pairs_count if pairs_count else 0
+    for pair in pairs:
+        try:
+            pair.start()
+        except Exception as e:  # Conexão recusada: o servidor não aguentou
+            stats.add("errors")
+            print(f"  falha ao conectar: {e}")
+            pair.done.set()
+        if ramp_delay:
+            time.sleep(ramp_delay)
+
+    # Memória com todas as salas abertas (pico)
+    rss_peak = rss_before
+    deadline = start + args.timeout
+    for pair in pairs:
+        while not pair.done.wait(0.5):
+            if server_pid:
+                rss = read_rss(server_pid)
+                if rss and (rss_peak is None or rss > rss_peak):
+                    rss_peak = rss
+            if time.perf_counter() > deadline:
+                break
+    elapsed = time.perf_counter() - start
+    unfinished = sum(1 for pair in pairs if not pair.done.is_set())
+
+    for pair in pairs:
+        pair.close()
+
+    latencies = sorted(stats.latencies)
+    result = {
+        "pairs": pairs_count,
+        "rooms_ready": stats.rooms_ready,
+        "games_finished": stats.games_finished,
+        "unfinished": unfinished,
+        "moves": stats.moves,
+        "errors": stats.errors,
+        "resyncs": stats.resyncs,
+        "elapsed": round(elapsed, 2),
+        "events_per_sec": round(stats.events / elapsed, 1) if elapsed else 0,
+        "moves_per_sec": round(stats.moves / elapsed, 1) if elapsed else 0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        },
+    }
+    if rss_before and rss_peak:
+        result["server_rss_mb"] = round(rss_peak / 2**20, 1)
+        result["kb_per_room"] = round((rss_peak - rss_before) / 1024 / max(1, stats.rooms_ready), 1)
+    return result
+
+
+def print_level(result):
+    latency = result["latency_ms"]
+    line = (f"pares={result['pairs']:<5} salas={result['rooms_ready']:<5} "
+            f"fim={result['games_finished']:<5} lances={result['moves']:<7} "
+            f"erros={result['errors']:<4} ev/s={result['events_per_sec']:<9} "
+            f"p50={latency['p50']}ms p95={latency['p95']}ms p99={latency['p99']}ms")
+    if "kb_per_room" in result:
+        line += f" rss={result['server_rss_mb']}MB ({result['kb_per_room']} KB/sala)"
+    if result["unfinished"]:
+        line += f" SEM TERMINAR={result['unfinished']}"
+    print(line)
+
+
+def spawn_server(port):
+    """Sobe ``python app.py`` na porta indicada e espera responder."""
+    env = dict(os.environ, PORT=str(port))
+    app_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+    process = subprocess.Popen([sys.executable, app_path], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + "/rooms", timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Servidor não respondeu")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga do multiplayer (Socket.IO).")
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--spawn", action="store_true", help="sobe o app.py local (porta --port)")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--server-pid", type=int, help="PID do servidor para medir memória")
+    parser.add_argument("--pairs", default="10", help="pares por rodada, ex.: 10,50,100")
+    parser.add_argument("--ramp", type=float, default=2.0, help="segundos para abrir todas as salas")
+    parser.add_argument("--think", type=float, default=0.0, help="pausa máxima antes de cada lance (s)")
+    parser.add_argument("--max-hops", type=int, default=200, help="lances antes de desistir")
+    parser.add_argument("--timeout", type=float, default=120.0, help="limite de cada rodada (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args(argv)
+
+    if socketio is None:
+        print('Instale o cliente: pip install "python-socketio[client]"')
+        return 2
+
+    server = None
+    server_pid = args.server_pid
+    if args.spawn:
+        server, args.url = spawn_server(args.port)
+        server_pid = server.pid
+
+    results = []
+    try:
+        for pairs_count in [int(n) for n in args.pairs.split(",")]:
+            result = run_level(args, pairs_count, server_pid)
+            print_level(result)
+            results.append(result)
+            time.sleep(1)  # Desconexões processadas antes da próxima rodada
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
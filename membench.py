@@ -0,0 +1,146 @@
+"""
+Memória por sala multiplayer.
+
+Cria salas no ``GameManager`` com o room store em memória (um worker, como
+no Render) seguindo o fluxo do app, e mede com ``tracemalloc`` os bytes
+que ficam alocados por sala:
+
+- ociosa: sala criada, esperando adversário no lobby, estado já enviado
+  ao host (``create_room``), parada há mais de ``ROOM_CACHE_IDLE``
+  (caches soltos por ``GameManager.release_idle_rooms``);
+- ativa: adversário entrou, relógio ligado e ``--moves`` saltos jogados
+  com o delta de cada um (``join_room`` + ``make_move``); como no app,
+  cada evento termina com ``GameManager.park_room`` e a partida fica com
+  os caches montados para o próximo lance.
+
+Entram na conta os índices do próprio ``GameManager`` (lobby, prazos de
+expiração, socket -> sala). A ``MoveTable`` do processo (jogadas por hash
+Zobrist, compartilhada por todas as partidas) tem tamanho fixo e sai à
+parte: com poucas salas ela pesaria como se fosse de cada uma. Também mostra o tamanho da sala serializada
+(``GameRoom.to_dict``, o que vai para o room store compartilhado) e a
+projeção para ``--target`` salas residentes em um worker.
+
+Uso:
+    python membench.py
+    python membench.py --rooms 20000 --moves 40 --target 100000
+"""
+
+import argparse
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from game_manager import GameManager
+from room_store import MemoryRoomStore
+from zobrist import get_move_table
+
+MEMBENCH_ROOMS = 5000
+MEMBENCH_MOVES = 30
+MEMBENCH_TARGET = 100000  # Salas residentes por worker
+MEMBENCH_SEED = 1
+
+
+def traced_bytes():
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+
+def create_rooms(manager, count):
+    """Salas esperando adversário, como depois do ``create_room`` do app."""
+    room_ids = []
+    for i in range(count):
+        room_id = manager.create_room(f"Jogador {i}", f"host-{i:016x}")
+        manager.get_room(room_id).game.get_state("packed")
+        manager.park_room(room_id)  # Fim do evento
+        room_ids.append(room_id)
+    manager.release_idle_rooms(idle=0)  # Todas paradas: caches soltos
+    return room_ids
+
+
+def play_rooms(manager, room_ids, moves, seed=MEMBENCH_SEED):
+    """Convidado entra em cada sala e a partida anda ``moves`` saltos."""
+    rng = random.Random(seed)
+    for i, room_id in enumerate(room_ids):
+        manager.join_room(room_id, f"Convidado {i}", f"guest-{i:016x}")
+        room = manager.get_room(room_id)
+        room.game.start_clock()
+        manager.assign_player_sides(room)
+        manager.save_room(room)
+        game = room.game
+        for _ in range(moves):
+            legal_moves = game.get_legal_moves()
+            if game.winner or not legal_moves:
+                break
+            start, ends = rng.choice(sorted(legal_moves.items()))
+            game.move_piece(*start, *rng.choice(sorted(ends)))
+            game.get_move_delta()
+            manager.park_room(room_id)
+        manager.save_room(room)
+
+
+def serialized_size(manager, room_ids):
+    total = sum(len(json.dumps(manager.get_room(room_id).to_dict(), separators=(",", ":")))
+                for room_id in room_ids)
+    return total / len(room_ids)
+
+
+def run(rooms=MEMBENCH_ROOMS, moves=MEMBENCH_MOVES):
+    """{"idle"/"active": {"bytes", "serialized"}, ...} por sala."""
+    manager = GameManager(store=MemoryRoomStore())
+    move_table = get_move_table()
+    move_table.clear()
+    tracemalloc.start()
+    try:
+        base = traced_bytes()
+        start = time.perf_counter()
+        room_ids = create_rooms(manager, rooms)
+        idle = (traced_bytes() - base) / rooms
+        idle_size = serialized_size(manager, room_ids)
+        play_rooms(manager, room_ids, moves)
+        with_table = traced_bytes() - base
+        # As partidas continuam com as tabelas que usam; sai só o que é da MoveTable
+        move_table.clear()
+        active = (traced_bytes() - base) / rooms
+        table_bytes = with_table - active * rooms
+        active_size = serialized_size(manager, room_ids)
+        elapsed = time.perf_counter() - start
+    finally:
+        tracemalloc.stop()
+    return {
+        "rooms": rooms,
+        "moves": moves,
+        "idle": {"bytes": round(idle), "serialized": round(idle_size)},
+        "active": {"bytes": round(active), "serialized": round(active_size)},
+        "move_table": {"bytes": round(table_bytes), "slots": move_table.size},
+        "seconds": round(elapsed, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memória por sala multiplayer.")
+    parser.add_argument("--rooms", type=int, default=MEMBENCH_ROOMS)
+    parser.add_argument("--moves", type=int, default=MEMBENCH_MOVES, help="saltos por partida ativa")
+    parser.add_argument("--target", type=int, default=MEMBENCH_TARGET, help="salas residentes por worker")
+    parser.add_argument("--json", action="store_true", help="resultado em JSON")
+    args = parser.parse_args(argv)
+
+    result = run(args.rooms, args.moves)
+    if args.json:
+        print(json.dumps(result))
+        return 0
+    print(f"{result['rooms']} salas, {result['moves']} saltos por partida ({result['seconds']}s)")
+    for kind, label in (("idle", "ociosa"), ("active", "ativa")):
+        data = result[kind]
+        projected = data["bytes"] * args.target / 2 ** 20
+        print(f"  {label:7} {data['bytes']:>6} bytes/sala  {data['serialized']:>5} bytes em JSON  "
+              f"{args.target} salas = {projected:.0f} MB")
+    table = result["move_table"]
+    print(f"  MoveTable {table['bytes'] / 2 ** 20:.1f} MB ({table['slots']} posições, fixa por processo)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
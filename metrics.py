@@ -0,0 +1,230 @@
+"""
+Métricas do servidor no formato texto do Prometheus (``GET /metrics``).
+
+Feito para ficar ligado em produção no único worker eventlet: registrar
+uma latência é um ``math.frexp``, um índice e dois incrementos em uma
+lista já alocada (sem locks - as green threads só trocam em I/O).
+
+Os histogramas são no estilo HDR: cada potência de 2 (de ~15 µs a 128 s)
+é dividida em ``SUB_BUCKETS`` faixas lineares, então o erro relativo de um
+percentil é no máximo 1/``SUB_BUCKETS``. No ``/metrics`` saem agregados
+por potência de 2 (buckets ``le`` fixos, iguais em toda coleta).
+
+    registry.observe("damas_http_request_duration_seconds", 0.003, route="/move")
+
+    @registry.timed("damas_game_function_duration_seconds", function="move_piece")
+    def move_piece(...): ...
+
+Taxas (lances/s, nós da IA/s) são contadores e também janelas de 60s
+(``RateMeter``) para quem olha o endpoint sem Prometheus.
+"""
+
+import math
+import time
+from functools import wraps
+
+HISTOGRAM_MIN_EXP = -16  # Primeiro limite: 2^-16 s (~15 µs)
+HISTOGRAM_OCTAVES = 24  # Até 2^7 s = 128 s
+SUB_BUCKETS = 4  # Faixas por potência de 2
+RATE_WINDOW = 60  # Segundos da janela das taxas
+
+
+class Histogram:
+    """Histograma de latências (segundos) com buckets log-lineares fixos."""
+
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        # Última posição: acima do maior limite (só entra em +Inf)
+        self.counts = [0] * (HISTOGRAM_OCTAVES * SUB_BUCKETS + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def record(self, value):
+        if value > 0:
+            mantissa, exponent = math.frexp(value)  # value = mantissa * 2^exponent, mantissa em [0.5, 1)
+            scaled = (mantissa - 0.5) * 2 * SUB_BUCKETS  # Exato: só potências de 2
+            sub = int(scaled)
+            index = (exponent - HISTOGRAM_MIN_EXP) * SUB_BUCKETS + sub
+            if sub == scaled:
+                index -= 1  # Em cima de um limite: bucket de baixo (``le`` inclui o limite)
+            index = min(max(index, 0), HISTOGRAM_OCTAVES * SUB_BUCKETS)
+        else:
+            index = 0
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    @staticmethod
+    def bucket_bound(index):
+        """Limite superior (segundos) do bucket fino ``index``."""
+        octave, sub = divmod(index, SUB_BUCKETS)
+        return math.ldexp(1 + (sub + 1) / SUB_BUCKETS, octave + HISTOGRAM_MIN_EXP - 1)
+
+    def percentile(self, q):
+        """Limite superior do bucket onde cai o percentil ``q`` (0-100), ou 0 sem amostras."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if index == len(self.counts) - 1:
+                    return math.inf
+                return self.bucket_bound(index)
+        return math.inf
+
+    def octave_counts(self):
+        """[(limite le, contagem acumulada)] por potência de 2, sem o +Inf."""
+        result = []
+        cumulative = 0
+        for octave in range(HISTOGRAM_OCTAVES):
+            start = octave * SUB_BUCKETS
+            cumulative += sum(self.counts[start:start + SUB_BUCKETS])
+            result.append((math.ldexp(1, octave + HISTOGRAM_MIN_EXP), cumulative))
+        return result
+
+
+class RateMeter:
+    """Eventos por segundo na última janela (um contador por segundo, em anel)."""
+
+    __slots__ = ("window", "stamps", "counts")
+
+    def __init__(self, window=RATE_WINDOW):
+        self.window = window
+        self.stamps = [0] * window
+        self.counts = [0] * window
+
+    def add(self, amount=1, now=None):
+        second = int(time.time() if now is None else now)
+        slot = second % self.window
+        if self.stamps[slot] != second:
+            self.stamps[slot] = second
+            self.counts[slot] = 0
+        self.counts[slot] += amount
+
+    def rate(self, now=None):
+        second = int(time.time() if now is None else now)
+        total = sum(count for stamp, count in zip(self.stamps, self.counts)
+                    if second - self.window < stamp <= second)
+        return total / self.window
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+    """Contadores, histogramas e gauges (calculados na coleta) do processo."""
+
+    def __init__(self):
+        self.counters = {}  # {nome: {labels: valor}}
+        self.histograms = {}  # {nome: {labels: Histogram}}
+        self.gauges = {}  # {nome: (tipo, função () -> valor ou [(labels, valor)])}
+        self.help = {}
+
+    def describe(self, name, help_text):
+        self.help[name] = help_text
+
+    def histogram(self, name, **labels):
+        series = self.histograms.setdefault(name, {})
+        key = _label_key(labels)
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        return histogram
+
+    def observe(self, name, seconds, **labels):
+        self.histogram(name, **labels).record(seconds)
+
+    def inc(self, name, amount=1, **labels):
+        series = self.counters.setdefault(name, {})
+        key = _label_key(labels)
+        series[key] = series.get(key, 0) + amount
+
+    def gauge(self, name, help_text, function, kind="gauge"):
+        """
+        Valor lido só na coleta; ``function`` retorna um número ou
+        [({labels}, valor)]. ``kind="counter"`` para totais que outro objeto
+        já mantém (ex.: nós da IA no ``AIPool``).
+        """
+        self.help[name] = help_text
+        self.gauges[name] = (kind, function)
+
+    def timed(self, name, **labels):
+        """Decorador: latência de cada chamada em ``name`` (histograma resolvido uma vez)."""
+        histogram = self.histogram(name, **labels)
+
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.record(time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        lines = []
+
+        def header(name, kind):
+            if name in self.help:
+                lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name in sorted(self.counters):
+            header(name, "counter")
+            for key, value in sorted(self.counters[name].items()):
+                lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+
+        for name in sorted(self.gauges):
+            kind, function = self.gauges[name]
+            try:
+                value = function()
+            except Exception:
+                continue  # Gauge com erro não derruba a coleta
+            header(name, kind)
+            if isinstance(value, list):
+                for labels, item in value:
+                    lines.append(f"{name}{_format_labels(_label_key(labels))} {_format_value(item)}")
+            else:
+                lines.append(f"{name} {_format_value(value)}")
+
+        for name in sorted(self.histograms):
+            header(name, "histogram")
+            for key, histogram in sorted(self.histograms[name].items()):
+                if not histogram.count:
+                    continue
+                for bound, cumulative in histogram.octave_counts():
+                    lines.append(f"{name}_bucket{_format_labels(key, (('le', _format_value(bound)),))} {cumulative}")
+                lines.append(f'{name}_bucket{_format_labels(key, (("le", "+Inf"),))} {histogram.count}')
+                lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+# Registro único do processo (o app expõe em /metrics)
+registry = Registry()
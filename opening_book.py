@@ -0,0 +1,253 @@
+"""
+Livro de aberturas da IA.
+
+Tabela compacta de jogadas por posição, consultada antes da busca: nas
+posições mais frequentes do começo da partida a IA responde com uma
+consulta ao arquivo (microssegundos) em vez de uma busca alpha-beta.
+
+Formato do arquivo (little-endian):
+
+    cabeçalho  "DAMABOOK", versão (uint32), entradas (uint32)
+    entradas   hash Zobrist da posição com o lado a jogar (uint64),
+               casa de origem (uint8), casa final (uint8), peso (uint16)
+
+As entradas ficam ordenadas por hash, uma por jogada; o arquivo é aberto com
+``mmap`` e consultado por busca binária direto nos bytes, sem carregar a
+tabela em objetos Python (os workers compartilham as páginas do arquivo).
+
+A jogada é identificada pela casa de origem e pela casa final do caminho
+completo; na consulta ela é conferida contra as jogadas legais da posição.
+
+O livro é gerado offline a partir de partidas gravadas (``game_log.py``)
+e/ou de partidas da própria IA:
+
+    python opening_book.py --log game_log.ndjson --self-play 200
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from bitboard import P1, opponent, square_index
+from checkers_game import CheckersGame
+from search import SearchEngine, generate_moves, make_move
+from zobrist import hash_position
+
+OPENING_BOOK_PATH = os.environ.get(
+    "OPENING_BOOK",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"))
+
+BOOK_MAGIC = b"DAMABOOK"
+BOOK_VERSION = 1
+HEADER = struct.Struct("<8sII")
+ENTRY = struct.Struct("<QBBH")
+BOOK_MAX_PLY = 16  # Jogadas (de cada lado somadas) registradas por partida
+BOOK_MIN_COUNT = 2  # Ocorrências mínimas para a jogada entrar no livro
+MAX_WEIGHT = 0xFFFF
+
+
+class OpeningBook:
+    """Livro de aberturas aberto com ``mmap`` (somente leitura)."""
+
+    def __init__(self, path=OPENING_BOOK_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            self.data.close()
+            raise ValueError(f"Livro de aberturas inválido: {path}")
+        if HEADER.size + count * ENTRY.size > len(self.data):
+            self.data.close()
+            raise ValueError(f"Livro de aberturas truncado: {path}")
+        self.count = count
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return self.count
+
+    def _key_at(self, index):
+        return struct.unpack_from("<Q", self.data, HEADER.size + index * ENTRY.size)[0]
+
+    def probe(self, key):
+        """Jogadas do livro para a posição: [(origem, destino, peso)]."""
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        entries = []
+        index = low
+        while index < self.count:
+            entry_key, from_sq, to_sq, weight = ENTRY.unpack_from(
+                self.data, HEADER.size + index * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((from_sq, to_sq, weight))
+            index += 1
+        return entries
+
+    def choose(self, key, board, player, rng=random):
+        """
+        Jogada do livro (caminho de casas, como ``SearchResult.move[0]``) ou
+        None. Entre as jogadas da posição, sorteia proporcionalmente ao peso.
+        """
+        entries = self.probe(key)
+        if not entries:
+            self.misses += 1
+            return None
+        paths = {}
+        for squares, _ in generate_moves(board, player):
+            paths.setdefault((squares[0], squares[-1]), squares)
+        candidates = [(paths[(from_sq, to_sq)], weight)
+                      for from_sq, to_sq, weight in entries if (from_sq, to_sq) in paths]
+        if not candidates:
+            self.misses += 1
+            return None
+        self.hits += 1
+        total = sum(weight for _, weight in candidates)
+        pick = rng.uniform(0, total)
+        for path, weight in candidates:
+            pick -= weight
+            if pick <= 0:
+                return path
+        return candidates[-1][0]
+
+    def close(self):
+        self.data.close()
+
+
+def load_opening_book(path=OPENING_BOOK_PATH):
+    """Abre o livro se o arquivo existir (sem livro a IA só faz busca)."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        return OpeningBook(path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Livro de aberturas ignorado: {str(e)}")
+        return None
+
+
+# ----------------------------------------
+# Geração
+# ----------------------------------------
+
+def count_game(counts, moves, max_ply=BOOK_MAX_PLY):
+    """
+    Soma as jogadas completas de uma partida em ``counts``
+    {(hash, origem, destino): ocorrências}. ``moves`` são saltos
+    (linha, coluna, linha, coluna), como no log de partidas.
+    """
+    game = CheckersGame()
+    ply = 0
+    turn_start = None
+    for start_r, start_c, end_r, end_c in moves:
+        if turn_start is None:
+            turn_start = (game.position_key(), square_index(start_r, start_c))
+        if not game.move_piece(start_r, start_c, end_r, end_c)[0]:
+            return
+        if game._pending_paths is None:
+            key, from_sq = turn_start
+            entry = (key, from_sq, square_index(end_r, end_c))
+            counts[entry] = counts.get(entry, 0) + 1
+            turn_start = None
+            ply += 1
+            if ply >= max_ply or game.winner:
+                return
+
+
+def count_logged_games(counts, log_path, max_ply=BOOK_MAX_PLY):
+    """Partidas terminadas do log de partidas. Retorna quantas foram lidas."""
+    from game_log import GameLog
+
+    log = GameLog(log_path)
+    games = 0
+    try:
+        for _, records in log.finished_games():
+            moves = []
+            for record in records["moves"]:
+                if record["t"] != "move":
+                    break  # Vez perdida no relógio: o resto não é abertura jogada
+                moves.append(record["m"])
+            count_game(counts, moves, max_ply)
+            games += 1
+    finally:
+        log.close()
+    return games
+
+
+def count_self_play(counts, games, depth=4, time_limit=0.05, explore=0.2,
+                    max_ply=BOOK_MAX_PLY, seed=1):
+    """
+    Partidas da própria IA. Com probabilidade ``explore`` um lado joga uma
+    jogada aleatória (variedade de aberturas); só as jogadas escolhidas pela
+    busca entram no livro.
+    """
+    rng = random.Random(seed)
+    engine = SearchEngine(depth, time_limit)
+    for _ in range(games):
+        board = CheckersGame().get_bitboard()
+        player = P1
+        for _ in range(max_ply):
+            moves = generate_moves(board, player)
+            if not moves:
+                break
+            if rng.random() < explore:
+                move = rng.choice(moves)
+            else:
+                move = engine.search(board, player).move
+                squares = move[0]
+                entry = (hash_position(board, player), squares[0], squares[-1])
+                counts[entry] = counts.get(entry, 0) + 1
+            make_move(board, player, move)
+            player = opponent(player)
+
+
+def write_book(counts, path, min_count=BOOK_MIN_COUNT):
+    """Grava as entradas com pelo menos ``min_count`` ocorrências. Retorna quantas."""
+    entries = sorted((key, from_sq, to_sq, min(count, MAX_WEIGHT))
+                     for (key, from_sq, to_sq), count in counts.items() if count >= min_count)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(entries)))
+        for entry in entries:
+            f.write(ENTRY.pack(*entry))
+    os.replace(tmp_path, path)  # Troca atômica: workers com o antigo mapeado continuam
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera o livro de aberturas da IA.")
+    parser.add_argument("--log", help="log de partidas (game_log.ndjson)")
+    parser.add_argument("--self-play", type=int, default=0, help="partidas da IA contra ela mesma")
+    parser.add_argument("--depth", type=int, default=4, help="profundidade da busca no self-play")
+    parser.add_argument("--max-ply", type=int, default=BOOK_MAX_PLY)
+    parser.add_argument("--min-count", type=int, default=BOOK_MIN_COUNT)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=OPENING_BOOK_PATH)
+    args = parser.parse_args(argv)
+
+    if not args.log and not args.self_play:
+        parser.error("informe --log e/ou --self-play")
+
+    counts = {}
+    if args.log:
+        games = count_logged_games(counts, args.log, args.max_ply)
+        print(f"{games} partidas do log")
+    if args.self_play:
+        count_self_play(counts, args.self_play, depth=args.depth,
+                        max_ply=args.max_ply, seed=args.seed)
+        print(f"{args.self_play} partidas de self-play")
+    written = write_book(counts, args.out, args.min_count)
+    print(f"{written} jogadas gravadas em {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,340 @@
+"""
+Perft e benchmark do motor de regras.
+
+O perft conta as folhas da árvore de jogadas até a profundidade N, a partir
+da posição inicial e de posições difíceis (damas voadoras, capturas
+múltiplas com lei da maioria, promoção). Uma jogada é a sequência completa
+de captura, como no ``search.py``. Os mesmos números são calculados pelo
+motor de bitboards (``generate_moves`` + make/unmake) e pelo
+``CheckersGame`` (``get_legal_moves`` + ``move_piece``): qualquer diferença
+é erro de regra.
+
+O benchmark mede chamadas por segundo de ``get_captures``,
+``get_simple_moves``, ``is_valid_move`` e ``check_winner`` nos dois motores
+do ``CheckersGame`` (matriz e bitboard).
+
+Uso:
+    python perft.py                 # roda e mostra os resultados
+    python perft.py --save          # grava perft_baseline.json
+    python perft.py --compare       # compara com perft_baseline.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from bitboard import EMPTY, P1, P2, P1_KING, P2_KING
+from checkers_game import CheckersGame
+from search import generate_moves, make_move, unmake_move
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perft_baseline.json")
+
+# Peças no diagrama: o/O = pedra/dama do P1 (sobe), x/X = pedra/dama do P2 (desce)
+PIECE_CHARS = {".": EMPTY, "o": P1, "O": P1_KING, "x": P2, "X": P2_KING}
+
+# nome -> (diagrama, vez, profundidade)
+POSITIONS = {
+    "inicial": (None, P1, 6),
+    "dama_voadora": ((
+        "........",
+        "..x.....",
+        "........",
+        "....x...",
+        "........",
+        "..x.....",
+        ".....o..",
+        "O.......",
+    ), P1, 5),
+    "captura_multipla": ((
+        ".x......",
+        "......x.",
+        "........",
+        "..x.....",
+        "........",
+        "..x.x...",
+        "...o....",
+        "o.....o.",
+    ), P1, 5),
+    "damas": ((
+        "...X....",
+        "........",
+        ".X......",
+        "......x.",
+        ".....O..",
+        "........",
+        ".o......",
+        "..O.....",
+    ), P2, 4),
+    "promocao": ((
+        "........",
+        "..x.o...",
+        ".o......",
+        "........",
+        "........",
+        "........",
+        "...x.x..",
+        "....o...",
+    ), P1, 5),
+}
+
+BENCH_POSITIONS = 200
+BENCH_SEED = 2024
+BENCH_ROUNDS = 5  # Vale a melhor rodada (menos ruído de outros processos)
+
+
+def parse_diagram(diagram):
+    """Converte o diagrama (8 strings) na matriz 8x8 do ``CheckersGame``."""
+    board = [[PIECE_CHARS[ch] for ch in row] for row in diagram]
+    for row in range(8):
+        for col in range(8):
+            if board[row][col] != EMPTY and (row + col) % 2 != 1:
+                raise ValueError(f"Peça em casa clara: ({row}, {col})")
+    return board
+
+
+def new_game(name, use_bitboard=False):
+    diagram, turn, _ = POSITIONS[name]
+    game = CheckersGame(use_bitboard=use_bitboard)
+    if diagram is not None:
+        game.load_position(parse_diagram(diagram), turn)
+    return game
+
+
+# ----------------------------------------
+# Perft
+# ----------------------------------------
+
+def perft_bitboard(board, player, depth):
+    """Folhas até ``depth`` com o motor de bitboards."""
+    if depth == 0:
+        return 1
+    moves = generate_moves(board, player)
+    if depth == 1:
+        return len(moves)
+    opponent = P2 if player == P1 else P1
+    nodes = 0
+    for move in moves:
+        undo = make_move(board, player, move)
+        nodes += perft_bitboard(board, opponent, depth - 1)
+        unmake_move(board, undo)
+    return nodes
+
+
+def perft_game(game, depth):
+    """
+    Folhas até ``depth`` com o ``CheckersGame``. Os saltos de uma captura
+    múltipla são aplicados um a um; a profundidade só diminui quando a vez
+    passa para o adversário.
+    """
+    if depth == 0:
+        return 1
+    nodes = 0
+    for start, moves in game.get_legal_moves().items():
+        for end in moves:
+            child = copy.deepcopy(game)
+            child.move_piece(start[0], start[1], end[0], end[1])
+            if child.turn == game.turn:
+                nodes += perft_game(child, depth)  # Captura continua
+            else:
+                nodes += perft_game(child, depth - 1)
+    return nodes
+
+
+def run_perft(name, depth=None, game_depth=None):
+    """
+    Perft de uma posição. Retorna {"nodes": [...], "nps": ...}; com
+    ``game_depth`` confere as contagens contra o ``CheckersGame`` até ali.
+    """
+    depth = depth or POSITIONS[name][2]
+    game = new_game(name)
+    board = game.get_bitboard()
+    nodes = []
+    total = 0
+    start = time.perf_counter()
+    for d in range(1, depth + 1):
+        count = perft_bitboard(board, game.turn, d)
+        nodes.append(count)
+        total += count
+    elapsed = time.perf_counter() - start
+    result = {"nodes": nodes, "nps": round(total / elapsed) if elapsed else 0}
+
+    if game_depth:
+        for d in range(1, min(game_depth, depth) + 1):
+            count = perft_game(new_game(name), d)
+            if count != nodes[d - 1]:
+                raise AssertionError(
+                    f"{name}: perft({d}) bitboard={nodes[d - 1]} CheckersGame={count}")
+    return result
+
+
+# ----------------------------------------
+# Benchmark das funções do CheckersGame
+# ----------------------------------------
+
+def sample_boards(count=BENCH_POSITIONS, seed=BENCH_SEED):
+    """Posições (tabuleiro, vez) de partidas aleatórias com semente fixa."""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        game = CheckersGame()
+        for _ in range(rng.randint(0, 60)):
+            legal_moves = game.get_legal_moves()
+            if not legal_moves or game.winner:
+                break
+            start = rng.choice(sorted(legal_moves))
+            end = rng.choice(sorted(legal_moves[start]))
+            game.move_piece(start[0], start[1], end[0], end[1])
+        if game._pending_paths is None:
+            boards.append((game.board_rows(), game.turn))
+    return boards
+
+
+def _timed(games, call, rounds=BENCH_ROUNDS):
+    """Chamadas por segundo de ``call(game)`` (cada posição começa sem cache)."""
+    best = 0
+    for _ in range(rounds):
+        calls = 0
+        start = time.perf_counter()
+        for game in games:
+            game.invalidate_legal_moves()
+            calls += call(game)
+        elapsed = time.perf_counter() - start
+        if elapsed:
+            best = max(best, round(calls / elapsed))
+    return best
+
+
+def _get_captures(game):
+    squares = [(r, c) for r in range(8) for c in range(8) if game.board[r * 8 + c] != EMPTY]
+    for row, col in squares:
+        game.get_captures(row, col)
+    return len(squares)
+
+
+def _get_simple_moves(game):
+    squares = [(r, c) for r in range(8) for c in range(8) if game.board[r * 8 + c] != EMPTY]
+    for row, col in squares:
+        game.get_simple_moves(row, col)
+    return len(squares)
+
+
+def _is_valid_move(game):
+    # Todas as peças do jogador contra as quatro casas diagonais vizinhas
+    calls = 0
+    for row in range(8):
+        for col in range(8):
+            if game.is_piece_of_player(game.board[row * 8 + col], game.turn):
+                for dr in (-1, 1):
+                    for dc in (-1, 1):
+                        game.is_valid_move(row, col, row + dr, col + dc)
+                        calls += 1
+    return calls
+
+
+def _check_winner(game):
+    game.check_winner()
+    game.winner = game.winner_side = None
+    return 1
+
+
+BENCH_FUNCTIONS = {
+    "get_captures": _get_captures,
+    "get_simple_moves": _get_simple_moves,
+    "is_valid_move": _is_valid_move,
+    "check_winner": _check_winner,
+}
+
+
+def run_bench(boards):
+    """{motor: {função: chamadas/s}} para os dois motores do ``CheckersGame``."""
+    results = {}
+    for engine, use_bitboard in (("lista", False), ("bitboard", True)):
+        games = []
+        for board, turn in boards:
+            game = CheckersGame(use_bitboard=use_bitboard)
+            game.load_position(board, turn)
+            games.append(game)
+        results[engine] = {name: _timed(games, call) for name, call in BENCH_FUNCTIONS.items()}
+    return results
+
+
+# ----------------------------------------
+# Linha de comando
+# ----------------------------------------
+
+def run_all(check_depth):
+    perft = {name: run_perft(name, game_depth=check_depth) for name in POSITIONS}
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "perft": perft,
+        "bench": run_bench(sample_boards()),
+    }
+
+
+def print_results(results, baseline=None):
+    """Mostra os resultados; com ``baseline``, a razão de velocidade (atual/base)."""
+    def ratio(current, base):
+        return f" ({current / base:.2f}x)" if base else ""
+
+    print("Perft (folhas por profundidade)")
+    for name, data in results["perft"].items():
+        base = baseline["perft"].get(name, {}) if baseline else {}
+        print(f"  {name:18} {data['nodes']}  {data['nps']} nós/s{ratio(data['nps'], base.get('nps'))}")
+
+    print("Chamadas por segundo")
+    for engine, functions in results["bench"].items():
+        base = baseline["bench"].get(engine, {}) if baseline else {}
+        for name, value in functions.items():
+            print(f"  {engine:8} {name:18} {value:>10}{ratio(value, base.get(name))}")
+
+
+def compare(results, baseline):
+    """Lista de diferenças nas contagens do perft (devem ser idênticas)."""
+    errors = []
+    for name, data in baseline["perft"].items():
+        current = results["perft"].get(name)
+        if current is None:
+            errors.append(f"{name}: posição removida")
+        elif current["nodes"] != data["nodes"]:
+            errors.append(f"{name}: {current['nodes']} != base {data['nodes']}")
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Perft e benchmark do motor de regras.")
+    parser.add_argument("--save", action="store_true", help=f"grava {os.path.basename(BASELINE_FILE)}")
+    parser.add_argument("--compare", action="store_true", help="compara com a base gravada")
+    parser.add_argument("--check-depth", type=int, default=3,
+                        help="profundidade conferida contra o CheckersGame (0 desliga)")
+    args = parser.parse_args(argv)
+
+    results = run_all(args.check_depth)
+
+    baseline = None
+    if args.compare:
+        with open(BASELINE_FILE, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_results(results, baseline)
+
+    if args.save:
+        with open(BASELINE_FILE, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"Base gravada em {BASELINE_FILE}")
+
+    if baseline is not None:
+        errors = compare(results, baseline)
+        for error in errors:
+            print(f"ERRO {error}")
+        return 1 if errors else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
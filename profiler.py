@@ -0,0 +1,282 @@
+"""
+Diagnóstico do loop do eventlet: CPU por sala, handlers lentos e profiler
+por amostragem.
+
+Todas as green threads rodam na mesma thread do sistema; enquanto uma
+delas não cede (I/O, ``sleep``), nenhuma outra sala anda. O ``LoopMonitor``
+acompanha as trocas de green thread (``greenlet.settrace``):
+
+- cada handler marca o seu contexto (nome do handler, sala) na green
+  thread que o executa;
+- a cada troca, o tempo de CPU do trecho que acabou vai para a sala do
+  contexto (``charge``, que soma em ``GameRoom.cpu_time``);
+- trecho maior que ``SLOW_HANDLER_THRESHOLD`` é registrado como lento;
+  um watchdog (thread nativa) avisa também enquanto o loop ainda está
+  preso, com a pilha atual.
+
+O trace custa uma chamada Python em toda troca de green thread, então só
+fica ligado com ``LOOP_MONITOR=1`` ou enquanto o profiler roda; desligado,
+``enter``/``exit`` não fazem nada e a CPU por sala não é contada.
+
+O profiler por amostragem é ligado e desligado em tempo de execução: uma
+thread nativa lê a pilha da thread do loop a cada ``PROFILER_INTERVAL``
+e conta as amostras por (handler, sala) e por pilha. Desliga sozinho
+depois de ``PROFILER_MAX_DURATION`` segundos.
+
+Este módulo não importa Flask; o eventlet só é usado (se existir) para
+criar threads nativas mesmo com o ``monkey_patch``.
+"""
+
+import os
+import sys
+import time
+import weakref
+from collections import Counter, deque
+
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "") not in ("", "0")  # Trace sempre ligado
+SLOW_HANDLER_THRESHOLD = float(os.environ.get("SLOW_HANDLER_THRESHOLD", 0.1))  # Segundos
+PROFILER_INTERVAL = float(os.environ.get("PROFILER_INTERVAL", 0.005))  # Segundos entre amostras
+PROFILER_MAX_DURATION = float(os.environ.get("PROFILER_MAX_DURATION", 300))
+PROFILER_STACK_DEPTH = 40
+SLOW_EVENTS_KEPT = 50
+IDLE = ("(ocioso)", None)
+
+
+def _native(module):
+    """Módulo original (``threading``/``time`` do sistema, mesmo com monkey_patch)."""
+    try:
+        from eventlet.patcher import original
+        return original(module)
+    except ImportError:
+        return __import__(module)
+
+
+def format_stack(frame, depth=PROFILER_STACK_DEPTH):
+    """Pilha da raiz até ``frame`` como "arquivo:função;arquivo:função;..."."""
+    names = []
+    while frame is not None and len(names) < depth:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class LoopMonitor:
+    """Contexto por green thread, CPU por sala, trechos lentos e amostragem."""
+
+    def __init__(self, charge=None, threshold=SLOW_HANDLER_THRESHOLD, always=LOOP_MONITOR):
+        self.charge = charge  # charge(room_id, segundos de CPU)
+        self.threshold = threshold
+        self.always = always  # Trace ligado mesmo sem o profiler
+        self.tracing = False  # Trocas rastreadas agora (desligar vale na próxima troca)
+        self.contexts = weakref.WeakKeyDictionary()  # {greenlet: (handler, room_id)}
+        self.current = None  # Contexto da green thread em execução
+        self.switched_at = time.perf_counter()
+        self.cpu_at = time.thread_time()
+        self.slow_events = deque(maxlen=SLOW_EVENTS_KEPT)
+        self.slow_count = 0
+        self.handler_cpu = Counter()  # {handler: segundos de CPU}
+        self.loop_thread_id = None
+        self._getcurrent = None
+        self._settrace = None
+        self._hub = None  # Greenlet do hub: o tempo nele é espera por I/O, não loop preso
+        self.in_hub = False
+        self._stall_reported = None  # switched_at do trecho já avisado pelo watchdog
+        # Profiler por amostragem
+        self.profiling = False
+        self.profile_started = None
+        self.profile_stopped = None
+        self.samples = Counter()  # {(handler, room_id): amostras}
+        self.stacks = Counter()  # {pilha: amostras}
+        # Trava nativa: a thread de amostragem escreve nos contadores enquanto o report() lê
+        self._samples_lock = _native("threading").Lock()
+
+    def install(self):
+        """
+        Prepara o monitor na thread do loop e liga o watchdog. O rastreamento
+        das trocas começa já com ``always``; senão, com o profiler.
+        """
+        import greenlet
+
+        threading = _native("threading")
+        self.loop_thread_id = threading.get_ident()
+        self._getcurrent = greenlet.getcurrent
+        self._settrace = greenlet.settrace
+        try:
+            from eventlet.hubs import get_hub
+            self._hub = get_hub().greenlet
+        except ImportError:
+            pass
+        watchdog = threading.Thread(target=self._watchdog, name="loop-watchdog", daemon=True)
+        watchdog.start()
+        if self.always:
+            self._start_tracing()
+
+    def _start_tracing(self):
+        """Liga o trace das trocas (na thread do loop: ``greenlet.settrace`` é por thread)."""
+        if self.tracing:
+            return
+        self.contexts.clear()  # Marcados antes de desligar, sem o exit correspondente
+        self.current = None
+        self.switched_at = time.perf_counter()
+        self.cpu_at = time.thread_time()
+        self.tracing = True
+        self._settrace(self._on_switch)
+
+    # ----------------------------------------
+    # Contexto dos handlers
+    # ----------------------------------------
+
+    def enter(self, handler, room_id=None):
+        """Marca a green thread atual como executando ``handler`` da sala ``room_id``."""
+        if not self.tracing:
+            return
+        context = (handler, room_id)
+        self.contexts[self._getcurrent()] = context
+        self._account()
+        self.current = context
+
+    def exit(self):
+        if not self.tracing:
+            return
+        self.contexts.pop(self._getcurrent(), None)
+        self._account()
+        self.current = None
+
+    def _account(self):
+        """Fecha o trecho em execução: CPU para o contexto atual, aviso se foi lento."""
+        now = time.perf_counter()
+        cpu = time.thread_time()
+        elapsed = now - self.switched_at
+        used = cpu - self.cpu_at
+        context = self.current
+        if context is not None:
+            handler, room_id = context
+            self.handler_cpu[handler] += used
+            if room_id is not None and self.charge is not None:
+                self.charge(room_id, used)
+        if elapsed > self.threshold and not self.in_hub:
+            self._slow(elapsed, context)
+        self.switched_at = now
+        self.cpu_at = cpu
+
+    def _on_switch(self, event, args):
+        if not self.tracing:
+            # Desligado (talvez pela thread do profiler): o trace sai aqui, na thread do loop
+            self._settrace(None)
+            self.current = None
+            return
+        if event != "switch" and event != "throw":
+            return
+        self._account()
+        target = args[1]
+        self.in_hub = target is self._hub
+        self.current = self.contexts.get(target)
+
+    def _slow(self, elapsed, context):
+        handler, room_id = context or ("?", None)
+        self.slow_count += 1
+        self.slow_events.append({
+            "handler": handler, "room_id": room_id, "ms": round(elapsed * 1000, 1),
+            "at": round(time.time(), 3),
+        })
+        where = f" (sala {room_id})" if room_id else ""
+        print(f"🐢 Loop preso {elapsed * 1000:.0f}ms em {handler}{where}")
+
+    def _loop_frame(self):
+        return sys._current_frames().get(self.loop_thread_id)
+
+    def _watchdog(self):
+        """Thread nativa: avisa (com a pilha) quando um trecho passa do limite sem ceder."""
+        sleep = _native("time").sleep
+        while True:
+            sleep(self.threshold)
+            started = self.switched_at
+            elapsed = time.perf_counter() - started
+            if not self.tracing:
+                continue  # Sem trace o início do trecho não anda
+            if elapsed > self.threshold * 2 and not self.in_hub and self._stall_reported != started:
+                self._stall_reported = started
+                frame = self._loop_frame()
+                stack = format_stack(frame) if frame is not None else None
+                handler, room_id = self.current or ("?", None)
+                print(f"🐢 Loop preso há {elapsed * 1000:.0f}ms em {handler}"
+                      f"{f' (sala {room_id})' if room_id else ''}: {stack}")
+
+    # ----------------------------------------
+    # Profiler por amostragem
+    # ----------------------------------------
+
+    def start_profiler(self, interval=PROFILER_INTERVAL, max_duration=PROFILER_MAX_DURATION):
+        """
+        Começa uma nova amostragem (descarta a anterior) e liga o trace das
+        trocas. Chamado na thread do loop. False se já está ligado.
+        """
+        if self.profiling or self._settrace is None:
+            return False
+        with self._samples_lock:
+            self.samples = Counter()
+            self.stacks = Counter()
+        self._start_tracing()
+        self.profiling = True
+        self.profile_started = time.time()
+        self.profile_stopped = None
+        sampler = _native("threading").Thread(
+            target=self._sample_loop, args=(interval, max_duration), name="loop-profiler", daemon=True)
+        sampler.start()
+        return True
+
+    def stop_profiler(self):
+        """Para a amostragem (de qualquer thread); sem ``always`` o trace sai na próxima troca."""
+        if not self.profiling:
+            return False
+        self.profiling = False
+        self.profile_stopped = time.time()
+        self.tracing = self.always
+        return True
+
+    def _sample_loop(self, interval, max_duration):
+        sleep = _native("time").sleep
+        deadline = time.monotonic() + max_duration
+        while self.profiling:
+            sleep(interval)
+            frame = self._loop_frame()
+            if frame is None:
+                continue
+            context = self.current
+            if context is None:
+                # Fora de handler: o hub (esperando I/O) ou uma green thread sem contexto
+                context = IDLE if self.in_hub else ("?", None)
+            stack = format_stack(frame) if context is not IDLE else None
+            with self._samples_lock:
+                self.samples[context] += 1
+                if stack is not None:
+                    self.stacks[stack] += 1
+            if time.monotonic() >= deadline:
+                self.stop_profiler()
+
+    def report(self, limit=20):
+        """Resultado da amostragem (em andamento ou a última) e os trechos lentos recentes."""
+        with self._samples_lock:
+            samples = self.samples.copy()
+            stacks = self.stacks.copy()
+        # handler_cpu só muda na thread do loop (a mesma do report); a cópia é por garantia
+        handler_cpu = self.handler_cpu.copy()
+        total = sum(samples.values())
+        end = self.profile_stopped or time.time()
+        return {
+            "profiling": self.profiling,
+            "tracing": self.tracing,
+            "duration": round(end - self.profile_started, 2) if self.profile_started else 0,
+            "samples": total,
+            "handlers": [
+                {"handler": handler, "room_id": room_id, "samples": count,
+                 "percent": round(100 * count / total, 1)}
+                for (handler, room_id), count in samples.most_common(limit)
+            ],
+            # Formato "folded" (flamegraph.pl / speedscope): "pilha amostras"
+            "stacks": [f"{stack} {count}" for stack, count in stacks.most_common(limit)],
+            "handler_cpu": {handler: round(seconds, 3) for handler, seconds in handler_cpu.most_common(limit)},
+            "slow_count": self.slow_count,
+            "slow_events": list(self.slow_events),
+        }
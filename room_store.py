@@ -0,0 +1,270 @@
+"""
+Armazenamento das salas multiplayer.
+
+O ``GameManager`` guarda as salas em um "room store":
+
+- ``MemoryRoomStore``: dicionários do próprio processo (padrão, um worker).
+- ``SQLiteRoomStore``: arquivo SQLite em modo WAL compartilhado por vários
+  workers/processos na mesma máquina. Cada sala é gravada como JSON compacto
+  (``GameRoom.to_dict``, tabuleiro em 24 caracteres) e lida de novo a cada
+  evento, então qualquer worker pode atender qualquer jogador da sala.
+
+Os ratings da partida rápida também ficam no store, por jogador
+(``player_id`` da sessão do navegador), para valerem em qualquer worker.
+
+Com vários workers, o Socket.IO também precisa de uma fila de mensagens
+(``SOCKETIO_MESSAGE_QUEUE``) para que um evento emitido em um worker chegue
+aos clientes conectados nos outros.
+
+Escolha pelo ambiente: ``ROOM_STORE=memory`` ou ``ROOM_STORE=sqlite:///caminho.db``.
+"""
+
+import json
+import os
+import sqlite3
+import time
+
+try:
+    # Com o monkey_patch do eventlet, ``threading`` passa a ser por green
+    # thread; a conexão é por thread do sistema (a do hub atende todas)
+    from eventlet import sleep as _yield_sleep
+    from eventlet.patcher import original
+    _thread_id = original("_thread").get_ident
+except ImportError:
+    from _thread import get_ident as _thread_id
+    from time import sleep as _yield_sleep
+
+ROOM_STORE_URL = os.environ.get("ROOM_STORE", "memory")
+
+# O busy handler do SQLite bloqueia a thread do sistema, ou seja, o hub do
+# eventlet inteiro: espera curta no SQLite e o resto em eventlet.sleep
+SQLITE_BUSY_TIMEOUT = 0.01  # segundos bloqueando por tentativa
+SQLITE_LOCK_WAIT = 5.0  # segundos de espera total pela trava de escrita
+SQLITE_RETRY_DELAY = 0.005  # primeira pausa entre tentativas (dobra até 0,1 s)
+
+
+class RoomConflict(Exception):
+    """A sala foi alterada por outro worker desde que foi lida."""
+
+
+class MemoryRoomStore:
+    """Salas em dicionários do processo (os objetos são os próprios)."""
+
+    shared = False
+
+    def __init__(self):
+        self.rooms = {}  # {room_id: GameRoom}
+        self.player_rooms = {}  # {socket_id: room_id}
+        self.ratings = {}  # {player_id: rating}
+
+    def get(self, room_id):
+        return self.rooms.get(room_id)
+
+    def save(self, room):
+        self.rooms[room.room_id] = room
+
+    def delete(self, room_id):
+        self.rooms.pop(room_id, None)
+
+    def __contains__(self, room_id):
+        return room_id in self.rooms
+
+    def all_rooms(self):
+        return list(self.rooms.values())
+
+    def get_player_room(self, socket_id):
+        return self.player_rooms.get(socket_id)
+
+    def set_player_room(self, socket_id, room_id):
+        self.player_rooms[socket_id] = room_id
+
+    def remove_player(self, socket_id):
+        self.player_rooms.pop(socket_id, None)
+
+    def get_rating(self, player_id):
+        return self.ratings.get(player_id)
+
+    def set_rating(self, player_id, rating):
+        self.ratings[player_id] = rating
+
+
+class SQLiteRoomStore:
+    """
+    Salas em um arquivo SQLite (WAL) compartilhado entre processos.
+
+    Cada sala tem uma versão; ``save`` só grava se a versão no banco ainda é
+    a que foi lida (senão levanta ``RoomConflict``), para que dois workers
+    não sobrescrevam o lance um do outro.
+    """
+
+    shared = True
+
+    def __init__(self, path, room_factory):
+        self.path = path
+        self.room_factory = room_factory  # dict -> GameRoom
+        self._conns = {}  # {id da thread do sistema: conexão}
+        self._retry(self._conn().executescript, """
+            CREATE TABLE IF NOT EXISTS rooms (
+                room_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS player_rooms (
+                socket_id TEXT PRIMARY KEY,
+                room_id TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS rooms_status ON rooms (status);
+            CREATE TABLE IF NOT EXISTS ratings (
+                player_id TEXT PRIMARY KEY,
+                rating INTEGER NOT NULL,
+                updated_at REAL NOT NULL
+            );
+        """)
+
+    def _conn(self):
+        # Uma conexão por thread do sistema (sqlite3 não compartilha conexões
+        # entre threads); as green threads do hub usam a mesma, pois uma
+        # consulta não cede no meio
+        thread_id = _thread_id()
+        conn = self._conns.get(thread_id)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT, isolation_level=None)
+            self._retry(conn.execute, "PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conns[thread_id] = conn
+        return conn
+
+    def _execute(self, sql, params=()):
+        return self._retry(self._conn().execute, sql, params)
+
+    def _retry(self, call, *args):
+        """
+        Chama ``call`` e, com o banco travado por outro worker, cede às
+        outras green threads (``eventlet.sleep``) e tenta de novo até
+        ``SQLITE_LOCK_WAIT`` segundos.
+        """
+        deadline = time.monotonic() + SQLITE_LOCK_WAIT
+        delay = SQLITE_RETRY_DELAY
+        while True:
+            try:
+                return call(*args)
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) and "busy" not in str(e):
+                    raise
+                if time.monotonic() >= deadline:
+                    raise
+            _yield_sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def get(self, room_id):
+        row = self._execute(
+            "SELECT version, data FROM rooms WHERE room_id = ?", (room_id,)).fetchone()
+        if row is None:
+            return None
+        room = self.room_factory(json.loads(row[1]))
+        room.version = row[0]
+        return room
+
+    def save(self, room):
+        data = json.dumps(room.to_dict(), separators=(",", ":"))
+        if room.version == 0:
+            cursor = self._execute(
+                "INSERT OR IGNORE INTO rooms (room_id, version, status, updated_at, data) "
+                "VALUES (?, 1, ?, ?, ?)", (room.room_id, room.status, time.time(), data))
+        else:
+            cursor = self._execute(
+                "UPDATE rooms SET version = version + 1, status = ?, updated_at = ?, data = ? "
+                "WHERE room_id = ? AND version = ?",
+                (room.status, time.time(), data, room.room_id, room.version))
+        if cursor.rowcount != 1:
+            raise RoomConflict(room.room_id)
+        room.version += 1
+
+    def delete(self, room_id):
+        self._execute("DELETE FROM rooms WHERE room_id = ?", (room_id,))
+        self._execute("DELETE FROM player_rooms WHERE room_id = ?", (room_id,))
+
+    def delete_expired(self, room_id, ttls, default_ttl):
+        """
+        Remove a sala só se ela está parada há mais que o TTL do seu status
+        (``updated_at`` no banco, atualizado por qualquer worker). Retorna
+        (sala removida, None), (None, instante em que venceria) se houve
+        atividade, ou (None, None) se a sala não existe mais.
+        """
+        row = self._execute(
+            "SELECT version, status, updated_at, data FROM rooms WHERE room_id = ?",
+            (room_id,)).fetchone()
+        if row is None:
+            return None, None
+        version, status, updated_at, data = row
+        idle_until = updated_at + ttls.get(status, default_ttl)
+        if idle_until > time.time():
+            return None, idle_until
+        # Só apaga a versão lida: um lance entre a leitura e o DELETE a mantém
+        cursor = self._execute(
+            "DELETE FROM rooms WHERE room_id = ? AND version = ?", (room_id, version))
+        if cursor.rowcount != 1:
+            return None, time.time()
+        self._execute("DELETE FROM player_rooms WHERE room_id = ?", (room_id,))
+        room = self.room_factory(json.loads(data))
+        room.version = version
+        return room, None
+
+    def __contains__(self, room_id):
+        return self._execute(
+            "SELECT 1 FROM rooms WHERE room_id = ?", (room_id,)).fetchone() is not None
+
+    def all_rooms(self):
+        rows = self._execute("SELECT version, data FROM rooms").fetchall()
+        rooms = []
+        for version, data in rows:
+            room = self.room_factory(json.loads(data))
+            room.version = version
+            rooms.append(room)
+        return rooms
+
+    def list_waiting(self, after, limit):
+        """
+        Página de salas aguardando adversário (ordem de criação, cursor =
+        rowid). Só as linhas da página são decodificadas.
+        """
+        rows = self._execute(
+            "SELECT rowid, data FROM rooms WHERE status = 'waiting' AND rowid > ? "
+            "ORDER BY rowid LIMIT ?", (after, limit + 1)).fetchall()
+        rooms = [self.room_factory(json.loads(data)).lobby_summary() for _, data in rows[:limit]]
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return rooms, next_cursor
+
+    def get_player_room(self, socket_id):
+        row = self._execute(
+            "SELECT room_id FROM player_rooms WHERE socket_id = ?", (socket_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_player_room(self, socket_id, room_id):
+        self._execute(
+            "INSERT OR REPLACE INTO player_rooms (socket_id, room_id) VALUES (?, ?)",
+            (socket_id, room_id))
+
+    def remove_player(self, socket_id):
+        self._execute("DELETE FROM player_rooms WHERE socket_id = ?", (socket_id,))
+
+    def get_rating(self, player_id):
+        row = self._execute(
+            "SELECT rating FROM ratings WHERE player_id = ?", (player_id,)).fetchone()
+        return row[0] if row else None
+
+    def set_rating(self, player_id, rating):
+        self._execute(
+            "INSERT OR REPLACE INTO ratings (player_id, rating, updated_at) VALUES (?, ?, ?)",
+            (player_id, rating, time.time()))
+
+
+def create_room_store(url=ROOM_STORE_URL, room_factory=None):
+    """Cria o store a partir da URL (``memory`` ou ``sqlite:///caminho.db``)."""
+    if url == "memory":
+        return MemoryRoomStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteRoomStore(url[len("sqlite:///"):], room_factory)
+    raise ValueError(f"ROOM_STORE desconhecido: {url}")
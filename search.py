@@ -0,0 +1,315 @@
+"""
+Motor de busca da IA (Romano).
+
+Alpha-beta (negamax) com aprofundamento iterativo, ordenação de jogadas
+(melhor jogada da iteração anterior, killer moves e heurística de histórico)
+e limite de tempo por jogada. A busca trabalha direto sobre um ``BitBoard``
+com make/unmake: cada jogada só troca os quatro inteiros da posição, sem
+copiar tabuleiros.
+
+Uma jogada é uma tupla ``(casas, capturadas)``: ``casas`` é o caminho
+completo (origem, pousos...) e ``capturadas`` a máscara de bits das peças
+tomadas (0 para movimento simples).
+"""
+
+import time
+from collections import namedtuple
+
+from bitboard import (
+    BIT, P1, P2, ROW_MASK, PROMOTION_MASK,
+    opponent, popcount,
+)
+from zobrist import (
+    EXACT, LOWER, UPPER,
+    get_shared_table, hash_position, unpack_move, update_for_move,
+)
+
+MAN_VALUE = 100
+KING_VALUE = 300
+WIN_SCORE = 100000
+INFINITY = WIN_SCORE + 1
+
+# Nível de dificuldade -> limites da busca (profundidade máxima e segundos)
+DIFFICULTY_LEVELS = {
+    "facil": {"depth": 2, "time": 0.2},
+    "medio": {"depth": 6, "time": 1.0},
+    "dificil": {"depth": 64, "time": 2.5},
+}
+DEFAULT_DIFFICULTY = "medio"
+
+# Limite de profundidade da quiescência (sequências de capturas forçadas)
+MAX_QUIESCENCE_PLY = 16
+# A cada N nós o relógio é consultado
+TIME_CHECK_INTERVAL = 1024
+# Scores acima disso são vitória/derrota forçada (ajustados por ply na TT)
+MATE_THRESHOLD = WIN_SCORE - 1000
+
+SearchResult = namedtuple("SearchResult", ["move", "score", "depth", "nodes", "elapsed"])
+
+
+class SearchTimeout(Exception):
+    """Tempo da busca esgotado (interrompe a iteração atual)."""
+
+
+# Bônus de avanço das pedras: quanto mais perto da promoção, melhor
+ADVANCE_BONUS = {
+    P1: tuple((7 - row) * 4 for row in range(8)),
+    P2: tuple(row * 4 for row in range(8)),
+}
+# Pedras na linha de base dificultam a promoção do adversário
+BACK_ROW = {P1: ROW_MASK[7], P2: ROW_MASK[0]}
+BACK_ROW_BONUS = 8
+# Casas centrais (linhas 3 e 4) valem um pouco mais
+CENTER_MASK = ROW_MASK[3] | ROW_MASK[4]
+CENTER_BONUS = 5
+
+
+def generate_moves(board, player):
+    """Jogadas completas de ``player`` (capturas pela lei da maioria primeiro)."""
+    paths = board.capture_sequences(player)
+    if paths:
+        moves = []
+        for path in paths:
+            mask = 0
+            for sq in path.captured:
+                mask |= BIT[sq]
+            moves.append((path.squares, mask))
+        return moves
+
+    table = board.simple_move_table(player)
+    return [((from_sq, to_sq), 0) for from_sq, dests in table.items() for to_sq in dests]
+
+
+def make_move(board, player, move):
+    """Aplica ``move`` em ``board``. Retorna o estado anterior para ``unmake_move``."""
+    undo = (board.p1_men, board.p1_kings, board.p2_men, board.p2_kings)
+    squares, captured = move
+    from_bit = BIT[squares[0]]
+    to_bit = BIT[squares[-1]]
+
+    if player == P1:
+        if board.p1_men & from_bit:
+            board.p1_men &= ~from_bit
+            if to_bit & PROMOTION_MASK[P1]:
+                board.p1_kings |= to_bit
+            else:
+                board.p1_men |= to_bit
+        else:
+            board.p1_kings = (board.p1_kings & ~from_bit) | to_bit
+        if captured:
+            board.p2_men &= ~captured
+            board.p2_kings &= ~captured
+    else:
+        if board.p2_men & from_bit:
+            board.p2_men &= ~from_bit
+            if to_bit & PROMOTION_MASK[P2]:
+                board.p2_kings |= to_bit
+            else:
+                board.p2_men |= to_bit
+        else:
+            board.p2_kings = (board.p2_kings & ~from_bit) | to_bit
+        if captured:
+            board.p1_men &= ~captured
+            board.p1_kings &= ~captured
+    return undo
+
+
+def unmake_move(board, undo):
+    """Desfaz a jogada restaurando os quatro bitboards."""
+    board.p1_men, board.p1_kings, board.p2_men, board.p2_kings = undo
+
+
+def evaluate(board, player):
+    """Avaliação estática do ponto de vista de ``player``."""
+    score = 0
+    for side, sign in ((player, 1), (opponent(player), -1)):
+        men = board.men(side)
+        kings = board.kings(side)
+        value = popcount(men) * MAN_VALUE + popcount(kings) * KING_VALUE
+        bonus = ADVANCE_BONUS[side]
+        for row in range(8):
+            row_men = men & ROW_MASK[row]
+            if row_men:
+                value += popcount(row_men) * bonus[row]
+        value += popcount(men & BACK_ROW[side]) * BACK_ROW_BONUS
+        value += popcount((men | kings) & CENTER_MASK) * CENTER_BONUS
+        score += sign * value
+    return score
+
+
+class SearchEngine:
+    """Busca alpha-beta com aprofundamento iterativo e limite de tempo."""
+
+    def __init__(self, max_depth=6, time_limit=1.0, table=None):
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+        self.table = table if table is not None else get_shared_table()
+        self.nodes = 0
+        self.deadline = None
+        self.killers = []
+        self.history = {}
+
+    @classmethod
+    def for_difficulty(cls, difficulty):
+        limits = DIFFICULTY_LEVELS.get(difficulty, DIFFICULTY_LEVELS[DEFAULT_DIFFICULTY])
+        return cls(limits["depth"], limits["time"])
+
+    def search(self, board, player):
+        """
+        Procura a melhor jogada de ``player`` em ``board`` (que é alterado
+        durante a busca e restaurado ao final).
+        """
+        start = time.perf_counter()
+        self.deadline = start + self.time_limit
+        self.nodes = 0
+        self.killers = [[None, None] for _ in range(self.max_depth + MAX_QUIESCENCE_PLY + 2)]
+        self.history = {}
+
+        moves = generate_moves(board, player)
+        if not moves:
+            return SearchResult(None, -WIN_SCORE, 0, 0, time.perf_counter() - start)
+        best_move = moves[0]
+        best_score = 0
+        completed_depth = 0
+
+        # Jogada única não precisa de busca
+        if len(moves) == 1:
+            return SearchResult(best_move, evaluate(board, player), 0, 1, time.perf_counter() - start)
+
+        key = hash_position(board, player)
+        entry = self.table.probe(key)
+        if entry is not None:
+            best_move = unpack_move(entry[3], moves) or best_move
+
+        for depth in range(1, self.max_depth + 1):
+            try:
+                score, move = self._search_root(board, player, key, moves, best_move, depth)
+            except SearchTimeout:
+                break
+            best_move, best_score, completed_depth = move, score, depth
+            if abs(score) >= MATE_THRESHOLD:
+                break  # Vitória/derrota forçada encontrada
+
+        return SearchResult(best_move, best_score, completed_depth, self.nodes, time.perf_counter() - start)
+
+    def _search_root(self, board, player, key, moves, pv_move, depth):
+        ordered = [pv_move] + [m for m in moves if m != pv_move]
+        alpha = -INFINITY
+        best_move = ordered[0]
+        for move in ordered:
+            child_key = update_for_move(key, board, player, move)
+            undo = make_move(board, player, move)
+            try:
+                score = -self._negamax(board, opponent(player), child_key, depth - 1, -INFINITY, -alpha, 1)
+            finally:
+                unmake_move(board, undo)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self.table.store(key, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _negamax(self, board, player, key, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+        # Tabela de transposição: corte direto e melhor jogada para ordenar
+        tt_move = None
+        entry = self.table.probe(key)
+        if entry is not None:
+            tt_depth, tt_score, tt_flag, tt_move = entry
+            if tt_depth >= depth and tt_depth > 0:
+                tt_score = _score_from_table(tt_score, ply)
+                if tt_flag == EXACT:
+                    return tt_score
+                if tt_flag == LOWER and tt_score >= beta:
+                    return tt_score
+                if tt_flag == UPPER and tt_score <= alpha:
+                    return tt_score
+
+        moves = generate_moves(board, player)
+        if not moves:
+            return -WIN_SCORE + ply
+
+        is_capture = moves[0][1] != 0
+        if depth <= 0:
+            # Quiescência: só continua enquanto houver capturas forçadas
+            if not is_capture or ply >= self.max_depth + MAX_QUIESCENCE_PLY:
+                return evaluate(board, player)
+
+        ordered = moves
+        if not is_capture and len(moves) > 1:
+            ordered = self._order_quiet_moves(moves, ply)
+        if tt_move is not None:
+            tt_move = unpack_move(tt_move, moves)
+        if tt_move is not None and ordered[0] != tt_move:
+            ordered = [tt_move] + [m for m in ordered if m != tt_move]
+
+        original_alpha = alpha
+        best = -INFINITY
+        best_move = None
+        for move in ordered:
+            child_key = update_for_move(key, board, player, move)
+            undo = make_move(board, player, move)
+            try:
+                score = -self._negamax(board, opponent(player), child_key, depth - 1, -beta, -alpha, ply + 1)
+            finally:
+                unmake_move(board, undo)
+            if score > best:
+                best = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not is_capture:
+                    self._record_cutoff(move, ply, depth)
+                break
+
+        if best <= original_alpha:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table.store(key, max(depth, 0), _score_to_table(best, ply), flag, best_move)
+        return best
+
+    def _order_quiet_moves(self, moves, ply):
+        killers = self.killers[ply] if ply < len(self.killers) else (None, None)
+        history = self.history
+
+        def priority(move):
+            if move == killers[0]:
+                return 1 << 30
+            if move == killers[1]:
+                return 1 << 29
+            return history.get(move, 0)
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def _record_cutoff(self, move, ply, depth):
+        if ply < len(self.killers):
+            slot = self.killers[ply]
+            if slot[0] != move:
+                slot[1] = slot[0]
+                slot[0] = move
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+
+def _score_to_table(score, ply):
+    """Scores de vitória forçada são guardados relativos à posição, não à raiz."""
+    if score >= MATE_THRESHOLD:
+        return score + ply
+    if score <= -MATE_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _score_from_table(score, ply):
+    if score >= MATE_THRESHOLD:
+        return score - ply
+    if score <= -MATE_THRESHOLD:
+        return score + ply
+    return score
@@ -0,0 +1,63 @@
+"""
+Estado da partida serializado uma vez por versão.
+
+``CheckersGame.get_state()`` devolve um ``StateSnapshot``: um dict comum
+(quem não conhece a classe serializa normalmente) que também carrega o
+JSON compacto pronto em ``json``. A partida guarda o JSON da versão atual
+do estado (``state_version``), por formato de tabuleiro; todas as rotas e
+todos os destinatários de um emit usam o mesmo texto. Só o relógio, que
+muda com o tempo, é acrescentado a cada leitura.
+
+Este módulo também serve de ``json`` para o Socket.IO
+(``SocketIO(..., json=snapshots)``) e para as respostas HTTP: ``dumps``
+copia o ``json`` dos snapshots que estiverem no pacote - argumento do
+evento ou um nível abaixo, como ``{"winner": ..., "game_state": estado}``
+- em vez de serializá-los de novo.
+"""
+
+import json
+
+# Mesmo formato do Socket.IO (sem espaços)
+SEPARATORS = (",", ":")
+
+loads = json.loads
+
+
+class StateSnapshot(dict):
+    """Estado da partida (dict) com o JSON correspondente em ``json``."""
+
+    __slots__ = ("json",)
+
+    @classmethod
+    def build(cls, state, body, **extra):
+        """
+        Snapshot de ``state`` (já serializado em ``body``) com os campos
+        ``extra`` acrescentados, sem serializar ``state`` de novo.
+        """
+        snapshot = cls(state)
+        snapshot.update(extra)
+        fields = "".join(f",{json.dumps(key)}:{json.dumps(value, separators=SEPARATORS)}"
+                         for key, value in extra.items())
+        snapshot.json = body[:-1] + fields + "}"
+        return snapshot
+
+
+def serialize(state):
+    return json.dumps(state, separators=SEPARATORS)
+
+
+def dumps(obj, **kwargs):
+    """``json.dumps`` que reaproveita o JSON dos ``StateSnapshot`` (até dois níveis)."""
+    kwargs.setdefault("separators", SEPARATORS)
+    return _encode(obj, 2, kwargs)
+
+
+def _encode(obj, depth, kwargs):
+    if type(obj) is StateSnapshot:
+        return obj.json
+    if depth and isinstance(obj, (list, tuple)):
+        return "[" + ",".join(_encode(item, depth - 1, kwargs) for item in obj) + "]"
+    if depth and isinstance(obj, dict) and any(type(value) is StateSnapshot for value in obj.values()):
+        return "{" + ",".join(f"{json.dumps(str(key))}:{_encode(value, depth - 1, kwargs)}"
+                              for key, value in obj.items()) + "}"
+    return json.dumps(obj, **kwargs)
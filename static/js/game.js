@@ -10,11 +10,48 @@ let currentMode = 'pvp';
 let selectedTheme = 'classic';
 let timerInterval = null;
 let timeLeft = 60;
-let moveStartTime = null;
+let turnDeadline = null;
 let isPlayerTurn = true;
 
 const EMPTY = 0, P1 = 1, P2 = 2, P1_KING = 3, P2_KING = 4;
 
+// Formato do tabuleiro pedido ao servidor: 'packed' (24 caracteres) ou 'list' (matriz 8x8)
+const BOARD_ENCODING = 'packed';
+
+// ========================================
+// ESTADO COMPACTO
+// ========================================
+
+function decodeBoard(packed) {
+    // 16 bytes: p1_men, p1_kings, p2_men, p2_kings (uint32 little-endian)
+    const bytes = Uint8Array.from(atob(packed), ch => ch.charCodeAt(0));
+    const view = new DataView(bytes.buffer);
+    const pieces = [P1, P1_KING, P2, P2_KING];
+    const board = Array.from({ length: 8 }, () => new Array(8).fill(EMPTY));
+    
+    pieces.forEach((piece, index) => {
+        const bits = view.getUint32(index * 4, true);
+        for (let sq = 0; sq < 32; sq++) {
+            if (bits & (1 << sq)) {
+                // Casa escura sq -> (linha, coluna), como no bitboard.py
+                const row = sq >> 2;
+                const col = 2 * (sq & 3) + (row % 2 === 0 ? 1 : 0);
+                board[row][col] = piece;
+            }
+        }
+    });
+    return board;
+}
+
+function normalizeState(state) {
+    // Estado compacto: reconstrói a matriz 8x8 usada pelo resto do frontend
+    if (state && state.board_packed) {
+        state.board = decodeBoard(state.board_packed);
+        delete state.board_packed;
+    }
+    return state;
+}
+
 // ========================================
 // FUNÇÕES DE NAVEGAÇÃO
 // ========================================
@@ -28,6 +65,7 @@ function showConfig(mode) {
     currentMode = mode;
     const player2Group = document.getElementById('player2Group');
     const player2Input = document.getElementById('player2Name');
+    document.getElementById('difficultyGroup').style.display = mode === 'pvc' ? 'block' : 'none';
     
     if (mode === 'pvc') {
         player2Input.value = 'Romano';
@@ -71,7 +109,9 @@ async function startGame() {
             body: JSON.stringify({
                 player1_name: p1Name,
                 player2_name: p2Name || 'Romano',
-                mode: currentMode
+                mode: currentMode,
+                difficulty: document.getElementById('difficulty').value,
+                encoding: BOARD_ENCODING
             })
         });
         
@@ -108,8 +148,14 @@ function closeRules(understood) {
 
 async function fetchGameState() {
     try {
-        const response = await fetch('/game-state');
-        gameState = await response.json();
+        // Revalida sempre: sem mudança o servidor responde 304 e o navegador usa o corpo guardado
+        const response = await fetch('/game-state', { cache: 'no-cache' });
+        gameState = normalizeState(await response.json());
+        // O relógio muda sem mudar a versão do estado: o valor atual vem no cabeçalho
+        const clock = response.headers.get('X-Clock');
+        if (clock !== null) {
+            gameState.clock = parseFloat(clock);
+        }
         renderBoard();
         updateScoreboard();
         checkAITurn();
@@ -420,6 +466,16 @@ function calculateValidMoves(row, col) {
         });
     }
     
+    // Backend informa os saltos permitidos pela lei da maioria
+    // (também restringe a peça que está no meio de uma captura múltipla)
+    if (gameState.capture_moves && gameState.capture_moves.length > 0) {
+        validMoves = gameState.capture_moves
+            .filter(([sr, sc]) => sr === row && sc === col)
+            .map(([, , er, ec]) => ({ row: er, col: ec, isCapture: true }));
+        showMessage('⚠️ CAPTURA OBRIGATÓRIA! Clique no RAIO VERMELHO!', 'warning');
+        return;
+    }
+    
     if (hasCaptures) {
         validMoves = tempMoves.filter(m => m.isCapture);
         showMessage('⚠️ CAPTURA OBRIGATÓRIA! Clique no RAIO VERMELHO!', 'warning');
@@ -492,8 +548,6 @@ function createPromoteEffect(row, col) {
 // ========================================
 
 async function makeMove(startRow, startCol, endRow, endCol) {
-    const moveTime = moveStartTime ? (60 - timeLeft) : 0;
-    
     try {
         const response = await fetch('/move', {
             method: 'POST',
@@ -502,8 +556,7 @@ async function makeMove(startRow, startCol, endRow, endCol) {
                 start_row: startRow,
                 start_col: startCol,
                 end_row: endRow,
-                end_col: endCol,
-                move_time: moveTime
+                end_col: endCol
             })
         });
         
@@ -519,7 +572,7 @@ async function makeMove(startRow, startCol, endRow, endCol) {
                 createCaptureEffect(data.captured_pos.row, data.captured_pos.col);
             }
             
-            gameState = data.game_state;
+            gameState = normalizeState(data.game_state);
             clearSelection();
             renderBoard();
             updateScoreboard();
@@ -554,14 +607,20 @@ async function makeMove(startRow, startCol, endRow, endCol) {
 // ========================================
 
 function startTimer() {
-    moveStartTime = Date.now();
-    timeLeft = 60;
-    updateTimerDisplay();
-    
+    // O relógio é do servidor: aqui só a contagem regressiva até o prazo recebido
     if (timerInterval) clearInterval(timerInterval);
+    timerInterval = null;
+    if (gameState && gameState.winner) return;
+    
+    const remaining = gameState && gameState.clock != null
+        ? gameState.clock
+        : ((gameState && gameState.turn_time) || 60);
+    turnDeadline = Date.now() + remaining * 1000;
+    updateTimeLeft();
+    updateTimerDisplay();
     
     timerInterval = setInterval(() => {
-        timeLeft--;
+        updateTimeLeft();
         updateTimerDisplay();
         
         if (timeLeft <= 0) {
@@ -570,6 +629,10 @@ function startTimer() {
     }, 1000);
 }
 
+function updateTimeLeft() {
+    timeLeft = Math.max(0, Math.ceil((turnDeadline - Date.now()) / 1000));
+}
+
 function resetTimer() {
     startTimer();
 }
@@ -610,16 +673,19 @@ function getTimerClass(seconds) {
 
 async function handleTimeout() {
     stopTimer();
-    showMessage('⏰ Você demorou muito!! Esteja focado!!!!', 'error');
     
     try {
+        // O servidor confere o prazo; antes dele só devolve o tempo restante
         const response = await fetch('/timeout', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' }
         });
         
         const data = await response.json();
-        gameState = data.game_state;
+        if (data.timed_out) {
+            showMessage('⏰ Você demorou muito!! Esteja focado!!!!', 'error');
+        }
+        gameState = normalizeState(data.game_state);
         renderBoard();
         updateScoreboard();
         resetTimer();
@@ -668,7 +734,7 @@ async function checkAITurn() {
                 const data = await response.json();
                 
                 if (data.status === 'success') {
-                    gameState = data.game_state;
+                    gameState = normalizeState(data.game_state);
                     renderBoard();
                     updateScoreboard();
                     showMessage('🤖 Romano fez sua jogada!', 'success');
@@ -726,7 +792,7 @@ async function confirmSurrender() {
         showMessage(`💔 ${loser}: Você é um jogador fraco... Treine e volte novamente para resolver esta fatura!`, 'error');
         
         setTimeout(() => {
-            gameState = data.game_state;
+            gameState = normalizeState(data.game_state);
             showWinner();
         }, 2000);
     } catch (error) {
@@ -754,7 +820,7 @@ async function playAgain() {
     try {
         const response = await fetch('/reset', { method: 'POST' });
         const data = await response.json();
-        gameState = data.game_state;
+        gameState = normalizeState(data.game_state);
         document.getElementById('winnerModal').classList.remove('active');
         renderBoard();
         updateScoreboard();
@@ -771,9 +837,9 @@ function showWinner() {
     const winnerText = document.getElementById('winnerText');
     const winnerStats = document.getElementById('winnerStats');
     
-    winnerText.textContent = `${gameState.winner} VENCEU!`;
+    winnerText.textContent = gameState.draw ? '🤝 EMPATE!' : `${gameState.winner} VENCEU!`;
     winnerStats.innerHTML = `
-        <p>🏆 Parabéns pela vitória!</p>
+        <p>${gameState.draw ? '🤝 Partida empatada!' : '🏆 Parabéns pela vitória!'}</p>
         <p>📊 ${gameState.player1_name}: ${gameState.p1_pieces} peças | Tempo médio: ${gameState.p1_avg_time}s</p>
         <p>📊 ${gameState.player2_name}: ${gameState.p2_pieces} peças | Tempo médio: ${gameState.p2_avg_time}s</p>
     `;
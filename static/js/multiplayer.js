@@ -8,6 +8,12 @@ let isPlayer1 = false;
 let playerName = '';
 let isMultiplayerMode = false;
 let createRoomTimer = null;
+let lobbyRooms = [];  // Salas listadas (atualizadas por room_added/room_removed)
+let lobbyCursor = null;  // Cursor da próxima página (null = não há mais)
+let lobbyLoadingMore = false;
+let searchingMatch = false;  // Na fila da partida rápida
+let isSpectator = false;  // Só assiste (não joga)
+const REJOIN_KEY = 'damasRejoin';  // {room_id, token} para voltar à sala após reconectar
 
 // ========================================
 // INICIALIZAÇÃO
@@ -36,6 +42,12 @@ function initSocket() {
         console.log('✅ Conectado ao servidor multiplayer!', socket.id);
         showMessage('✅ Conectado ao servidor!', 'success');
         
+        // Reconexão no meio da partida (queda ou servidor reiniciado)
+        const rejoin = JSON.parse(sessionStorage.getItem(REJOIN_KEY) || 'null');
+        if (rejoin && currentRoomId === rejoin.room_id) {
+            socket.emit('rejoin_room', rejoin);
+        }
+        
         // Reabilitar botão se estava desabilitado
         const btn = document.getElementById('createRoomBtn') || document.querySelector('button[onclick*="createMultiplayerRoom"]');
         if (btn && btn.disabled) {
@@ -78,6 +90,8 @@ function initSocket() {
             createRoomTimer = null;
         }
         currentRoomId = data.room_id;
+        saveRejoinToken(data);
+        socket.emit('lobby_unsubscribe');
         document.getElementById('roomIdDisplay').textContent = currentRoomId;
         document.getElementById('shareRoomId').textContent = currentRoomId;
         document.getElementById('roomInfo').style.display = 'block';
@@ -93,18 +107,41 @@ function initSocket() {
     });
     
     socket.on('game_state', (data) => {
-        if (isMultiplayerMode) {
-            gameState = data;
+        // Estado completo: no join e quando pedimos 'request_sync'
+        if (isMultiplayerMode || currentRoomId) {
+            gameState = normalizeState(data);
             renderBoard();
             updateScoreboard();
+            resetTimer();
+            ackSpectator();
         }
     });
     
+    socket.on('turn_timeout', (data) => {
+        // Queda de bandeira decidida pelo relógio do servidor
+        gameState = normalizeState(data.game_state);
+        clearSelection();
+        renderBoard();
+        updateScoreboard();
+        showMessage(data.message, 'error');
+        resetTimer();
+        ackSpectator();
+    });
+    
     socket.on('room_joined', (data) => {
+        setSearchingMatch(false);
+        const rejoined = isMultiplayerMode && currentRoomId === data.room_id;
         currentRoomId = data.room_id;
         isPlayer1 = data.is_player1;
+        saveRejoinToken(data);
+        socket.emit('lobby_unsubscribe');
         isMultiplayerMode = true;
         
+        if (rejoined) {
+            showMessage('🔄 De volta à partida!', 'success');
+            return;
+        }
+        
         showMessage(`✅ Entrou na sala ${currentRoomId}!`, 'success');
         showScreen('gameScreen');
         startTimer();
@@ -114,6 +151,53 @@ function initSocket() {
             `<div class="multiplayer-badge">🌐 Online - Sala: ${currentRoomId}</div>`;
     });
     
+    socket.on('rejoin_error', (data) => {
+        sessionStorage.removeItem(REJOIN_KEY);
+        showMessage(`❌ ${data.message}`, 'error');
+        setTimeout(() => {
+            backToMenu();
+        }, 2000);
+    });
+    
+    socket.on('player_disconnected', (data) => {
+        showMessage(`📡 ${data.message}`, 'info');
+    });
+    
+    socket.on('player_rejoined', (data) => {
+        showMessage(`🔄 ${data.message}`, 'info');
+    });
+    
+    socket.on('spectating', (data) => {
+        currentRoomId = data.room_id;
+        isSpectator = true;
+        isMultiplayerMode = true;
+        socket.emit('lobby_unsubscribe');
+        
+        showMessage(`👁 Assistindo ${data.player1_name} x ${data.player2_name}`, 'info');
+        showScreen('gameScreen');
+        
+        document.querySelector('.game-header').innerHTML += 
+            `<div class="multiplayer-badge">👁 Espectador - Sala: ${currentRoomId} (<span id="spectatorCount">${data.spectators}</span>)</div>`;
+    });
+    
+    socket.on('spectators_update', (data) => {
+        const counter = document.getElementById('spectatorCount');
+        if (counter) {
+            counter.textContent = data.count;
+        }
+    });
+    
+    socket.on('spectate_error', (data) => {
+        showMessage(data.message, 'error');
+    });
+    
+    socket.on('spectate_ended', (data) => {
+        showMessage(`👁 ${data.message}`, 'warning');
+        setTimeout(() => {
+            backToMenu();
+        }, 2000);
+    });
+    
     socket.on('game_started', (data) => {
         showMessage('🎮 Jogo iniciado!', 'success');
         fetchGameState();
@@ -121,25 +205,29 @@ function initSocket() {
     
     socket.on('move_result', (data) => {
         if (data.status === 'success') {
-            gameState = data.game_state;
+            const delta = data.delta;
+            
+            // Lance perdido (ou estado ainda não recebido): pedir o estado completo
+            if (!gameState || delta.seq !== gameState.seq + 1) {
+                socket.emit('request_sync');
+                return;
+            }
+            
+            applyMoveDelta(delta);
+            ackSpectator();
             clearSelection();
             renderBoard();
             updateScoreboard();
             showMessage(data.message, 'success');
             
             // Efeito de captura se houver
-            if (data.captured_pos) {
-                createCaptureEffect(data.captured_pos.row, data.captured_pos.col);
+            if (delta.captured) {
+                createCaptureEffect(delta.captured[0], delta.captured[1]);
             }
             
-            // Verificar promoção
-            const piece = gameState.board[data.start_row]?.[data.start_col];
-            if (piece) {
-                const willPromote = (piece === P1 && data.end_row === 0) || 
-                                   (piece === P2 && data.end_row === 7);
-                if (willPromote) {
-                    setTimeout(() => createPromoteEffect(data.end_row, data.end_col), 100);
-                }
+            // Efeito de promoção
+            if (delta.promoted) {
+                setTimeout(() => createPromoteEffect(delta.to[0], delta.to[1]), 100);
             }
             
             resetTimer();
@@ -161,12 +249,33 @@ function initSocket() {
     });
     
     socket.on('game_over', (data) => {
-        gameState = data.game_state;
+        // Partida rápida: novo rating deste jogador (guardado no servidor)
+        if (data.ratings && !isSpectator) {
+            const rating = isPlayer1 ? data.ratings.player1 : data.ratings.player2;
+            setTimeout(() => showMessage(`🏆 Seu rating agora é ${rating}`, 'info'), 1500);
+        }
+        sessionStorage.removeItem(REJOIN_KEY);
+        gameState = normalizeState(data.game_state);
         renderBoard();
         updateScoreboard();
         showWinner();
     });
     
+    socket.on('match_waiting', (data) => {
+        setSearchingMatch(true);
+        showMessage(`⚡ ${data.message} (seu rating: ${data.rating})`, 'info');
+    });
+    
+    socket.on('match_cancelled', (data) => {
+        setSearchingMatch(false);
+        showMessage(data.message, 'info');
+    });
+    
+    socket.on('match_error', (data) => {
+        setSearchingMatch(false);
+        showMessage(data.message, 'error');
+    });
+    
     socket.on('join_error', (data) => {
         showMessage(data.message, 'error');
     });
@@ -192,12 +301,40 @@ function initSocket() {
         }, 2000);
     });
     
+    socket.on('room_expired', (data) => {
+        showMessage(`⌛ ${data.message}`, 'warning');
+        setTimeout(() => {
+            backToMenu();
+        }, 2000);
+    });
+    
     socket.on('guest_left', (data) => {
         showMessage('⚠️ O adversário saiu da sala.', 'warning');
     });
     
     socket.on('rooms_list', (data) => {
-        displayRoomsList(data.rooms);
+        if (lobbyLoadingMore) {
+            // Próxima página: acrescenta sem duplicar salas já recebidas por push
+            const known = new Set(lobbyRooms.map(room => room.room_id));
+            lobbyRooms = lobbyRooms.concat(data.rooms.filter(room => !known.has(room.room_id)));
+            lobbyLoadingMore = false;
+        } else {
+            lobbyRooms = data.rooms;
+        }
+        lobbyCursor = data.next_cursor ?? null;
+        displayRoomsList(lobbyRooms);
+    });
+    
+    socket.on('room_added', (room) => {
+        if (!lobbyRooms.some(item => item.room_id === room.room_id)) {
+            lobbyRooms.push(room);
+            displayRoomsList(lobbyRooms);
+        }
+    });
+    
+    socket.on('room_removed', (data) => {
+        lobbyRooms = lobbyRooms.filter(room => room.room_id !== data.room_id);
+        displayRoomsList(lobbyRooms);
     });
 }
 
@@ -296,7 +433,7 @@ async function createMultiplayerRoom() {
     
     try {
         await ensureSocketConnected(5000);
-        socket.emit('create_room', { player_name: playerName });
+        socket.emit('create_room', { player_name: playerName, encoding: BOARD_ENCODING });
         // Timeout de segurança caso o servidor não responda
         if (createRoomTimer) clearTimeout(createRoomTimer);
         createRoomTimer = setTimeout(() => {
@@ -317,6 +454,70 @@ async function createMultiplayerRoom() {
     }
 }
 
+function saveRejoinToken(data) {
+    if (data.rejoin_token) {
+        sessionStorage.setItem(REJOIN_KEY, JSON.stringify({
+            room_id: data.room_id,
+            token: data.rejoin_token
+        }));
+    }
+}
+
+function setSearchingMatch(searching) {
+    searchingMatch = searching;
+    const btn = document.getElementById('quickMatchBtn');
+    if (btn) {
+        btn.textContent = searching ? '✖ Cancelar Busca' : '⚡ Partida Rápida';
+    }
+}
+
+async function quickMatch() {
+    if (searchingMatch) {
+        socket.emit('cancel_quick_match');
+        return;
+    }
+    
+    playerName = document.getElementById('multiplayerName').value.trim();
+    
+    if (!playerName || playerName.length < 2) {
+        alert('Por favor, digite um nome válido (mínimo 2 caracteres)');
+        return;
+    }
+    
+    try {
+        await ensureSocketConnected(5000);
+        socket.emit('quick_match', {
+            player_name: playerName,
+            encoding: BOARD_ENCODING
+        });
+    } catch (error) {
+        console.error('Erro ao conectar para partida rápida:', error);
+        alert('Erro: Não foi possível conectar ao servidor. Tente novamente.');
+    }
+}
+
+function spectateRoom() {
+    const roomId = prompt('Digite o código da sala que deseja assistir:');
+    
+    if (!roomId || roomId.length !== 6) {
+        alert('Código da sala inválido! Deve ter 6 caracteres.');
+        return;
+    }
+    
+    playerName = document.getElementById('multiplayerName').value.trim();
+    
+    ensureSocketConnected(5000)
+        .then(() => {
+            socket.emit('spectate_room', {
+                room_id: roomId.toUpperCase(),
+                player_name: playerName
+            });
+        })
+        .catch(() => {
+            alert('Erro: Não foi possível conectar ao servidor. Tente novamente.');
+        });
+}
+
 function showJoinRoom() {
     const roomId = prompt('Digite o código da sala (6 caracteres):');
     
@@ -336,7 +537,8 @@ function showJoinRoom() {
         .then(() => {
             socket.emit('join_room', {
                 room_id: roomId.toUpperCase(),
-                player_name: playerName
+                player_name: playerName,
+                encoding: BOARD_ENCODING
             });
         })
         .catch(() => {
@@ -347,7 +549,9 @@ function showJoinRoom() {
 function refreshRoomsList() {
     ensureSocketConnected(5000)
         .then(() => {
-            socket.emit('get_rooms');
+            // Primeira página + atualizações em tempo real (sem polling)
+            lobbyLoadingMore = false;
+            socket.emit('lobby_subscribe');
             document.getElementById('roomsList').style.display = 'block';
         })
         .catch(() => {
@@ -355,6 +559,14 @@ function refreshRoomsList() {
         });
 }
 
+function loadMoreRooms() {
+    if (lobbyCursor === null || lobbyLoadingMore || !socket) {
+        return;
+    }
+    lobbyLoadingMore = true;
+    socket.emit('get_rooms', { cursor: lobbyCursor });
+}
+
 function displayRoomsList(rooms) {
     const container = document.getElementById('roomsContainer');
     
@@ -363,6 +575,10 @@ function displayRoomsList(rooms) {
         return;
     }
     
+    const loadMore = lobbyCursor !== null
+        ? '<button class="btn btn-secondary" onclick="loadMoreRooms()">Carregar mais</button>'
+        : '';
+    
     container.innerHTML = rooms.map(room => `
         <div class="room-item">
             <div class="room-info-item">
@@ -373,7 +589,7 @@ function displayRoomsList(rooms) {
                 Entrar
             </button>
         </div>
-    `).join('');
+    `).join('') + loadMore;
 }
 
 function joinRoomById(roomId) {
@@ -388,7 +604,8 @@ function joinRoomById(roomId) {
         .then(() => {
             socket.emit('join_room', {
                 room_id: roomId,
-                player_name: playerName
+                player_name: playerName,
+                encoding: BOARD_ENCODING
             });
         })
         .catch(() => {
@@ -400,6 +617,48 @@ function joinRoomById(roomId) {
 // MOVIMENTOS MULTIPLAYER
 // ========================================
 
+function applyMoveDelta(delta) {
+    // Aplica no tabuleiro local só o que mudou no lance
+    const [fromRow, fromCol] = delta.from;
+    const [toRow, toCol] = delta.to;
+    const board = gameState.board;
+    let piece = board[fromRow][fromCol];
+    
+    if (delta.promoted) {
+        piece = piece === P1 ? P1_KING : P2_KING;
+    }
+    board[fromRow][fromCol] = EMPTY;
+    board[toRow][toCol] = piece;
+    
+    if (delta.captured) {
+        const [capRow, capCol] = delta.captured;
+        const capturedPiece = board[capRow][capCol];
+        board[capRow][capCol] = EMPTY;
+        if (capturedPiece === P1 || capturedPiece === P1_KING) {
+            gameState.p1_pieces -= 1;
+        } else {
+            gameState.p2_pieces -= 1;
+        }
+    }
+    
+    gameState.seq = delta.seq;
+    gameState.turn = delta.turn;
+    gameState.clock = delta.clock;
+    gameState.turn_name = delta.turn === P1 ? gameState.player1_name : gameState.player2_name;
+    gameState.winner = delta.winner;
+    gameState.draw = delta.draw;
+    gameState.p1_avg_time = delta.p1_avg_time;
+    gameState.p2_avg_time = delta.p2_avg_time;
+    gameState.capture_moves = delta.capture_moves;
+}
+
+function ackSpectator() {
+    // Espectador confirma o último lance aplicado (o servidor pausa a transmissão se ficar para trás)
+    if (isSpectator && socket && gameState) {
+        socket.emit('spectator_ack', { seq: gameState.seq });
+    }
+}
+
 function makeMultiplayerMove(startRow, startCol, endRow, endCol) {
     if (!socket || !socket.connected) {
         showMessage('Erro: Não conectado ao servidor!', 'error');
@@ -411,6 +670,11 @@ function makeMultiplayerMove(startRow, startCol, endRow, endCol) {
         return;
     }
     
+    if (isSpectator) {
+        showMessage('👁 Você está assistindo a esta partida.', 'info');
+        return;
+    }
+    
     // Verificar se é a vez do jogador
     const currentTurn = gameState.turn;
     const myTurn = (isPlayer1 && currentTurn === P1) || (!isPlayer1 && currentTurn === P2);
@@ -420,16 +684,13 @@ function makeMultiplayerMove(startRow, startCol, endRow, endCol) {
         return;
     }
     
-    const moveTime = moveStartTime ? (60 - timeLeft) : 0;
-    
     ensureSocketConnected(5000)
         .then(() => {
             socket.emit('make_move', {
                 start_row: startRow,
                 start_col: startCol,
                 end_row: endRow,
-                end_col: endCol,
-                move_time: moveTime
+                end_col: endCol
             });
         })
         .catch(() => {
@@ -460,6 +721,17 @@ setTimeout(() => {
             }
         };
     }
+    if (typeof handleTimeout !== 'undefined') {
+        const originalHandleTimeout = window.handleTimeout;
+        window.handleTimeout = function() {
+            if (isMultiplayerMode) {
+                // O servidor passa a vez e avisa com 'turn_timeout'
+                stopTimer();
+            } else {
+                originalHandleTimeout();
+            }
+        };
+    }
 }, 100);
 
 // ========================================
@@ -467,7 +739,7 @@ setTimeout(() => {
 // ========================================
 
 function surrenderMultiplayer() {
-    if (!socket || !socket.connected || !currentRoomId) {
+    if (!socket || !socket.connected || !currentRoomId || isSpectator) {
         return;
     }
     
@@ -502,6 +774,9 @@ function cleanupMultiplayer() {
     currentRoomId = null;
     isPlayer1 = false;
     isMultiplayerMode = false;
+    isSpectator = false;
+    sessionStorage.removeItem(REJOIN_KEY);
+    setSearchingMatch(false);
     playerName = '';
 }
 
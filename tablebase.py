@@ -0,0 +1,397 @@
+"""
+Tablebase de finais (regras brasileiras) para poucas peças.
+
+Para cada combinação de material (pedras e damas de cada lado, até
+``max_pieces`` peças no total) a análise retrógrada resolve todas as
+posições: vitória ou derrota de quem joga, com a distância em lances
+(meias-jogadas) até o fim, ou empate. "Sem peças" e "sem jogadas" são
+derrota, como no ``check_winner``.
+
+Índice de uma posição dentro do material (a, b, c, d) = (pedras P1, damas
+P1, pedras P2, damas P2): a posição de cada grupo de peças no conjunto das
+combinações das 32 casas escuras, mais o lado a jogar. Posições impossíveis
+(peças sobrepostas, pedra na linha de promoção) ocupam índices que nunca são
+consultados.
+
+Materiais com damas têm uma camada por valor do contador de lances
+seguidos só de damas (``KING_MOVES_DRAW_LIMIT``): o mesmo tabuleiro pode
+ser vitória com o contador em 0 e empate perto do limite. Sem damas o
+contador é sempre 0 e há uma camada só.
+
+Formato do arquivo (little-endian):
+
+    cabeçalho  "DAMATB01", versão (uint32), materiais (uint32)
+    diretório  a, b, c, d (uint8), início (uint64), tamanho (uint32) por material
+    valores    um byte por (camada, posição): 0 = empate, 1..127 = vitória
+               em N, 128 + N = derrota em N (128 = sem jogadas)
+
+O arquivo é aberto com ``mmap``; uma consulta é o cálculo do índice e a
+leitura de um byte.
+
+Uso:
+    python tablebase.py                  # gera até TABLEBASE_MAX_PIECES peças
+    python tablebase.py --max-pieces 4   # bem mais lento (milhões de posições)
+"""
+
+import argparse
+import itertools
+import mmap
+import os
+import struct
+import sys
+import time
+
+from bitboard import BIT, BitBoard, P1, P2, ROW_MASK, iter_bits, opponent, popcount
+from search import generate_moves, make_move, unmake_move
+
+TABLEBASE_PATH = os.environ.get(
+    "TABLEBASE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebase.bin"))
+TABLEBASE_MAX_PIECES = int(os.environ.get("TABLEBASE_MAX_PIECES", 3))
+
+# Regra de empate que a solução respeita (o CheckersGame usa a mesma)
+KING_MOVES_DRAW_LIMIT = 20  # 20 lances seguidos só de damas, sem captura
+
+TB_MAGIC = b"DAMATB01"
+TB_VERSION = 3  # 2: regra dos 20 lances de dama; 3: todas as camadas do contador
+HEADER = struct.Struct("<8sII")
+DIRECTORY_ENTRY = struct.Struct("<4BQI")
+
+WIN, DRAW, LOSS = 1, 0, -1
+ALL_LAYERS = -1  # Evento da solução que vale para todas as camadas do contador das damas
+MAX_DISTANCE = 127
+LOSS_BASE = 128
+
+# Combinações de k casas (ordem lexicográfica) e a posição de cada uma
+COMBINATIONS = {k: list(itertools.combinations(range(32), k)) for k in range(5)}
+COMBINATION_RANK = {k: {combo: i for i, combo in enumerate(combos)} for k, combos in COMBINATIONS.items()}
+
+
+def material(board):
+    """(pedras P1, damas P1, pedras P2, damas P2) do ``BitBoard``."""
+    return (popcount(board.p1_men), popcount(board.p1_kings),
+            popcount(board.p2_men), popcount(board.p2_kings))
+
+
+def table_size(signature):
+    size = 2
+    for count in signature:
+        size *= len(COMBINATIONS[count])
+    return size
+
+
+def position_index(board, player):
+    """Índice da posição dentro da tabela do seu material."""
+    index = 0
+    for bits in (board.p1_men, board.p1_kings, board.p2_men, board.p2_kings):
+        combo = tuple(iter_bits(bits))
+        index = index * len(COMBINATIONS[len(combo)]) + COMBINATION_RANK[len(combo)][combo]
+    return index * 2 + (1 if player == P2 else 0)
+
+
+def decode_value(value):
+    """Byte da tabela -> (resultado, distância) do ponto de vista de quem joga."""
+    if value == 0:
+        return DRAW, 0
+    if value < LOSS_BASE:
+        return WIN, value
+    return LOSS, value - LOSS_BASE
+
+
+def encode_value(result, distance):
+    distance = min(distance, MAX_DISTANCE)
+    if result == WIN:
+        return distance
+    if result == LOSS:
+        return LOSS_BASE + distance
+    return 0
+
+
+class Tablebase:
+    """Tablebase aberta com ``mmap`` (somente leitura)."""
+
+    def __init__(self, path=TABLEBASE_PATH):
+        self.path = path
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count = HEADER.unpack_from(self.data, 0)
+        if magic != TB_MAGIC or version != TB_VERSION:
+            self.data.close()
+            raise ValueError(f"Tablebase inválida: {path}")
+        self.tables = {}  # {material: (início, posições por camada, camadas)}
+        for i in range(count):
+            a, b, c, d, offset, length = DIRECTORY_ENTRY.unpack_from(
+                self.data, HEADER.size + i * DIRECTORY_ENTRY.size)
+            if offset + length > len(self.data):
+                self.data.close()
+                raise ValueError(f"Tablebase truncada: {path}")
+            size = table_size((a, b, c, d))
+            self.tables[(a, b, c, d)] = (offset, size, length // size)
+        self.max_pieces = max((sum(signature) for signature in self.tables), default=0)
+        self.hits = 0
+
+    def probe(self, board, player, king_moves=0):
+        """
+        (resultado, distância) de quem joga com ``king_moves`` lances
+        seguidos só de damas já feitos, ou None se o material não está na tabela.
+        """
+        if popcount(board.occupied()) > self.max_pieces:
+            return None
+        table = self.tables.get(material(board))
+        if table is None:
+            return None
+        offset, size, layers = table
+        self.hits += 1
+        if layers > 1 and king_moves >= layers:
+            # A regra já empatou, salvo se quem joga ficou sem jogadas (check_winner vem antes)
+            return (LOSS, 0) if not generate_moves(board, player) else (DRAW, 0)
+        layer = king_moves if layers > 1 else 0
+        return decode_value(self.data[offset + layer * size + position_index(board, player)])
+
+    def best_move(self, board, player, king_moves=0):
+        """
+        Jogada perfeita (caminho de casas) para a posição com o contador de
+        lances de dama em ``king_moves``, ou None se ela não está na tabela:
+        vence o mais rápido possível, empata se não há vitória e, perdendo,
+        resiste o máximo.
+        """
+        if self.probe(board, player, king_moves) is None:
+            return None
+        enemy = opponent(player)
+        kings = board.kings(player)
+        best = None
+        best_score = None
+        for move in generate_moves(board, player):
+            # Lance de dama sem captura avança o contador; os outros o zeram
+            counter = king_moves + 1 if not move[1] and kings & BIT[move[0][0]] else 0
+            undo = make_move(board, player, move)
+            if not board.pieces(enemy):
+                child = (LOSS, 0)
+            else:
+                child = self.probe(board, enemy, counter) or (DRAW, 0)
+            unmake_move(board, undo)
+            result, distance = child
+            if result == LOSS:
+                score = (2, -distance)  # Vitória: a mais curta
+            elif result == DRAW:
+                score = (1, 0)
+            else:
+                score = (0, distance)  # Derrota: a mais longa
+            if best_score is None or score > best_score:
+                best, best_score = move[0], score
+        return best
+
+    def close(self):
+        self.data.close()
+
+
+_tablebase = None
+_tablebase_loaded = False
+
+
+def get_tablebase(path=TABLEBASE_PATH):
+    """Tablebase do processo (aberta na primeira chamada), ou None sem o arquivo."""
+    global _tablebase, _tablebase_loaded
+    if not _tablebase_loaded:
+        _tablebase_loaded = True
+        if path and os.path.exists(path):
+            try:
+                _tablebase = Tablebase(path)
+            except (OSError, ValueError) as e:
+                print(f"❌ Tablebase ignorada: {str(e)}")
+    return _tablebase
+
+
+# ----------------------------------------
+# Geração (análise retrógrada)
+# ----------------------------------------
+
+def signatures(max_pieces):
+    """
+    Materiais com pelo menos uma peça de cada lado, na ordem de resolução:
+    menos peças primeiro (capturas) e, com o mesmo total, menos pedras
+    primeiro (promoções). Todo lance sai para a mesma tabela ou uma já resolvida.
+    """
+    result = []
+    for total in range(2, max_pieces + 1):
+        for a, b, c, d in itertools.product(range(total + 1), repeat=4):
+            if a + b + c + d == total and a + b > 0 and c + d > 0:
+                result.append((a, b, c, d))
+    return sorted(result, key=lambda s: (sum(s), s[0] + s[2], s))
+
+
+def _positions(signature):
+    """Itera (índice base, BitBoard) das posições válidas do material."""
+    a, b, c, d = signature
+    sizes = [len(COMBINATIONS[count]) for count in signature]
+    for ranks in itertools.product(*(range(size) for size in sizes)):
+        groups = [COMBINATIONS[count][rank] for count, rank in zip(signature, ranks)]
+        masks = [sum(BIT[sq] for sq in group) for group in groups]
+        if sum(len(group) for group in groups) != popcount(masks[0] | masks[1] | masks[2] | masks[3]):
+            continue  # Peças sobrepostas
+        if masks[0] & ROW_MASK[0] or masks[2] & ROW_MASK[7]:
+            continue  # Pedra na linha de promoção
+        index = 0
+        for rank, size in zip(ranks, sizes):
+            index = index * size + rank
+        yield index * 2, BitBoard(*masks)
+
+
+def solve_signature(signature, solved, king_moves_limit=KING_MOVES_DRAW_LIMIT):
+    """
+    Resolve um material. ``solved`` tem as tabelas (bytearray) dos materiais
+    já resolvidos. Retorna a bytearray do material, camada por camada do
+    contador das damas (a camada 0 primeiro).
+
+    Com damas no material, cada posição vira ``king_moves_limit``
+    estados (posição, lances seguidos só de damas). Lance de dama sem
+    captura leva ao estado seguinte da mesma posição filha; captura ou
+    lance de pedra zera o contador. O lance que chega ao limite é empate,
+    a não ser que deixe o adversário sem jogadas (vitória, como no
+    ``check_winner``, que vem antes do ``check_draw``).
+    """
+    size = table_size(signature)
+    layers = king_moves_limit if signature[1] or signature[3] else 1
+    last = (layers - 1) * size  # Início da camada em que o próximo lance de dama empata
+    values = bytearray(size * layers)
+    resolved = bytearray(size * layers)
+    remaining = [0] * (size * layers)  # Filhos ainda não resolvidos como vitória do adversário
+    longest = [0] * (size * layers)  # Maior distância entre os filhos vencedores
+    reset_parents = {}  # {índice do filho: [pais]} - lance de pedra: filho na camada 0
+    king_parents = {}  # {índice do filho: [pais]} - lance de dama: filho na camada seguinte
+    buckets = {}  # {distância do filho: [(pai, camada ou ALL_LAYERS, resultado do filho)]}
+    terminals = []  # Posições sem jogadas (derrota em 0 em todas as camadas)
+
+    def push(distance, parent, layer, child_result):
+        buckets.setdefault(distance, []).append((parent, layer, child_result))
+
+    for base, board in _positions(signature):
+        for player in (P1, P2):
+            index = base + (1 if player == P2 else 0)
+            moves = generate_moves(board, player)
+            if not moves:
+                terminals.append(index)
+                continue
+            enemy = opponent(player)
+            kings = board.kings(player)
+            for layer in range(layers):
+                remaining[layer * size + index] = len(moves)
+            for move in moves:
+                undo = make_move(board, player, move)
+                if not board.pieces(enemy):
+                    push(0, index, ALL_LAYERS, LOSS)
+                else:
+                    child_signature = material(board)
+                    child_index = position_index(board, enemy)
+                    if child_signature == signature:
+                        if kings & BIT[move[0][0]]:
+                            king_parents.setdefault(child_index, []).append(index)
+                        else:
+                            reset_parents.setdefault(child_index, []).append(index)
+                    else:
+                        result, distance = decode_value(solved[child_signature][child_index])
+                        if result == DRAW:
+                            for layer in range(layers):
+                                remaining[layer * size + index] = -1  # Nunca será derrota
+                        else:
+                            push(distance, index, ALL_LAYERS, result)
+                unmake_move(board, undo)
+
+    terminal = bytearray(size)
+    for index in terminals:
+        terminal[index] = 1
+        for layer in range(layers):
+            state = layer * size + index
+            values[state] = encode_value(LOSS, 0)
+            resolved[state] = 1
+    # Lance de dama na última camada: empate, salvo se o filho fica sem jogadas
+    if layers > 1:
+        for child, parents in king_parents.items():
+            for parent in parents:
+                if terminal[child]:
+                    push(0, parent, layers - 1, LOSS)
+                else:
+                    remaining[last + parent] = -1
+    # Com todos os pais conhecidos, os terminais avisam os seus
+    for index in terminals:
+        for parent in reset_parents.get(index, ()):
+            push(0, parent, ALL_LAYERS, LOSS)
+        for layer in range(layers - 1):
+            for parent in king_parents.get(index, ()):
+                push(0, parent, layer, LOSS)
+
+    # Resolve em ordem de distância: o primeiro filho perdedor dá a vitória
+    # mais curta; o último filho vencedor, a derrota mais longa
+    distance = 0
+    while buckets:
+        events = buckets.pop(distance, [])
+        for parent, parent_layer, child_result in events:
+            for layer in (range(layers) if parent_layer == ALL_LAYERS else (parent_layer,)):
+                state = layer * size + parent
+                if resolved[state]:
+                    continue
+                if child_result == LOSS:
+                    values[state] = encode_value(WIN, distance + 1)
+                else:
+                    longest[state] = max(longest[state], distance)
+                    remaining[state] -= 1
+                    if remaining[state] != 0:
+                        continue
+                    values[state] = encode_value(LOSS, longest[state] + 1)
+                resolved[state] = 1
+                result = WIN if child_result == LOSS else LOSS
+                if layer == 0:
+                    for p in reset_parents.get(parent, ()):
+                        push(distance + 1, p, ALL_LAYERS, result)
+                else:
+                    for p in king_parents.get(parent, ()):
+                        push(distance + 1, p, layer - 1, result)
+        distance += 1
+    return values
+
+
+def generate(max_pieces=TABLEBASE_MAX_PIECES, path=TABLEBASE_PATH, verbose=True,
+             king_moves_limit=KING_MOVES_DRAW_LIMIT):
+    """Resolve todos os materiais até ``max_pieces`` e grava o arquivo."""
+    solved = {}
+    for signature in signatures(max_pieces):
+        start = time.perf_counter()
+        solved[signature] = solve_signature(signature, solved, king_moves_limit)
+        if verbose:
+            table = solved[signature][:table_size(signature)]
+            wins = sum(1 for v in table if 0 < v < LOSS_BASE)
+            print(f"  {signature}: {len(table)} posições, {wins} vitórias "
+                  f"({time.perf_counter() - start:.1f}s)")
+    write(solved, path)
+    return solved
+
+
+def write(solved, path):
+    """Grava as tabelas resolvidas ({material: bytearray}) no formato do arquivo."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(TB_MAGIC, TB_VERSION, len(solved)))
+        offset = HEADER.size + len(solved) * DIRECTORY_ENTRY.size
+        for signature, table in solved.items():
+            f.write(DIRECTORY_ENTRY.pack(*signature, offset, len(table)))
+            offset += len(table)
+        for table in solved.values():
+            f.write(table)
+    os.replace(tmp_path, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera a tablebase de finais.")
+    parser.add_argument("--max-pieces", type=int, default=TABLEBASE_MAX_PIECES)
+    parser.add_argument("--out", default=TABLEBASE_PATH)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    solved = generate(args.max_pieces, args.out)
+    size = os.path.getsize(args.out)
+    print(f"{len(solved)} materiais, {size // 1024} KB em {time.perf_counter() - start:.1f}s -> {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+"""
+Pool de buscas da IA (``ai_pool.AIPool``): limite de buscas simultâneas e
+jogada legal vinda do processo filho.
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import time
+import unittest
+
+from ai_pool import AIPool, AIPoolBusy, run_search
+from bitboard import square_coords
+from checkers_game import CheckersGame, P2
+
+
+def ai_turn_game():
+    """Partida PvC na vez da IA (P2) depois de um lance do jogador."""
+    game = CheckersGame()
+    game.configure_game("Ana", "IA", "pvc")
+    game.move_piece(5, 0, 4, 1, move_time=0)
+    return game
+
+
+class AIPoolTest(unittest.TestCase):
+
+    def assertLegalPath(self, game, path):
+        self.assertIsNotNone(path)
+        start, end = square_coords(path[0]), square_coords(path[1])
+        self.assertIn(end, game.get_legal_moves()[start])
+
+    def test_run_search_returns_legal_path(self):
+        game = ai_turn_game()
+        self.assertEqual(game.turn, P2)
+        path, _, depth, nodes = run_search(game.get_position(), "facil", time.time() + 5)
+        self.assertLegalPath(game, path)
+        self.assertGreaterEqual(depth, 1)
+        self.assertGreater(nodes, 0)
+
+    def test_busy_node_rejects(self):
+        pool = AIPool(workers=1, max_concurrent=0)
+        game = ai_turn_game()
+        with self.assertRaises(AIPoolBusy):
+            pool.search(game.get_position(), "facil")
+        with self.assertRaises(AIPoolBusy):
+            pool.analyze([(b"", P2)], depth=1, time_limit=0.1)
+        self.assertEqual(pool.rejected, 2)
+        self.assertEqual(pool.active, 0)
+        self.assertIsNone(pool._executor)  # Recusa não sobe processos
+
+    def test_search_in_child_process(self):
+        pool = AIPool(workers=1, max_concurrent=1, mode="process")
+        self.addCleanup(pool.shutdown)
+        game = ai_turn_game()
+        self.assertLegalPath(game, pool.search(game.get_position(), "facil"))
+        self.assertEqual((pool.active, pool.completed), (0, 1))
+        self.assertGreater(pool.nodes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,235 @@
+"""
+Paridade entre os dois motores do ``CheckersGame``: matriz 8x8
+(``use_bitboard=False``) e bitboards (``use_bitboard=True``).
+
+Os dois jogam as mesmas partidas aleatórias lado a lado e são comparados a
+cada lance (capturas, movimentos simples, validação, vencedor, lei da
+maioria e promoção). A lei da maioria também é conferida contra uma
+geração de sequências feita aqui, direto na matriz 8x8. As contagens do
+perft são as de ``perft_baseline.json``.
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import copy
+import random
+import unittest
+
+from bitboard import square_index
+from checkers_game import CheckersGame, EMPTY, P1, P2, P1_KING, P2_KING
+from perft import new_game, parse_diagram, perft_bitboard, perft_game
+
+RANDOM_GAMES = 40
+RANDOM_SEED = 7
+MAX_HOPS = 120
+
+PERFT_NODES = {
+    "inicial": [7, 49, 302, 1469, 7361, 36473],
+    "dama_voadora": [3, 6, 66, 129, 1112],
+    "captura_multipla": [1, 6, 22, 91, 391],
+    "damas": [1, 3, 27, 226],
+    "promocao": [3, 4, 10, 36, 185],
+}
+PERFT_GAME_DEPTH = 3  # Profundidade conferida também pelo CheckersGame
+
+
+def own_squares(game):
+    return [(row, col) for row in range(8) for col in range(8)
+            if game.is_piece_of_player(game.board[row * 8 + col], game.turn)]
+
+
+def reference_sequences(board, player):
+    """
+    Sequências de captura de ``player`` que tomam o maior número de peças,
+    como [(casas visitadas, casas capturadas)] em (row, col). As peças
+    capturadas ficam no tabuleiro até o fim da sequência.
+    """
+    own = (P1, P1_KING) if player == P1 else (P2, P2_KING)
+    forward = -1 if player == P1 else 1
+    sequences = []
+
+    def free(row, col, origin):
+        return (row, col) == origin or board[row][col] == EMPTY
+
+    def enemy(row, col):
+        return board[row][col] != EMPTY and board[row][col] not in own
+
+    def extend(row, col, king, origin, squares, captured):
+        extended = False
+        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)] if king else [(forward, -1), (forward, 1)]
+        for dr, dc in directions:
+            r, c = row + dr, col + dc
+            if king:
+                while 0 <= r < 8 and 0 <= c < 8 and free(r, c, origin):
+                    r, c = r + dr, c + dc
+            if not (0 <= r < 8 and 0 <= c < 8) or not enemy(r, c) or (r, c) in captured:
+                continue
+            mid = (r, c)
+            r, c = r + dr, c + dc
+            while 0 <= r < 8 and 0 <= c < 8 and free(r, c, origin):
+                extended = True
+                extend(r, c, king, origin, squares + [(r, c)], captured + [mid])
+                if not king:
+                    break
+                r, c = r + dr, c + dc
+        if not extended and captured:
+            sequences.append((squares, captured))
+
+    for row in range(8):
+        for col in range(8):
+            piece = board[row][col]
+            if piece in own:
+                extend(row, col, piece in (P1_KING, P2_KING), (row, col), [(row, col)], [])
+
+    if not sequences:
+        return []
+    best = max(len(captured) for _, captured in sequences)
+    return [sequence for sequence in sequences if len(sequence[1]) == best]
+
+
+class ParityTest(unittest.TestCase):
+
+    def assertSameState(self, lists, bits):
+        self.assertEqual(lists.board_rows(), bits.board_rows())
+        self.assertEqual(lists.board_rows(), bits.bitboard.to_board())
+        self.assertEqual(lists.turn, bits.turn)
+        self.assertEqual(lists.winner, bits.winner)
+        self.assertEqual(lists.draw, bits.draw)
+        self.assertEqual(lists.get_piece_count(), bits.get_piece_count())
+        self.assertEqual(lists.position_key(), bits.position_key())
+
+    def assertSameRules(self, lists, bits):
+        """Compara as consultas de regra dos dois motores na posição atual."""
+        self.assertEqual(lists.get_legal_moves(), bits.get_legal_moves())
+        self.assertEqual(lists.has_mandatory_capture(), bits.has_mandatory_capture())
+        self.assertEqual(lists.get_capture_moves(), bits.get_capture_moves())
+        self.assertEqual(sorted(lists.get_all_captures_for_player()),
+                         sorted(bits.get_all_captures_for_player()))
+        for row, col in own_squares(lists):
+            self.assertEqual(sorted(lists.get_captures(row, col)), sorted(bits.get_captures(row, col)),
+                             f"get_captures({row}, {col})")
+            self.assertEqual(sorted(lists.get_simple_moves(row, col)), sorted(bits.get_simple_moves(row, col)),
+                             f"get_simple_moves({row}, {col})")
+            for end_r in range(8):
+                for end_c in range(8):
+                    self.assertEqual(lists.is_valid_move(row, col, end_r, end_c),
+                                     bits.is_valid_move(row, col, end_r, end_c),
+                                     f"is_valid_move({row}, {col}, {end_r}, {end_c})")
+        lists_copy, bits_copy = copy.deepcopy(lists), copy.deepcopy(bits)
+        self.assertEqual(lists_copy.check_winner(), bits_copy.check_winner())
+        self.assertEqual(lists_copy.winner, bits_copy.winner)
+
+    def assertMajorityRule(self, game):
+        """Tabela de capturas = primeiros saltos das sequências de referência."""
+        if game._pending_paths is not None:
+            return  # Meio de captura múltipla: só os saltos da sequência escolhida
+        expected = reference_sequences(game.board_rows(), game.turn)
+        self.assertEqual(bool(expected), game.has_mandatory_capture())
+        if not expected:
+            return
+        table = {}
+        for squares, captured in expected:
+            table.setdefault(squares[0], {})[squares[1]] = captured[0]
+        self.assertEqual(table, game.get_legal_moves())
+
+    def test_initial_position(self):
+        lists, bits = CheckersGame(use_bitboard=False), CheckersGame(use_bitboard=True)
+        self.assertSameState(lists, bits)
+        self.assertSameRules(lists, bits)
+        self.assertEqual(len(bits.get_legal_moves()), 4)
+        self.assertFalse(bits.has_mandatory_capture())
+
+    def test_random_games(self):
+        rng = random.Random(RANDOM_SEED)
+        for _ in range(RANDOM_GAMES):
+            lists, bits = CheckersGame(use_bitboard=False), CheckersGame(use_bitboard=True)
+            for _ in range(MAX_HOPS):
+                self.assertSameState(lists, bits)
+                self.assertSameRules(lists, bits)
+                self.assertMajorityRule(lists)
+                self.assertMajorityRule(bits)
+                legal_moves = lists.get_legal_moves()
+                if lists.winner or not legal_moves:
+                    break
+                start = rng.choice(sorted(legal_moves))
+                end = rng.choice(sorted(legal_moves[start]))
+                result = lists.move_piece(*start, *end, move_time=0)
+                self.assertTrue(result[0], result[1])
+                self.assertEqual(result, bits.move_piece(*start, *end, move_time=0))
+                self.assertEqual(lists.get_move_delta(), bits.get_move_delta())
+            self.assertSameState(lists, bits)
+
+    def test_majority_rule_capture_sets(self):
+        # A pedra de (6, 3) toma 2 peças por (5, 2) e (3, 2), ou só 1 por (5, 4)
+        for use_bitboard in (False, True):
+            game = new_game("captura_multipla", use_bitboard=use_bitboard)
+            self.assertMajorityRule(game)
+            self.assertEqual(game.get_legal_moves(), {(6, 3): {(4, 1): (5, 2)}})
+            valid, message = game.is_valid_move(6, 3, 4, 5)
+            self.assertFalse(valid)
+            self.assertIn("maioria", message)
+
+            # Segundo salto obrigatório com a mesma peça
+            game.move_piece(6, 3, 4, 1, move_time=0)
+            self.assertEqual(game.turn, P1)
+            self.assertEqual(game.get_legal_moves(), {(4, 1): {(2, 3): (3, 2)}})
+            self.assertFalse(game.is_valid_move(7, 0, 6, 1)[0])
+            game.move_piece(4, 1, 2, 3, move_time=0)
+            self.assertEqual(game.turn, P2)
+            self.assertEqual(game.board[5 * 8 + 2], EMPTY)
+            self.assertEqual(game.board[3 * 8 + 2], EMPTY)
+            self.assertEqual(game.board[2 * 8 + 3], P1)
+
+    def test_flying_king_captures(self):
+        lists, bits = new_game("dama_voadora"), new_game("dama_voadora", use_bitboard=True)
+        self.assertSameRules(lists, bits)
+        self.assertMajorityRule(lists)
+        self.assertMajorityRule(bits)
+        # Dama em (7, 0) pula (5, 2) de longe; a pedra em (3, 4) limita o pouso a (4, 3)
+        self.assertEqual(bits.get_captures(7, 0), [(4, 3, 5, 2)])
+
+    def test_promotion(self):
+        for use_bitboard in (False, True):
+            # Captura obrigatória: a pedra de (2, 1) toma (1, 2) e chega à primeira linha
+            game = new_game("promocao", use_bitboard=use_bitboard)
+            self.assertFalse(game.is_valid_move(1, 4, 0, 3)[0])
+            success, _, _, _ = game.move_piece(2, 1, 0, 3, move_time=0)
+            self.assertTrue(success)
+            self.assertEqual(game.board[0 * 8 + 3], P1_KING)
+            self.assertTrue(game.get_move_delta()["promoted"])
+            if use_bitboard:
+                self.assertEqual(game.bitboard.piece_at(square_index(0, 3)), P1_KING)
+
+            # Pedra do P2 chega à última linha capturando
+            game = CheckersGame(use_bitboard=use_bitboard)
+            game.load_position(parse_diagram((
+                "........",
+                "........",
+                "........",
+                "........",
+                "........",
+                "..x.....",
+                "...o....",
+                "o.......",
+            )), P2)
+            self.assertEqual(game.get_legal_moves(), {(5, 2): {(7, 4): (6, 3)}})
+            success, _, _, _ = game.move_piece(5, 2, 7, 4, move_time=0)
+            self.assertTrue(success)
+            self.assertEqual(game.board[7 * 8 + 4], P2_KING)
+            self.assertTrue(game.get_move_delta()["promoted"])
+
+    def test_perft_counts(self):
+        for name, nodes in PERFT_NODES.items():
+            game = new_game(name)
+            counts = [perft_bitboard(game.get_bitboard(), game.turn, depth)
+                      for depth in range(1, len(nodes) + 1)]
+            self.assertEqual(counts, nodes, name)
+            for use_bitboard in (False, True):
+                for depth in range(1, PERFT_GAME_DEPTH + 1):
+                    self.assertEqual(perft_game(new_game(name, use_bitboard), depth), nodes[depth - 1],
+                                     f"{name} perft({depth}) use_bitboard={use_bitboard}")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Relógio da vez no servidor (``CheckersGame``): prazo, tempo esgotado que
+passa a vez (abandonando uma captura múltipla pela metade) e queda de
+bandeira que decide a partida.
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import unittest
+
+from checkers_game import TURN_TIME, CheckersGame, P1, P2
+
+START = 1_000_000.0
+
+
+def position(pieces, turn=P1):
+    """Partida carregada em uma posição {(linha, coluna): peça}."""
+    board = [[0] * 8 for _ in range(8)]
+    for (row, col), piece in pieces.items():
+        board[row][col] = piece
+    game = CheckersGame()
+    game.configure_game("Ana", "Bia", "multiplayer")
+    game.load_position(board, turn)
+    return game
+
+
+class ClockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.game = CheckersGame()
+        self.game.configure_game("Ana", "Bia", "multiplayer")
+
+    def test_stopped_by_default(self):
+        self.assertIsNone(self.game.turn_deadline())
+        self.assertIsNone(self.game.clock_remaining(START))
+        self.assertFalse(self.game.clock_expired(START + 10 * TURN_TIME))
+        self.assertIsNone(self.game.get_clock())
+
+    def test_deadline(self):
+        self.game.start_clock(START)
+        self.assertEqual(self.game.turn_deadline(), START + TURN_TIME)
+        self.assertEqual(self.game.clock_remaining(START + 10), TURN_TIME - 10)
+        self.assertFalse(self.game.clock_expired(START + TURN_TIME - 0.001))
+        self.assertTrue(self.game.clock_expired(START + TURN_TIME))
+        self.assertEqual(self.game.clock_remaining(START + 2 * TURN_TIME), 0.0)
+
+    def test_move_restarts_clock(self):
+        self.game.start_clock(START)
+        self.assertTrue(self.game.move_piece(5, 0, 4, 1, move_time=0)[0])
+        self.assertEqual(self.game.turn, P2)
+        self.assertGreater(self.game.turn_started, START)
+
+    def test_timeout_passes_turn(self):
+        self.game.start_clock(START)
+        version = self.game.state_version
+        self.game.timeout_turn(START + TURN_TIME)
+        self.assertEqual(self.game.turn, P2)
+        self.assertIsNone(self.game.winner)
+        self.assertEqual(self.game.turn_deadline(), START + 2 * TURN_TIME)
+        self.assertNotEqual(self.game.state_version, version)
+
+    def test_timeout_abandons_multiple_capture(self):
+        game = position({(5, 0): P1, (4, 1): P2, (2, 3): P2, (0, 7): P2})
+        game.start_clock(START)
+        success, message = game.move_piece(5, 0, 3, 2, move_time=0)[:2]
+        self.assertTrue(success, message)
+        self.assertEqual(game.turn, P1)  # Ainda falta um salto
+        self.assertEqual(game.get_legal_moves(), {(3, 2): {(1, 4): (2, 3)}})
+
+        game.timeout_turn(START + TURN_TIME)
+        self.assertEqual(game.turn, P2)
+        self.assertEqual(game.board_rows()[2][3], P2)  # A segunda peça não foi capturada
+        # A vez é de P2, que agora captura a pedra parada no meio do caminho
+        self.assertEqual(game.get_legal_moves(), {(2, 3): {(4, 1): (3, 2)}})
+
+    def test_flag_fall_decides_game(self):
+        # P2 sem lances: se P1 deixa o tempo acabar, a vez passa e P2 perde
+        game = position({(7, 6): P1, (6, 7): P2})
+        game.start_clock(START)
+        self.assertTrue(game.clock_expired(START + TURN_TIME))
+        game.timeout_turn(START + TURN_TIME)
+        self.assertEqual(game.winner_side, P1)
+        self.assertEqual(game.winner, "Ana")
+        # Partida decidida: o relógio para
+        self.assertIsNone(game.turn_deadline())
+        self.assertFalse(game.clock_expired(START + 10 * TURN_TIME))
+        self.assertIsNone(game.get_clock())
+
+    def test_clock_survives_room_store(self):
+        self.game.start_clock(START)
+        restored = CheckersGame.from_dict(self.game.to_dict())
+        self.assertEqual(restored.turn_deadline(), START + TURN_TIME)
+        self.game.stop_clock()
+        self.assertIsNone(CheckersGame.from_dict(self.game.to_dict()).turn_deadline())
+
+
+if __name__ == "__main__":
+    unittest.main()
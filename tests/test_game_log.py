@@ -0,0 +1,174 @@
+"""
+Log de partidas (``game_log.GameLog``): gravação, replay em qualquer ply,
+recuperação de uma última linha cortada e registros sem partida.
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from checkers_game import CheckersGame, P1, P2
+import game_log
+from game_log import GameLog
+from game_manager import GameRoom
+
+RANDOM_SEED = 3
+MAX_HOPS = 40
+
+
+def playing_room(room_id="ABC123"):
+    room = GameRoom(room_id, "Ana", "sid-1")
+    room.game = CheckersGame()
+    room.game.configure_game("Ana", "Bia", "multiplayer")
+    return room
+
+
+def play_logged(log, room, hops=MAX_HOPS, seed=RANDOM_SEED):
+    """Joga saltos aleatórios gravando cada um. Retorna os tabuleiros depois de cada salto."""
+    rng = random.Random(seed)
+    boards = [room.game.board_rows()]
+    for _ in range(hops):
+        legal_moves = room.game.get_legal_moves()
+        if room.game.winner or not legal_moves:
+            break
+        start = rng.choice(sorted(legal_moves))
+        end = rng.choice(sorted(legal_moves[start]))
+        room.game.move_piece(*start, *end, move_time=0)
+        log.record_move(room.room_id, room.game.seq, (*start, *end))
+        boards.append(room.game.board_rows())
+    return boards
+
+
+class GameLogTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "game_log.ndjson")
+
+    def open_log(self, **kwargs):
+        log = GameLog(self.path, **kwargs)
+        self.addCleanup(log.close)
+        return log
+
+    def test_replay_every_ply(self):
+        log = self.open_log()
+        room = playing_room()
+        game_id = log.start_game(room, room.tokens)
+        boards = play_logged(log, room)
+        self.assertEqual(log.unfinished_games(), {room.room_id: game_id})
+        for ply, board in enumerate(boards):
+            game, start = log.replay(game_id, ply)
+            self.assertEqual(game.board_rows(), board)
+            self.assertEqual(start["tokens"], room.tokens)
+        game, _ = log.replay(game_id)
+        self.assertEqual(game.position_key(), room.game.position_key())
+        self.assertEqual(game.turn, room.game.turn)
+
+    def test_surrender_and_timeout_replay(self):
+        log = self.open_log()
+        room = playing_room()
+        game_id = log.start_game(room)
+        play_logged(log, room, hops=4)
+        room.game.timeout_turn()
+        log.record_timeout(room.room_id, room.game.seq)
+        log.end_game(room.room_id, "Ana", "surrender", P2)
+        self.assertEqual(log.unfinished_games(), {})
+
+        game, _ = log.replay(game_id)
+        self.assertEqual(game.turn, room.game.turn)
+        self.assertEqual(game.winner_side, P1)
+        self.assertIsNone(log.replay(game_id, 4)[0].winner)
+
+    def test_finished_games_leave_the_index(self):
+        log = self.open_log()
+        room = playing_room()
+        game_id = log.start_game(room)
+        boards = play_logged(log, room, hops=5)
+        log.end_game(room.room_id, "Bia", "surrender", P1)
+        self.assertEqual(log.index, {})
+        # Relida do arquivo quando pedida
+        self.assertEqual(log.replay(game_id, 5)[0].board_rows(), boards[5])
+        self.assertEqual(log.replay(game_id)[0].winner_side, P2)
+        self.assertEqual(log.list_games(), [(game_id, 5, True)])
+        (finished_id, records), = log.finished_games()
+        self.assertEqual(finished_id, game_id)
+        self.assertEqual(records, log.read_game(game_id))
+        self.assertIsNone(log.read_game("XYZ999-1"))
+
+        reopened = self.open_log()
+        self.assertEqual(reopened.index, {})
+        self.assertEqual(reopened.list_games(), [(game_id, 5, True)])
+
+    def test_reopen_truncates_torn_tail(self):
+        log = self.open_log()
+        room = playing_room()
+        game_id = log.start_game(room)
+        boards = play_logged(log, room, hops=6)
+        log.close()
+        size = os.path.getsize(self.path)
+        with open(self.path, "ab") as f:
+            f.write(b'{"t":"move","g":"' + game_id.encode() + b'","n":7,"m":[')
+
+        reopened = self.open_log()
+        self.assertEqual(os.path.getsize(self.path), size)
+        game, _ = reopened.replay(game_id)
+        self.assertEqual(game.board_rows(), boards[-1])
+        self.assertEqual(reopened.unfinished_games(), {room.room_id: game_id})
+        # O próximo registro começa numa linha inteira
+        reopened.end_game(room.room_id, reason="abandoned")
+        self.assertEqual(reopened.unfinished_games(), {})
+
+    def test_records_without_game(self):
+        log = self.open_log()
+        # Sala fechada sem partida (ninguém entrou) não é registro perdido
+        self.assertFalse(log.end_game("VAZIA1", reason="abandoned"))
+        self.assertEqual(log.stats["missed"], 0)
+        # Fim já registrado: o "abandoned" do host saindo depois também não
+        room = playing_room()
+        log.start_game(room)
+        self.assertTrue(log.end_game(room.room_id, "Ana", "winner"))
+        self.assertFalse(log.end_game(room.room_id, reason="abandoned"))
+        self.assertEqual(log.stats["missed"], 0)
+        # Lance de uma sala sem partida no log é perdido de verdade
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            self.assertFalse(log.record_move("VAZIA1", 1, (5, 0, 4, 1)))
+        self.assertIn("VAZIA1", output.getvalue())
+        self.assertEqual(log.stats["missed"], 1)
+
+
+    def test_workers_share_one_file(self):
+        worker1 = self.open_log()
+        worker2 = self.open_log()
+        room = playing_room()
+        game_id = worker1.start_game(room)
+        # O outro worker atende a sala e acha a partida no arquivo
+        play_logged(worker2, room, hops=3)
+        play_logged(worker1, room, hops=3, seed=RANDOM_SEED + 1)
+        self.assertEqual(worker2.stats["missed"], 0)
+        game, _ = worker1.replay(game_id)
+        self.assertEqual(game.board_rows(), room.game.board_rows())
+        self.assertEqual(worker2.list_games(), [(game_id, room.game.seq, False)])
+
+    def test_single_worker_skips_lock(self):
+        log = self.open_log(shared=False)
+        room = playing_room()
+        with mock.patch.object(game_log, "fcntl") as fcntl, \
+                mock.patch.object(log, "_catch_up") as catch_up:
+            game_id = log.start_game(room)
+            play_logged(log, room, hops=4)
+            log.end_game(room.room_id, "Ana", "winner")
+            self.assertEqual(log.list_games(), [(game_id, 4, True)])
+        fcntl.flock.assert_not_called()
+        catch_up.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,509 @@
+"""
+Salas, fila da partida rápida e ratings do ``GameManager`` com o room store
+em memória (sem Flask/eventlet), e as partidas locais por sessão
+(``SessionRegistry``).
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from checkers_game import DRAW_NAME, P1, P2
+from game_manager import (DEFAULT_RATING, ELO_K, FINISHED, MATCH_BASE_WINDOW,
+                          MATCH_MAX_WINDOW, MATCH_WINDOW_GROWTH, MAX_RATING, MIN_RATING, PLAYING,
+                          ROOM_TTL, WAITING, GameManager, GameRoom, MatchmakingQueue, QueueEntry,
+                          RatingIndex, SessionRegistry, elo_update)
+from room_store import MemoryRoomStore, RoomConflict, SQLiteRoomStore
+
+RANDOM_SEED = 7
+
+
+def quick_match(manager, name1="Ana", name2="Bia", id1="jogador-1", id2="jogador-2"):
+    """Sala da partida rápida entre dois jogadores com rating."""
+    host = QueueEntry("sid-1", name1, DEFAULT_RATING, 0.0, player_id=id1)
+    guest = QueueEntry("sid-2", name2, DEFAULT_RATING, 0.0, player_id=id2)
+    return manager.create_match(host, guest)
+
+
+class EloTest(unittest.TestCase):
+
+    def test_equal_ratings(self):
+        self.assertEqual(elo_update(1200, 1200, 1.0), (1200 + ELO_K // 2, 1200 - ELO_K // 2))
+        self.assertEqual(elo_update(1200, 1200, 0.0), (1200 - ELO_K // 2, 1200 + ELO_K // 2))
+        self.assertEqual(elo_update(1200, 1200, 0.5), (1200, 1200))
+
+    def test_underdog_gains_more(self):
+        upset = elo_update(1000, 1400, 1.0)
+        expected = elo_update(1400, 1000, 1.0)
+        self.assertGreater(upset[0] - 1000, expected[0] - 1400)
+        self.assertGreater(elo_update(1000, 1400, 0.5)[0], 1000)  # Empate com o mais forte
+
+    def test_zero_sum(self):
+        rng = random.Random(RANDOM_SEED)
+        for _ in range(200):
+            rating1, rating2 = rng.randint(MIN_RATING, MAX_RATING), rng.randint(MIN_RATING, MAX_RATING)
+            new1, new2 = elo_update(rating1, rating2, rng.choice((0.0, 0.5, 1.0)))
+            self.assertEqual(new1 + new2, rating1 + rating2)
+            self.assertLessEqual(abs(new1 - rating1), ELO_K)
+
+
+class RatingIndexTest(unittest.TestCase):
+
+    def test_matches_sorted_list(self):
+        """Operações aleatórias contra uma lista ordenada por (rating, chegada)."""
+        rng = random.Random(RANDOM_SEED)
+        index = RatingIndex()
+        reference = []  # [(rating, chegada, entry)]
+        for arrival in range(2000):
+            if reference and rng.random() < 0.4:
+                item = reference.pop(rng.randrange(len(reference)))
+                index.remove(item[2])
+                continue
+            rating = rng.choice((MIN_RATING, MAX_RATING, rng.randint(1150, 1250), rng.randint(MIN_RATING, MAX_RATING)))
+            entry = QueueEntry(f"sid-{arrival}", "Ana", rating, arrival)
+            index.add(entry)
+            reference.append((rating, arrival, entry))
+            reference.sort(key=lambda item: item[:2])
+            position = [item[2] for item in reference].index(entry)
+            previous = reference[position - 1][2] if position else None
+            following = reference[position + 1][2] if position + 1 < len(reference) else None
+            self.assertEqual(index.neighbors(entry), (previous, following))
+            self.assertEqual(index.count, len(reference))
+        self.assertEqual(index.ordered(), [item[2] for item in reference])
+
+
+class MatchmakingQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.queue = MatchmakingQueue()
+
+    def test_pairs_within_window(self):
+        self.assertIsNone(self.queue.enqueue("sid-1", "Ana", 1200, now=0))
+        host, guest = self.queue.enqueue("sid-2", "Bia", 1200 + MATCH_BASE_WINDOW, now=0)
+        self.assertEqual((host.sid, guest.sid), ("sid-1", "sid-2"))
+        self.assertEqual(len(self.queue), 0)
+
+    def test_prefers_closest_rating(self):
+        self.queue.enqueue("sid-1", "Ana", 1100, now=0)
+        self.queue.enqueue("sid-2", "Bia", 1290, now=0)
+        host, guest = self.queue.enqueue("sid-3", "Caio", 1210, now=0)
+        self.assertEqual((host.sid, guest.sid), ("sid-2", "sid-3"))
+        self.assertIn("sid-1", self.queue)
+
+    def test_window_grows_while_waiting(self):
+        gap = MATCH_BASE_WINDOW + 10 * MATCH_WINDOW_GROWTH
+        self.queue.enqueue("sid-1", "Ana", 1200, now=0)
+        self.assertIsNone(self.queue.enqueue("sid-2", "Bia", 1200 + gap, now=5))
+        self.assertEqual(self.queue.pair_waiting(now=9), [])
+        (host, guest), = self.queue.pair_waiting(now=10)
+        self.assertEqual((host.sid, guest.sid), ("sid-1", "sid-2"))  # Quem espera há mais tempo é o host
+        self.assertEqual(self.queue.get_stats(now=10)["avg_wait"], 7.5)
+
+    def test_window_is_capped(self):
+        self.queue.enqueue("sid-1", "Ana", MIN_RATING, now=0)
+        self.queue.enqueue("sid-2", "Bia", MIN_RATING + MATCH_MAX_WINDOW + 1, now=0)
+        self.assertEqual(self.queue.pair_waiting(now=10 ** 6), [])
+
+    def test_cancel_and_requeue(self):
+        self.queue.enqueue("sid-1", "Ana", 1200, now=0)
+        self.assertIsNone(self.queue.enqueue("sid-1", "Ana", 2000, now=1))  # Reentrou com outro rating
+        self.assertEqual(len(self.queue), 1)
+        self.assertIsNone(self.queue.enqueue("sid-2", "Bia", 1200, now=1))
+        self.assertTrue(self.queue.cancel("sid-2"))
+        self.assertFalse(self.queue.cancel("sid-2"))
+        self.assertEqual(self.queue.index.count, 1)
+        stats = self.queue.get_stats(now=1)
+        self.assertEqual((stats["queued"], stats["enqueued"], stats["cancelled"]), (1, 3, 1))
+
+    def test_rating_is_clamped(self):
+        self.queue.enqueue("sid-1", "Ana", -50, now=0)
+        self.queue.enqueue("sid-2", "Bia", 10 ** 6, now=0)
+        self.assertEqual([entry.rating for entry in self.queue.index.ordered()], [MIN_RATING, MAX_RATING])
+
+
+class RatingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = GameManager(store=MemoryRoomStore())
+
+    def assertRatings(self, room, winner_side):
+        """Ratings depois da partida: quem venceu ganha, quem perdeu perde."""
+        ratings = self.manager.update_ratings(room)
+        high, low = elo_update(DEFAULT_RATING, DEFAULT_RATING, 1.0)
+        if winner_side == P1:
+            self.assertEqual(ratings, {"player1": high, "player2": low})
+        else:
+            self.assertEqual(ratings, {"player1": low, "player2": high})
+        self.assertEqual(self.manager.get_rating("jogador-1"), ratings["player1"])
+        self.assertEqual(self.manager.get_rating("jogador-2"), ratings["player2"])
+
+    def test_surrender_with_equal_names(self):
+        room = quick_match(self.manager, "Same", "Same")
+        room.game.surrender(P1)
+        self.assertEqual(room.game.winner_side, P2)
+        self.assertRatings(room, P2)
+
+    def test_winner_named_like_a_draw(self):
+        room = quick_match(self.manager, DRAW_NAME, "Bia")
+        room.game.surrender(P2)
+        self.assertEqual(room.game.winner, DRAW_NAME)
+        self.assertFalse(room.game.draw)
+        self.assertRatings(room, P1)
+
+    def test_loss_on_the_board(self):
+        room = quick_match(self.manager, "Same", "Same")
+        # P2 sem jogadas na vez dele perde (mesmo caminho da queda de bandeira)
+        board = [[0] * 8 for _ in range(8)]
+        board[7][0] = P1
+        room.game.load_position(board, P2)
+        self.assertTrue(room.game.check_winner())
+        self.assertEqual(room.game.winner_side, P1)
+        self.assertRatings(room, P1)
+
+    def test_draw(self):
+        room = quick_match(self.manager)
+        room.game.declare_draw()
+        self.assertIsNone(room.game.winner_side)
+        self.assertEqual(self.manager.update_ratings(room), {"player1": DEFAULT_RATING, "player2": DEFAULT_RATING})
+
+    def test_winner_side_survives_room_store(self):
+        room = quick_match(self.manager, "Same", "Same")
+        room.game.surrender(P2)
+        restored = type(room.game).from_dict(room.game.to_dict())
+        self.assertEqual(restored.winner_side, P1)
+
+    def test_one_update_per_game(self):
+        room = quick_match(self.manager)
+        room.game.surrender(P1)
+        self.assertIsNotNone(self.manager.update_ratings(room))
+        self.assertIsNone(self.manager.update_ratings(room))
+
+    def test_same_player_on_both_sides(self):
+        room = quick_match(self.manager, id1="jogador-1", id2="jogador-1")
+        room.game.surrender(P1)
+        self.assertIsNone(self.manager.update_ratings(room))
+        self.assertEqual(self.manager.get_rating("jogador-1"), DEFAULT_RATING)
+
+
+class CpuAccountingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = GameManager(store=MemoryRoomStore())
+
+    def test_charge_goes_to_room_on_save(self):
+        room_id = self.manager.create_room("Ana", "sid-1")
+        self.manager.charge_cpu(room_id, 0.25)
+        self.manager.charge_cpu(room_id, 0.5)
+        self.assertEqual(self.manager.room_cpu_times(), [(room_id, 0.75)])
+        room = self.manager.get_room(room_id)
+        self.manager.save_room(room)
+        self.assertEqual(room.cpu_time, 0.75)
+        self.assertNotIn(room_id, self.manager.cpu_pending)
+
+    def test_closed_room_is_not_charged(self):
+        room_id = self.manager.create_room("Ana", "sid-1")
+        self.manager.charge_cpu(room_id, 0.25)
+        self.manager.leave_room("sid-1")
+        # Fim do trecho do handler que fechou a sala
+        self.manager.charge_cpu(room_id, 0.25)
+        self.manager.charge_cpu("NUNCA1", 0.25)
+        self.assertEqual(self.manager.cpu_pending, {})
+        self.assertEqual(self.manager.room_cpu_times(), [])
+
+
+class LobbyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = self.make_manager()
+        self.events = []
+        self.manager.on_lobby_change = lambda kind, data: self.events.append((kind, data["room_id"]))
+
+    def make_manager(self):
+        return GameManager(store=MemoryRoomStore())
+
+    def create_rooms(self, count):
+        return [self.manager.create_room(f"Host {n}", f"sid-{n}") for n in range(count)]
+
+    def walk(self, limit):
+        """Percorre o lobby pelo cursor; retorna as páginas (listas de room_id)."""
+        pages = []
+        cursor = None
+        while True:
+            page = self.manager.get_available_rooms(cursor, limit)
+            pages.append([room["room_id"] for room in page["rooms"]])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                return pages
+
+    def test_pages_in_creation_order(self):
+        room_ids = self.create_rooms(5)
+        self.assertEqual(self.walk(2), [room_ids[0:2], room_ids[2:4], room_ids[4:]])
+        self.assertEqual(self.walk(5), [room_ids])
+        self.assertEqual(self.walk(100), [room_ids])
+        first = self.manager.get_available_rooms(limit=1)["rooms"][0]
+        self.assertEqual(first["host_name"], "Host 0")
+
+    def test_removal_between_pages(self):
+        room_ids = self.create_rooms(6)
+        page = self.manager.get_available_rooms(limit=3)
+        self.manager.leave_room("sid-1")  # Já mostrada
+        self.manager.leave_room("sid-4")  # Ainda não mostrada
+        self.manager.join_room(room_ids[3], "Bia", "sid-guest")
+        rest = self.manager.get_available_rooms(page["next_cursor"], 3)
+        self.assertEqual([room["room_id"] for room in rest["rooms"]], [room_ids[5]])
+        self.assertIsNone(rest["next_cursor"])
+
+    def test_limit_is_clamped(self):
+        self.create_rooms(3)
+        self.assertEqual(len(self.manager.get_available_rooms(limit=0)["rooms"]), 1)
+        self.assertEqual(len(self.manager.get_available_rooms(limit=-5)["rooms"]), 1)
+
+    def test_change_events(self):
+        room_id, = self.create_rooms(1)
+        self.manager.join_room(room_id, "Bia", "sid-guest")
+        self.assertEqual(self.events, [("room_added", room_id), ("room_removed", room_id)])
+        self.assertEqual(self.walk(10), [[]])
+
+    def test_unlisted_room(self):
+        self.manager.create_room("Oculta", "sid-x", listed=False)
+        self.assertEqual(self.events, [])
+        self.assertEqual(self.walk(10), [[]])
+
+    def test_compaction_keeps_order(self):
+        room_ids = self.create_rooms(200)
+        for n in range(200):
+            if n % 10:
+                self.manager.leave_room(f"sid-{n}")
+        self.assertLess(len(self.manager.lobby_numbers), 200)  # Números removidos compactados
+        pages = self.walk(3)
+        self.assertEqual([room_id for page in pages for room_id in page], room_ids[::10])
+
+
+class SharedLobbyTest(LobbyTest):
+    """O mesmo lobby pelo SQLite (cursor = rowid)."""
+
+    def make_manager(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "rooms.db")
+        return GameManager(store=SQLiteRoomStore(path, GameRoom.from_dict))
+
+    def test_compaction_keeps_order(self):
+        self.skipTest("sem índice local no store compartilhado")
+
+    def test_unlisted_room(self):
+        self.skipTest("o store compartilhado lista pelo status (a partida rápida entra em seguida)")
+
+
+class ExpiryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("game_manager.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = GameManager(store=MemoryRoomStore())
+
+    def expire_at(self, seconds):
+        """Salas removidas ``seconds`` depois de agora."""
+        return [room.room_id for room in self.manager.expire_rooms(self.now + seconds)]
+
+    def test_waiting_room_expires_after_ttl(self):
+        room_id = self.manager.create_room("Ana", "sid-1")
+        self.assertEqual(self.expire_at(ROOM_TTL[WAITING] - 1), [])
+        self.assertEqual(self.expire_at(ROOM_TTL[WAITING]), [room_id])
+        self.assertIsNone(self.manager.get_room(room_id))
+        self.assertIsNone(self.manager.get_room_by_socket("sid-1"))
+        self.assertEqual(self.manager.get_available_rooms()["rooms"], [])
+        self.assertEqual(self.manager.deadlines, {})
+        self.assertEqual(self.manager.scheduled, {})
+        stats = self.manager.expiry_stats
+        self.assertEqual((stats["rooms_expired"], stats["by_status"][WAITING]), (1, 1))
+        self.assertGreater(stats["bytes_freed"], 0)
+
+    def test_activity_reschedules(self):
+        room = quick_match(self.manager)
+        self.now += ROOM_TTL[PLAYING] - 10
+        self.manager.save_room(room)  # Um lance
+        # O prazo antigo vence, mas a sala teve atividade: volta para o heap
+        self.assertEqual(self.expire_at(10), [])
+        self.assertEqual(self.manager.scheduled[room.room_id], self.now + ROOM_TTL[PLAYING])
+        self.assertEqual(self.expire_at(ROOM_TTL[PLAYING] - 1), [])
+        self.assertEqual(self.expire_at(ROOM_TTL[PLAYING]), [room.room_id])
+
+    def test_finished_room_expires_sooner(self):
+        room = quick_match(self.manager)
+        room.game.surrender(P1)
+        self.manager.finish_room(room)
+        self.assertEqual(self.expire_at(ROOM_TTL[FINISHED] - 1), [])
+        self.assertEqual(self.expire_at(ROOM_TTL[FINISHED]), [room.room_id])
+        self.assertEqual(self.manager.expiry_stats["by_status"][FINISHED], 1)
+        # As entradas dos prazos mais longos ficam no heap e são ignoradas
+        self.assertEqual(self.expire_at(ROOM_TTL[WAITING]), [])
+        self.assertEqual(self.manager.expiry_heap, [])
+
+    def test_removed_room_is_skipped(self):
+        room_id = self.manager.create_room("Ana", "sid-1")
+        other_id = self.manager.create_room("Bia", "sid-2")
+        self.manager.leave_room("sid-1")
+        self.assertEqual(self.expire_at(ROOM_TTL[WAITING]), [other_id])
+        self.assertNotIn(room_id, self.manager.deadlines)
+        self.assertEqual(self.manager.expiry_stats["rooms_expired"], 1)
+
+
+class SpectatorBackpressureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = GameManager(store=MemoryRoomStore())
+        self.room = quick_match(self.manager)
+        self.rng = random.Random(RANDOM_SEED)
+        self.manager.add_spectator(self.room.room_id, "sid-watch", "Caio")
+
+    def play(self, hops):
+        game = self.room.game
+        for _ in range(hops):
+            legal_moves = game.get_legal_moves()
+            start = self.rng.choice(sorted(legal_moves))
+            game.move_piece(*start, *self.rng.choice(sorted(legal_moves[start])), move_time=0)
+        return game.seq
+
+    def test_slow_spectator_is_paused_and_resumed(self):
+        self.assertEqual(self.manager.spectator_acks["sid-watch"], self.room.game.seq)
+        sent = self.play(2)
+        self.assertEqual(self.manager.check_spectator_backlog(max_backlog=2), ([], []))
+        self.assertTrue(self.manager.ack_spectator("sid-watch", sent))
+        behind = self.play(3)
+        self.assertEqual(self.manager.check_spectator_backlog(max_backlog=2),
+                         ([("sid-watch", self.room)], []))
+        self.assertEqual(self.manager.lagging_spectators, {"sid-watch": behind})
+        # Pausado: os lances seguintes não chegam a ele nem o pausam de novo
+        self.play(5)
+        self.assertEqual(self.manager.check_spectator_backlog(max_backlog=2), ([], []))
+        # Confirmar só parte do que estava a caminho não basta
+        self.manager.ack_spectator("sid-watch", behind - 1)
+        self.assertEqual(self.manager.check_spectator_backlog(max_backlog=2), ([], []))
+        self.manager.ack_spectator("sid-watch", behind)
+        self.assertEqual(self.manager.check_spectator_backlog(max_backlog=2),
+                         ([], [("sid-watch", self.room)]))
+        # Volta com o estado atual: conta a partir do lance de agora
+        self.assertEqual(self.manager.lagging_spectators, {})
+        self.assertEqual(self.manager.spectator_acks["sid-watch"], self.room.game.seq)
+
+    def test_tracking_ends_with_spectator(self):
+        self.play(3)
+        self.manager.check_spectator_backlog(max_backlog=1)
+        self.assertIn("sid-watch", self.manager.lagging_spectators)
+        self.manager.remove_spectator("sid-watch")
+        self.assertEqual((self.manager.spectator_acks, self.manager.lagging_spectators), ({}, {}))
+        self.assertFalse(self.manager.ack_spectator("sid-watch", 3))
+        self.assertEqual(self.manager.spectator_acks, {})
+
+    def test_tracking_ends_with_room(self):
+        self.play(3)
+        self.manager.check_spectator_backlog(max_backlog=1)
+        self.manager.leave_room("sid-1")  # O host fecha a sala
+        self.assertEqual(self.manager.spectating, {})
+        self.assertEqual((self.manager.spectator_acks, self.manager.lagging_spectators), ({}, {}))
+
+
+class SessionRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("game_manager.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.registry = SessionRegistry(max_games=3, idle_timeout=60)
+
+    def test_reuses_session_game(self):
+        token, game = self.registry.get_or_create(None)
+        self.assertEqual(self.registry.get_or_create(token), (token, game))
+        self.assertIs(self.registry.get_game(token), game)
+        self.assertIsNone(self.registry.get_game("desconhecido"))
+        self.assertIsNone(self.registry.get_game(None))
+        self.assertEqual(len(self.registry), 1)
+
+    def test_full_registry_evicts_least_recently_used(self):
+        tokens = [self.registry.get_or_create(None)[0] for _ in range(3)]
+        self.registry.get_game(tokens[0])  # O mais antigo volta a ser usado
+        new_token, _ = self.registry.get_or_create(None)
+        self.assertEqual(list(self.registry.games), [tokens[2], tokens[0], new_token])
+        self.assertNotIn(tokens[1], self.registry.last_seen)
+        self.assertEqual(self.registry.evicted, 1)
+
+    def test_reads_never_evict(self):
+        tokens = [self.registry.get_or_create(None)[0] for _ in range(3)]
+        self.now += 3600
+        for token in tokens:
+            self.assertIsNotNone(self.registry.get_game(token))
+        self.assertEqual(self.registry.evicted, 0)
+
+    def test_idle_sessions_expire(self):
+        old, _ = self.registry.get_or_create(None)
+        self.now += 30
+        recent, _ = self.registry.get_or_create(None)
+        self.now += 31
+        self.assertEqual(self.registry.cleanup_idle_games(), 1)
+        self.assertEqual(list(self.registry.games), [recent])
+        self.assertEqual(self.registry.last_seen, {recent: self.now - 31})
+        # Uma sessão usada de novo não expira pelo acesso antigo
+        self.now += 50
+        self.registry.get_game(recent)
+        self.now += 50
+        self.assertEqual(self.registry.cleanup_idle_games(), 0)
+        self.assertEqual(self.registry.evicted, 1)
+
+    def test_creating_cleans_idle_first(self):
+        tokens = [self.registry.get_or_create(None)[0] for _ in range(3)]
+        self.now += 61
+        self.registry.get_game(tokens[2])
+        self.registry.get_or_create(None)
+        self.assertEqual(len(self.registry), 2)
+        self.assertIn(tokens[2], self.registry.games)
+        self.assertEqual(self.registry.evicted, 2)
+
+
+class SharedStoreTest(unittest.TestCase):
+    """Dois workers (``GameManager``) sobre o mesmo arquivo SQLite."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "rooms.db")
+        self.worker1 = GameManager(store=SQLiteRoomStore(path, GameRoom.from_dict))
+        self.worker2 = GameManager(store=SQLiteRoomStore(path, GameRoom.from_dict))
+
+    def test_finish_room_conflict_writes_no_rating(self):
+        room = quick_match(self.worker1)
+        stale = self.worker1.get_room(room.room_id)
+        # Outro worker grava a sala (ex.: um lance) depois da leitura
+        current = self.worker2.get_room(room.room_id)
+        current.game.start_clock()
+        self.worker2.save_room(current)
+
+        stale.game.surrender(P1)
+        with self.assertRaises(RoomConflict):
+            self.worker1.finish_room(stale)
+        self.assertEqual(stale.status, PLAYING)
+        self.assertTrue(stale.rated_players)
+        self.assertEqual(self.worker1.get_rating("jogador-1"), DEFAULT_RATING)
+        self.assertEqual(self.worker1.get_room(room.room_id).status, PLAYING)
+
+        # Relida, a desistência grava e conta uma vez só
+        fresh = self.worker1.get_room(room.room_id)
+        fresh.game.surrender(P1)
+        ratings = self.worker1.finish_room(fresh)
+        self.assertLess(ratings["player1"], DEFAULT_RATING)
+        stored = self.worker2.get_room(room.room_id)
+        self.assertEqual(stored.status, FINISHED)
+        self.assertEqual(stored.rated_players, {})
+        self.assertEqual(self.worker2.get_rating("jogador-1"), ratings["player1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
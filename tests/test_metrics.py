@@ -0,0 +1,80 @@
+"""
+Histogramas e formato do ``/metrics`` (``metrics.py``).
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import math
+import unittest
+
+from metrics import (HISTOGRAM_MIN_EXP, HISTOGRAM_OCTAVES, SUB_BUCKETS, Histogram,
+                     Registry)
+
+OVERFLOW = HISTOGRAM_OCTAVES * SUB_BUCKETS
+
+
+def bucket_of(value):
+    histogram = Histogram()
+    histogram.record(value)
+    return histogram.counts.index(1)
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_bounds_are_inclusive(self):
+        for index in range(OVERFLOW):
+            bound = Histogram.bucket_bound(index)
+            self.assertEqual(bucket_of(bound), index, bound)
+            self.assertEqual(bucket_of(math.nextafter(bound, math.inf)), index + 1, bound)
+            if index:
+                self.assertEqual(bucket_of(math.nextafter(bound, 0)), index, bound)
+
+    def test_octave_limits(self):
+        self.assertEqual(bucket_of(math.ldexp(1, HISTOGRAM_MIN_EXP)), SUB_BUCKETS - 1)
+        self.assertEqual(bucket_of(128.0), OVERFLOW - 1)
+        self.assertEqual(bucket_of(128.5), OVERFLOW)
+        self.assertEqual(bucket_of(1e300), OVERFLOW)
+
+    def test_tiny_zero_and_negative(self):
+        for value in (0.0, -1.0, 1e-300, math.ldexp(1, HISTOGRAM_MIN_EXP - 1)):
+            self.assertEqual(bucket_of(value), 0, value)
+
+    def test_octave_counts_match_le(self):
+        histogram = Histogram()
+        samples = [math.ldexp(1, exp) for exp in range(HISTOGRAM_MIN_EXP, HISTOGRAM_MIN_EXP + HISTOGRAM_OCTAVES)]
+        samples += [0.003, 0.0031, 1.7, 99.0]
+        for value in samples:
+            histogram.record(value)
+        for bound, cumulative in histogram.octave_counts():
+            self.assertEqual(cumulative, sum(1 for value in samples if value <= bound), bound)
+
+    def test_percentile_is_bucket_bound(self):
+        histogram = Histogram()
+        self.assertEqual(histogram.percentile(99), 0.0)
+        for _ in range(99):
+            histogram.record(0.001)
+        histogram.record(1000.0)
+        p50 = histogram.percentile(50)
+        self.assertGreaterEqual(p50, 0.001)
+        self.assertLessEqual(p50, 0.001 * (1 + 1 / SUB_BUCKETS))
+        self.assertEqual(histogram.percentile(100), math.inf)
+
+
+class RegistryTest(unittest.TestCase):
+
+    def test_render_histogram(self):
+        registry = Registry()
+        registry.describe("damas_test_seconds", "Teste")
+        registry.observe("damas_test_seconds", 0.5, route="/move")
+        registry.observe("damas_test_seconds", 2.0, route="/move")
+        lines = registry.render().splitlines()
+        self.assertIn("# TYPE damas_test_seconds histogram", lines)
+        self.assertIn('damas_test_seconds_bucket{route="/move",le="0.5"} 1', lines)
+        self.assertIn('damas_test_seconds_bucket{route="/move",le="2"} 2', lines)
+        self.assertIn('damas_test_seconds_bucket{route="/move",le="+Inf"} 2', lines)
+        self.assertIn('damas_test_seconds_count{route="/move"} 2', lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
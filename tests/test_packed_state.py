@@ -0,0 +1,126 @@
+"""
+Formato compacto do tabuleiro (``BitBoard.encode`` / ``board_packed``)
+contra a matriz 8x8 (``board``) que os clientes antigos ainda recebem.
+
+O ``decodeBoard``/``normalizeState`` do static/js/game.js roda no Node
+(quando instalado) sobre os mesmos estados.
+"""
+
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import unittest
+
+from bitboard import BitBoard, SQUARES, square_coords
+from checkers_game import CheckersGame, EMPTY, P1, P2, P1_KING, P2_KING
+
+RANDOM_BOARDS = 300
+RANDOM_GAMES = 30
+RANDOM_SEED = 11
+GAME_JS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static", "js", "game.js")
+
+
+def random_board(rng):
+    """Matriz 8x8 com peças quaisquer (inclusive damas) em casas escuras aleatórias."""
+    board = [[EMPTY] * 8 for _ in range(8)]
+    for sq in rng.sample(range(SQUARES), rng.randint(0, SQUARES)):
+        row, col = square_coords(sq)
+        board[row][col] = rng.choice((P1, P2, P1_KING, P2_KING))
+    return board
+
+
+def game_states(seed=RANDOM_SEED):
+    """Partidas aleatórias: a mesma partida é devolvida depois de cada salto (inclusive no meio de capturas)."""
+    rng = random.Random(seed)
+    for _ in range(RANDOM_GAMES):
+        game = CheckersGame(use_bitboard=rng.random() < 0.5)
+        while True:
+            yield game
+            legal_moves = game.get_legal_moves()
+            if game.winner or not legal_moves:
+                break
+            start = rng.choice(sorted(legal_moves))
+            end = rng.choice(sorted(legal_moves[start]))
+            game.move_piece(*start, *end, move_time=0)
+
+
+def js_normalize(states):
+    """``normalizeState`` do game.js aplicado a cada estado (via Node)."""
+    with open(GAME_JS, encoding="utf-8") as f:
+        source = f.read()
+    constants = re.search(r"^const EMPTY = .*$", source, re.M).group(0)
+    start = source.index("function decodeBoard")
+    end = source.index("// ====", start)
+    script = (
+        constants + "\n" + source[start:end]
+        + "const states = JSON.parse(require('fs').readFileSync(0, 'utf8'));\n"
+        + "process.stdout.write(JSON.stringify(states.map(normalizeState)));\n"
+    )
+    result = subprocess.run(["node", "-e", script], input=json.dumps(states),
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout)
+
+
+class PackedBoardTest(unittest.TestCase):
+
+    def test_encode_decode_random_boards(self):
+        rng = random.Random(RANDOM_SEED)
+        boards = [random_board(rng) for _ in range(RANDOM_BOARDS)]
+        boards.append([[EMPTY] * 8 for _ in range(8)])
+        # Todas as casas com dama (bit 31 ligado em todos os bitboards de dama)
+        boards.append([[P2_KING if (row + col) % 2 else EMPTY for col in range(8)] for row in range(8)])
+        for board in boards:
+            packed = BitBoard.from_board(board).encode()
+            self.assertEqual(len(packed), 24)
+            self.assertEqual(BitBoard.decode(packed).to_board(), board)
+
+    def test_packed_state_matches_list_state(self):
+        mid_capture = 0
+        for game in game_states():
+            packed = game.get_state("packed")
+            listed = game.get_state("list")
+            legacy = game.get_state()
+            self.assertNotIn("board", packed)
+            self.assertNotIn("board_packed", listed)
+            self.assertEqual(BitBoard.decode(packed["board_packed"]).to_board(), listed["board"])
+            self.assertEqual(listed["board"], game.board_rows())
+            # Cliente antigo (sem ``encoding``) continua recebendo a matriz
+            self.assertEqual(dict(legacy), dict(listed))
+            self.assertEqual(json.loads(legacy.json), json.loads(listed.json))
+            packed.pop("board_packed")
+            listed.pop("board")
+            self.assertEqual(packed, listed)
+            if game._pending_paths is not None:
+                mid_capture += 1
+        self.assertGreater(mid_capture, 0)
+
+    def test_room_store_round_trip(self):
+        for game in game_states(RANDOM_SEED + 1):
+            restored = CheckersGame.from_dict(json.loads(json.dumps(game.to_dict())))
+            self.assertEqual(restored.board_rows(), game.board_rows())
+            self.assertEqual(restored.get_legal_moves(), game.get_legal_moves())
+
+    @unittest.skipUnless(shutil.which("node"), "Node.js não instalado")
+    def test_frontend_decode(self):
+        rng = random.Random(RANDOM_SEED)
+        expected = [random_board(rng) for _ in range(RANDOM_BOARDS)]
+        states = [{"board_packed": BitBoard.from_board(board).encode(), "turn": P1} for board in expected]
+        for game in game_states():
+            expected.append(game.board_rows())
+            states.append(json.loads(game.get_state("packed").json))
+        # Estado no formato antigo passa sem alteração
+        legacy = json.loads(game.get_state().json)
+        expected.append(legacy["board"])
+        states.append(legacy)
+
+        normalized = js_normalize(states)
+        self.assertEqual([state["board"] for state in normalized], expected)
+        self.assertFalse(any("board_packed" in state for state in normalized))
+        self.assertEqual(normalized[-1], legacy)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""
+``profiler.LoopMonitor`` sem eventlet: CPU por sala, trechos lentos e o
+trace das trocas ligado só com ``always`` ou com o profiler. As green
+threads são objetos comuns e o ``settrace`` é trocado por um registro.
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import contextlib
+import io
+import threading
+import time
+import unittest
+
+from game_manager import GameManager
+from profiler import LoopMonitor
+from room_store import MemoryRoomStore
+
+
+class FakeGreenlet:
+    """Green thread de mentira (precisa aceitar weakref, como o greenlet)."""
+
+
+def burn(seconds):
+    end = time.thread_time() + seconds
+    while time.thread_time() < end:
+        pass
+
+
+class LoopMonitorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = GameManager(store=MemoryRoomStore())
+        self.room_id = self.manager.create_room("Ana", "sid-1")
+        self.traces = []
+        self.running = FakeGreenlet()
+        self.hub = FakeGreenlet()
+
+    def monitor(self, always=False, threshold=10.0):
+        monitor = LoopMonitor(charge=self.manager.charge_cpu, threshold=threshold, always=always)
+        # O que o install() faz, sem greenlet nem watchdog
+        monitor.loop_thread_id = threading.get_ident()
+        monitor._getcurrent = lambda: self.running
+        monitor._settrace = self.traces.append
+        monitor._hub = self.hub
+        if always:
+            monitor._start_tracing()
+        return monitor
+
+    def switch(self, monitor, target):
+        monitor._on_switch("switch", (self.running, target))
+        self.running = target
+
+    def test_cpu_goes_to_the_handler_room(self):
+        monitor = self.monitor(always=True)
+        self.assertEqual(self.traces, [monitor._on_switch])
+        monitor.enter("move", self.room_id)
+        burn(0.02)
+        # O handler cede (I/O) e volta
+        waiting = self.running
+        self.switch(monitor, self.hub)
+        burn(0.05)
+        self.switch(monitor, waiting)
+        burn(0.02)
+        monitor.exit()
+
+        charged = self.manager.cpu_pending[self.room_id]
+        self.assertGreaterEqual(charged, 0.04)
+        self.assertLess(charged, 0.08)  # O tempo no hub não entra
+        self.assertAlmostEqual(monitor.handler_cpu["move"], charged)
+        self.assertEqual(self.manager.room_cpu_times(), [(self.room_id, charged)])
+
+    def test_off_by_default(self):
+        monitor = self.monitor()
+        monitor.enter("move", self.room_id)
+        burn(0.01)
+        monitor.exit()
+        self.assertEqual(self.traces, [])
+        self.assertEqual(self.manager.cpu_pending, {})
+        self.assertFalse(monitor.report()["tracing"])
+
+    def test_profiler_turns_tracing_on_and_off(self):
+        monitor = self.monitor()
+        self.assertTrue(monitor.start_profiler(interval=0.001, max_duration=60))
+        self.assertTrue(monitor.tracing)
+        self.assertEqual(self.traces, [monitor._on_switch])
+        monitor.enter("move", self.room_id)
+        burn(0.01)
+        monitor.exit()
+        self.assertIn(self.room_id, self.manager.cpu_pending)
+
+        # Parar pode vir da thread do profiler: o trace sai na próxima troca
+        self.assertTrue(monitor.stop_profiler())
+        self.assertFalse(monitor.tracing)
+        self.assertEqual(self.traces, [monitor._on_switch])
+        self.switch(monitor, self.hub)
+        self.assertEqual(self.traces, [monitor._on_switch, None])
+
+    def test_profiler_keeps_always_on(self):
+        monitor = self.monitor(always=True)
+        monitor.start_profiler(interval=0.001, max_duration=60)
+        monitor.stop_profiler()
+        self.assertTrue(monitor.tracing)
+        self.switch(monitor, self.hub)
+        self.assertEqual(self.traces, [monitor._on_switch])
+
+    def test_slow_handler(self):
+        monitor = self.monitor(always=True, threshold=0.01)
+        monitor.enter("move", self.room_id)
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            time.sleep(0.02)
+            self.switch(monitor, FakeGreenlet())
+        self.assertEqual(monitor.slow_count, 1)
+        self.assertEqual(monitor.slow_events[0]["handler"], "move")
+        self.assertEqual(monitor.slow_events[0]["room_id"], self.room_id)
+        self.assertIn(self.room_id, output.getvalue())
+        # Esperando I/O no hub não é loop preso
+        self.switch(monitor, self.hub)
+        time.sleep(0.02)
+        self.switch(monitor, FakeGreenlet())
+        self.assertEqual(monitor.slow_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,171 @@
+"""
+Análise retrógrada da tablebase contra uma busca direta com a regra dos
+lances de dama.
+
+Com a regra, o jogo não tem ciclos: lance de dama sem captura aumenta o
+contador e lance de pedra só anda para frente. A busca recursiva (com
+memória) sobre (posição, vez, contador) dá então o resultado exato, sem
+usar as tabelas. Os limites são reduzidos para a regra decidir também
+nos finais pequenos.
+
+Uso:
+    python -m unittest discover -s tests -t .
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+import tablebase
+from bitboard import BIT, BitBoard, P1, P2, opponent
+from search import generate_moves, make_move, unmake_move
+from tablebase import DRAW, LOSS, WIN
+
+KING_MOVES_LIMITS = (3, 6)
+# Materiais de 3 peças com damas (só damas; pedra que zera o contador e promove)
+# e os de 2 peças de que dependem
+MATERIALS = tablebase.signatures(2) + [(0, 2, 0, 1), (1, 1, 0, 1)]
+SAMPLED_POSITIONS = 50
+RANDOM_SEED = 5
+
+
+class Reference:
+    """(resultado, distância) de quem joga por busca direta, contador das damas explícito."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.memo = {}
+
+    def value(self, board, player, counter=0):
+        key = (board.key(), player, counter)
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        moves = generate_moves(board, player)
+        if not moves:
+            result = (LOSS, 0)
+        else:
+            enemy = opponent(player)
+            children = []
+            for move in moves:
+                king_move = not move[1] and board.kings(player) & BIT[move[0][0]]
+                undo = make_move(board, player, move)
+                if not board.pieces(enemy) or not generate_moves(board, enemy):
+                    child = (LOSS, 0)  # Vitória vem antes do empate
+                elif king_move and counter + 1 >= self.limit:
+                    child = (DRAW, 0)
+                else:
+                    child = self.value(board, enemy, counter + 1 if king_move else 0)
+                unmake_move(board, undo)
+                children.append(child)
+            losses = [distance for outcome, distance in children if outcome == LOSS]
+            if losses:
+                result = (WIN, min(losses) + 1)
+            elif any(outcome == DRAW for outcome, _ in children):
+                result = (DRAW, 0)
+            else:
+                result = (LOSS, max(distance for _, distance in children) + 1)
+        self.memo[key] = result
+        return result
+
+
+def positions(signature):
+    for base, board in tablebase._positions(signature):
+        for player in (P1, P2):
+            yield base + (1 if player == P2 else 0), board, player
+
+
+class TablebaseSolveTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.solved = {}  # {limite: {material: tabela}}
+        cls.references = {}
+        for limit in KING_MOVES_LIMITS:
+            solved = cls.solved[limit] = {}
+            for signature in MATERIALS:
+                solved[signature] = tablebase.solve_signature(signature, solved, limit)
+            cls.references[limit] = Reference(limit)
+
+    def assertSolved(self, limit, signature, index, board, player):
+        self.assertEqual(tablebase.decode_value(self.solved[limit][signature][index]),
+                         self.references[limit].value(BitBoard(*board.key()), player),
+                         f"{signature} {board.key()} vez {player} limite {limit}")
+
+    def test_two_pieces(self):
+        for signature in tablebase.signatures(2):
+            for index, board, player in positions(signature):
+                for limit in KING_MOVES_LIMITS:
+                    self.assertSolved(limit, signature, index, board, player)
+
+    def test_king_moves_rule(self):
+        rng = random.Random(RANDOM_SEED)
+        short, long = self.solved[KING_MOVES_LIMITS[0]], self.solved[KING_MOVES_LIMITS[1]]
+        changed = 0
+        for signature in MATERIALS:
+            if sum(signature) != 3:
+                continue
+            all_positions = list(positions(signature))
+            # Todas as posições em que o limite muda o resultado, mais uma amostra
+            checked = [item for item in all_positions if short[signature][item[0]] != long[signature][item[0]]]
+            changed += len(checked)
+            checked += rng.sample(all_positions, SAMPLED_POSITIONS)
+            for index, board, player in checked:
+                for limit in KING_MOVES_LIMITS:
+                    self.assertSolved(limit, signature, index, board, player)
+        self.assertGreater(changed, 0)
+
+    def test_shorter_limit_only_adds_draws(self):
+        short, long = self.solved[KING_MOVES_LIMITS[0]], self.solved[KING_MOVES_LIMITS[1]]
+        for signature in MATERIALS:
+            size = tablebase.table_size(signature)
+            for a, b in zip(short[signature][:size], long[signature][:size]):
+                if a != b:
+                    self.assertEqual(a, 0)
+
+    def test_probe_with_king_moves(self):
+        """O arquivo guarda todas as camadas; probe e best_move seguem o contador do jogo."""
+        limit = KING_MOVES_LIMITS[0]
+        reference = self.references[limit]
+        rng = random.Random(RANDOM_SEED)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "tablebase.bin")
+            tablebase.write(self.solved[limit], path)
+            table = tablebase.Tablebase(path)
+            try:
+                for signature in MATERIALS:
+                    if not (signature[1] or signature[3]):
+                        continue
+                    for _, board, player in rng.sample(list(positions(signature)), SAMPLED_POSITIONS):
+                        for counter in range(limit + 1):
+                            if counter < limit:
+                                expected = reference.value(BitBoard(*board.key()), player, counter)
+                            elif generate_moves(board, player):
+                                expected = (DRAW, 0)
+                            else:
+                                expected = (LOSS, 0)
+                            self.assertEqual(table.probe(board, player, counter), expected)
+                            if expected[0] == WIN:
+                                self.assertBestMoveWins(table, board, player, counter, expected[1])
+            finally:
+                table.close()
+
+    def assertBestMoveWins(self, table, board, player, counter, distance):
+        path = table.best_move(board, player, counter)
+        move = next(move for move in generate_moves(board, player) if move[0] == path)
+        enemy = opponent(player)
+        king_move = not move[1] and board.kings(player) & BIT[move[0][0]]
+        undo = make_move(board, player, move)
+        try:
+            if board.pieces(enemy):
+                child = table.probe(board, enemy, counter + 1 if king_move else 0)
+                self.assertEqual(child, (LOSS, distance - 1))
+            else:
+                self.assertEqual(distance, 1)
+        finally:
+            unmake_move(board, undo)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,215 @@
+"""
+Hash Zobrist das posições, tabela de transposição e tabela de jogadas.
+
+Cada (tipo de peça, casa escura) tem uma chave aleatória de 64 bits; o hash
+de uma posição é o XOR das chaves das peças presentes (mais a chave do lado
+a jogar). Como o XOR é reversível, o hash é atualizado a cada casa alterada
+sem percorrer o tabuleiro.
+
+A tabela de transposição guarda os resultados da busca; a tabela de jogadas
+(``MoveTable``), as jogadas legais que o ``CheckersGame`` gerou para cada
+posição, para as posições que voltam (partidas em várias salas, aberturas,
+damas indo e voltando) não serem geradas de novo.
+"""
+
+import random
+from array import array
+
+from bitboard import SQUARES, P1, P2, P1_KING, P2_KING, EMPTY, iter_bits
+
+# Semente fixa: o mesmo hash em todos os processos (necessário para o livro
+# de aberturas e para comparar posições entre workers)
+_rng = random.Random(0x5A0B15)
+
+PIECE_KEYS = {
+    piece: tuple(_rng.getrandbits(64) for _ in range(SQUARES))
+    for piece in (P1, P2, P1_KING, P2_KING)
+}
+SIDE_KEY = _rng.getrandbits(64)  # XOR quando é a vez do P2
+
+
+def piece_key(piece, sq):
+    """Chave de uma peça em uma casa (0 para casa vazia)."""
+    if piece == EMPTY:
+        return 0
+    return PIECE_KEYS[piece][sq]
+
+
+def hash_board(board):
+    """Hash completo das peças de um ``BitBoard`` (sem o lado a jogar)."""
+    h = 0
+    for bits, piece in ((board.p1_men, P1), (board.p2_men, P2),
+                        (board.p1_kings, P1_KING), (board.p2_kings, P2_KING)):
+        keys = PIECE_KEYS[piece]
+        for sq in iter_bits(bits):
+            h ^= keys[sq]
+    return h
+
+
+def hash_position(board, player):
+    """Hash da posição incluindo o lado a jogar."""
+    h = hash_board(board)
+    return h ^ SIDE_KEY if player == P2 else h
+
+
+def update_for_move(h, board, player, move):
+    """
+    Hash da posição depois de ``move`` (formato do search.py), calculado a
+    partir do hash atual antes de aplicar a jogada.
+    """
+    squares, captured = move
+    from_sq = squares[0]
+    to_sq = squares[-1]
+    moving = board.piece_at(from_sq)
+    landed = moving
+    if moving == P1 and to_sq < 4:
+        landed = P1_KING
+    elif moving == P2 and to_sq >= SQUARES - 4:
+        landed = P2_KING
+
+    h ^= PIECE_KEYS[moving][from_sq] ^ PIECE_KEYS[landed][to_sq]
+    for sq in iter_bits(captured):
+        h ^= PIECE_KEYS[board.piece_at(sq)][sq]
+    return h ^ SIDE_KEY
+
+
+# ----------------------------------------
+# Tabela de transposição
+# ----------------------------------------
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Bytes por entrada: hash (8), score (4), melhor jogada (2), profundidade (1), tipo (1)
+ENTRY_BYTES = 16
+NO_MOVE = 0xFFFF
+
+
+def pack_move(move):
+    """Jogada (formato do search.py) em 10 bits: casa de origem << 5 | casa final."""
+    squares = move[0]
+    return squares[0] << 5 | squares[-1]
+
+
+def unpack_move(code, moves):
+    """
+    Jogada de ``moves`` com a origem e o destino de ``code`` (ou None).
+    Duas sequências de captura com as mesmas pontas são raras; vale a
+    primeira, que é só a primeira tentada na ordenação.
+    """
+    if code == NO_MOVE:
+        return None
+    for move in moves:
+        squares = move[0]
+        if squares[0] << 5 | squares[-1] == code:
+            return move
+    return None
+
+
+class TranspositionTable:
+    """
+    Tabela de transposição de tamanho fixo (endereçamento direto pelo hash).
+
+    Cada slot guarda hash, profundidade, score, tipo e a melhor jogada
+    (``pack_move``) em arrays de tamanho fixo: a memória é alocada uma vez
+    (``ENTRY_BYTES`` por slot) e não cresce com as posições guardadas.
+    Substituição por profundidade: uma entrada só é trocada por outra de
+    profundidade maior ou igual (ou pela mesma posição).
+    """
+
+    __slots__ = ("size", "mask", "keys", "depths", "scores", "flags", "moves", "hits", "stores")
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        entries = max(1024, max_bytes // ENTRY_BYTES)
+        size = 1 << (entries.bit_length() - 1)  # potência de 2
+        self.size = size
+        self.mask = size - 1
+        self.clear()
+
+    def probe(self, key):
+        """(profundidade, score, tipo, jogada empacotada) da posição, ou None."""
+        index = key & self.mask
+        if self.keys[index] != key or not key:
+            return None
+        self.hits += 1
+        return self.depths[index], self.scores[index], self.flags[index], self.moves[index]
+
+    def store(self, key, depth, score, flag, best_move):
+        index = key & self.mask
+        stored = self.keys[index]
+        if not stored or stored == key or depth >= self.depths[index]:
+            self.keys[index] = key
+            self.depths[index] = min(depth, 255)
+            self.scores[index] = score
+            self.flags[index] = flag
+            self.moves[index] = pack_move(best_move) if best_move is not None else NO_MOVE
+            self.stores += 1
+
+    def clear(self):
+        size = self.size
+        self.keys = array("Q", bytes(8 * size))  # 0 = slot vazio
+        self.scores = array("i", bytes(4 * size))
+        self.moves = array("H", bytes(2 * size))
+        self.depths = array("B", bytes(size))
+        self.flags = array("B", bytes(size))
+        self.hits = 0
+        self.stores = 0
+
+
+class MoveTable:
+    """
+    Jogadas legais por posição (hash com o lado a jogar), de tamanho fixo.
+
+    Endereçamento direto como a ``TranspositionTable``: um slot por índice,
+    sempre substituído pela posição mais recente, então a memória fica
+    limitada a ``size`` tabelas de jogadas. Os valores são de quem chama
+    (o ``CheckersGame`` guarda a tabela de lances simples ou as sequências
+    de captura) e não podem ser alterados depois de guardados.
+    """
+
+    __slots__ = ("size", "mask", "keys", "values", "hits", "misses")
+
+    def __init__(self, entries=1 << 14):
+        size = 1 << (max(1024, entries).bit_length() - 1)  # potência de 2
+        self.size = size
+        self.mask = size - 1
+        self.clear()
+
+    def get(self, key):
+        index = key & self.mask
+        if key and self.keys[index] == key:
+            self.hits += 1
+            return self.values[index]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        index = key & self.mask
+        self.keys[index] = key
+        self.values[index] = value
+
+    def clear(self):
+        self.keys = array("Q", bytes(8 * self.size))  # 0 = slot vazio
+        self.values = [None] * self.size
+        self.hits = 0
+        self.misses = 0
+
+
+_shared_table = None
+_move_table = None
+
+
+def get_shared_table():
+    """Tabela de transposição única do processo (compartilhada entre buscas)."""
+    global _shared_table
+    if _shared_table is None:
+        _shared_table = TranspositionTable()
+    return _shared_table
+
+
+
+def get_move_table():
+    """Tabela de jogadas única do processo (compartilhada entre partidas)."""
+    global _move_table
+    if _move_table is None:
+        _move_table = MoveTable()
+    return _move_table